@@ -0,0 +1,142 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getDatabase } from '@/lib/db';
+import { getSession } from '@/lib/auth';
+import { ObjectId } from 'mongodb';
+import { readMedia } from '@/lib/media';
+
+// Serves a story's continuous narration track with byte-range support so
+// the reader can stream one file and seek to page markers
+// (story.audioTrack.markers) instead of fetching a clip per page.
+export async function GET(
+  request: NextRequest,
+  { params }: { params: { id: string } }
+) {
+  try {
+    const session = await getSession();
+    const storyId = new ObjectId(params.id);
+    const db = await getDatabase();
+
+    const story = await db.collection('stories').findOne(
+      { _id: storyId },
+      { projection: { userId: 1, isShared: 1 } }
+    );
+
+    if (!story) {
+      return NextResponse.json(
+        { error: 'Story not found' },
+        { status: 404 }
+      );
+    }
+
+    // Same access rules as reading the story
+    if (!story.isShared) {
+      if (!session) {
+        return NextResponse.json(
+          { error: 'Please login to view this story' },
+          { status: 401 }
+        );
+      }
+
+      const isOwner = story.userId?.toString() === session.userId;
+      const privateShare = isOwner ? null : await db.collection('storyShares').findOne({
+        storyId,
+        sharedWithUserId: new ObjectId(session.userId),
+        $or: [
+          { expiresAt: { $exists: false } },
+          { expiresAt: { $gt: new Date() } }
+        ]
+      });
+
+      if (!isOwner && !privateShare) {
+        return NextResponse.json(
+          { error: 'Access denied' },
+          { status: 403 }
+        );
+      }
+    }
+
+    const track = await db.collection('story_audio_tracks').findOne({ storyId });
+    if (!track) {
+      return NextResponse.json(
+        { error: 'Audio track not found' },
+        { status: 404 }
+      );
+    }
+
+    // ?variant=compat serves the AAC/MP3 rendition for clients without Opus
+    const useCompat = request.nextUrl.searchParams.get('variant') === 'compat' && (track.compatAudioData || track.compatAudioDataFileId || track.compatUrl);
+
+    // Tracks uploaded to S3 are served from there (S3 handles ranges)
+    const url = useCompat ? track.compatUrl : track.url;
+    if (url) {
+      return NextResponse.redirect(url, 302);
+    }
+
+    const data = await readMedia(db, track, useCompat ? 'compatAudioData' : 'audioData');
+    if (!data) {
+      return NextResponse.json(
+        { error: 'Audio track not found' },
+        { status: 404 }
+      );
+    }
+    const contentType = (useCompat ? track.compatMimeType : track.mimeType) || 'audio/ogg';
+
+    const headers: Record<string, string> = {
+      'Content-Type': contentType,
+      'Accept-Ranges': 'bytes',
+      'Cache-Control': 'private, max-age=3600',
+    };
+
+    const range = parseRange(request.headers.get('range'), data.length);
+    if (range === 'invalid') {
+      return new NextResponse(null, {
+        status: 416,
+        headers: { ...headers, 'Content-Range': `bytes */${data.length}` },
+      });
+    }
+
+    if (range) {
+      const [start, end] = range;
+      return new NextResponse(data.subarray(start, end + 1), {
+        status: 206,
+        headers: {
+          ...headers,
+          'Content-Range': `bytes ${start}-${end}/${data.length}`,
+          'Content-Length': String(end - start + 1),
+        },
+      });
+    }
+
+    return new NextResponse(data, {
+      status: 200,
+      headers: { ...headers, 'Content-Length': String(data.length) },
+    });
+  } catch (error) {
+    console.error('Audio track fetch error:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch audio track' },
+      { status: 500 }
+    );
+  }
+}
+
+function parseRange(header: string | null, size: number): [number, number] | 'invalid' | null {
+  if (!header) return null;
+
+  const match = /^bytes=(\d*)-(\d*)$/.exec(header.trim());
+  if (!match || (!match[1] && !match[2])) return 'invalid';
+
+  let start: number;
+  let end: number;
+  if (!match[1]) {
+    // Suffix range: last N bytes
+    start = Math.max(0, size - Number(match[2]));
+    end = size - 1;
+  } else {
+    start = Number(match[1]);
+    end = match[2] ? Math.min(Number(match[2]), size - 1) : size - 1;
+  }
+
+  if (start > end || start >= size) return 'invalid';
+  return [start, end];
+}
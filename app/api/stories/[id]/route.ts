@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { getDatabase } from '@/lib/db';
 import { getSession, requireAuth } from '@/lib/auth';
 import { ObjectId } from 'mongodb';
+import { deleteMediaFiles } from '@/lib/media';
 
 export async function DELETE(
   request: NextRequest,
@@ -32,10 +33,20 @@ export async function DELETE(
       _id: new ObjectId(storyId)
     });
     
-    // Delete associated media
+    // Delete associated media, including files stored in GridFS
+    const mediaDocs = await db.collection('story_media')
+      .find({ storyId: new ObjectId(storyId) })
+      .toArray();
+    const trackDocs = await db.collection('story_audio_tracks')
+      .find({ storyId: new ObjectId(storyId) })
+      .toArray();
+    await deleteMediaFiles(db, [...mediaDocs, ...trackDocs]);
     await db.collection('story_media').deleteMany({
       storyId: new ObjectId(storyId)
     });
+    await db.collection('story_audio_tracks').deleteMany({
+      storyId: new ObjectId(storyId)
+    });
     
     // If story was shared, remove from sharedStories
     if (story.isShared) {
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { getDatabase } from '../../../lib/db';
 import { ObjectId } from 'mongodb';
+import { readMediaBase64 } from '@/lib/media';
 import { getSession, requireAuth } from '@/lib/auth';
 import { UserService } from '@/lib/services/userService';
 
@@ -155,20 +156,23 @@ export async function GET(request: NextRequest) {
         .find({ storyId: story._id })
         .toArray();
       
-      // Map media data to pages
-      story.story.pages = story.story.pages.map((page: any) => {
+      // Map media data to pages (stored as Binary/GridFS, or base64 in older stories)
+      story.story.pages = await Promise.all(story.story.pages.map(async (page: any) => {
         const pageMedia = mediaData.find(m => m.pageNumber === page.pageNumber);
         if (pageMedia) {
           // Add media data back to page if it exists
-          if (page.image?.hasImage && pageMedia.imageData) {
-            page.image.imageData = pageMedia.imageData;
+          if (page.image?.hasImage) {
+            page.image.imageData = await readMediaBase64(db, pageMedia, 'imageData') ?? undefined;
           }
-          if (page.audio?.hasAudio && pageMedia.audioData) {
-            page.audio.audioData = pageMedia.audioData;
+          if (page.audio?.hasAudio) {
+            page.audio.audioData = await readMediaBase64(db, pageMedia, 'audioData') ?? undefined;
+            if (page.audio.compat) {
+              page.audio.compat.audioData = await readMediaBase64(db, pageMedia, 'compatAudioData') ?? undefined;
+            }
           }
         }
         return page;
-      });
+      }));
     }
     
     // Check if user has access to this story
@@ -37,9 +37,38 @@ interface StoryPage {
     key?: string; // S3 key
     duration: number;
     format: string;
+    mimeType?: string;
+    compat?: {
+      audioData?: string;
+      url?: string; // S3 URL
+      format: string;
+      mimeType?: string;
+    };
   };
 }
 
+// Build a playable narration source (S3 URL or inline data), preferring the
+// compact rendition and falling back to the compatibility one (AAC/MP3)
+// when the browser can't play it (e.g. Ogg/Opus on older Safari).
+const getAudioSource = (audio: StoryPage['audio']): string | undefined => {
+  if (!audio?.url && !audio?.audioData) return undefined;
+
+  const mimeType = audio.mimeType || 'audio/mp3';
+  const needsCompat =
+    (audio.compat?.url || audio.compat?.audioData) &&
+    typeof Audio !== 'undefined' &&
+    !new Audio().canPlayType(mimeType);
+
+  if (needsCompat && audio.compat) {
+    if (audio.compat.url) return audio.compat.url;
+    const compatMimeType = audio.compat.mimeType || 'audio/mpeg';
+    return `data:${compatMimeType};base64,${audio.compat.audioData}`;
+  }
+  if (audio.url) return audio.url;
+  // Data URLs take the bare type without codec parameters
+  return `data:${mimeType.split(';')[0]};base64,${audio.audioData}`;
+};
+
 interface Story {
   _id: string;
   prompt: string;
@@ -393,14 +422,14 @@ export default function StoryPage() {
     }
   };
 
-  const playAudio = (audioData?: { url?: string; audioData?: string }) => {
+  const playAudio = (audioData?: StoryPage['audio']) => {
     if (!audioData) return;
     
     let audioSource: string | undefined;
     
     if (audioData.url) {
       // S3 URL
-      audioSource = audioData.url;
+      audioSource = getAudioSource(audioData);
     } else if (audioData.audioData) {
       // Base64 data (backward compatibility)
       try {
@@ -413,7 +442,7 @@ export default function StoryPage() {
         }
       } catch {
         // Real base64 audio data
-        audioSource = `data:audio/mp3;base64,${audioData.audioData}`;
+        audioSource = getAudioSource(audioData);
       }
     }
     
@@ -505,10 +534,7 @@ export default function StoryPage() {
               }
               imagePrompt={currentPageData.imagePrompt}
               audioUrl={
-                currentPageData.audio?.url ||
-                (currentPageData.audio?.audioData ?
-                  `data:audio/mp3;base64,${currentPageData.audio.audioData}` :
-                  undefined)
+                getAudioSource(currentPageData.audio)
               }
               audioDuration={currentPageData.audio?.duration}
               interactiveZones={currentPageData.interactiveZones}
@@ -0,0 +1,57 @@
+import { Db, GridFSBucket, ObjectId } from 'mongodb';
+
+// Must match GRIDFS_BUCKET in worker/utils/media_store.py
+const MEDIA_BUCKET = 'media';
+const FILE_ID_SUFFIX = 'FileId';
+
+/**
+ * Read a media field from a story_media / story_audio_tracks document.
+ *
+ * The worker stores media as BSON Binary, or in GridFS (`<field>FileId`)
+ * when it's large. Older documents hold base64 strings, which are still
+ * accepted.
+ */
+export async function readMedia(db: Db, doc: any, field: string): Promise<Buffer | null> {
+  const value = doc?.[field];
+  if (value !== undefined && value !== null) {
+    if (typeof value === 'string') {
+      return Buffer.from(value, 'base64');
+    }
+    // BSON Binary
+    return Buffer.from(value.buffer ?? value);
+  }
+
+  const fileId = doc?.[field + FILE_ID_SUFFIX];
+  if (!fileId) return null;
+
+  const chunks: Buffer[] = [];
+  const bucket = new GridFSBucket(db, { bucketName: MEDIA_BUCKET });
+  for await (const chunk of bucket.openDownloadStream(new ObjectId(fileId))) {
+    chunks.push(chunk as Buffer);
+  }
+  return Buffer.concat(chunks);
+}
+
+/**
+ * Read a media field as base64 text, for clients that embed data URLs.
+ */
+export async function readMediaBase64(db: Db, doc: any, field: string): Promise<string | null> {
+  const value = doc?.[field];
+  if (typeof value === 'string') return value;
+  const data = await readMedia(db, doc, field);
+  return data ? data.toString('base64') : null;
+}
+
+/**
+ * Delete the GridFS files referenced by media documents.
+ */
+export async function deleteMediaFiles(db: Db, docs: any[]): Promise<void> {
+  const bucket = new GridFSBucket(db, { bucketName: MEDIA_BUCKET });
+  for (const doc of docs) {
+    for (const [name, value] of Object.entries(doc)) {
+      if (name.endsWith(FILE_ID_SUFFIX) && value) {
+        await bucket.delete(new ObjectId(value as any));
+      }
+    }
+  }
+}
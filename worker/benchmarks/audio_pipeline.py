@@ -0,0 +1,106 @@
+"""
+Per-page audio pipeline benchmark: NumPy/in-process vs. pydub/ffmpeg.
+
+Runs the gTTS post-processing path (decode, pitch shift, music bed mix,
+sound effect, MP3 encode) on a synthetic narration clip and reports CPU
+and wall time per page for both implementations.
+
+Usage:
+    python -m benchmarks.audio_pipeline [--pages 12] [--seconds 20]
+"""
+import argparse
+import io
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from processors import audio_dsp, audio_processor
+
+
+def make_narration_mp3(seconds: float) -> bytes:
+    """Speech-like test clip: a few modulated partials with pauses."""
+    t = np.arange(int(audio_dsp.SAMPLE_RATE * seconds)) / audio_dsp.SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540, 900)))
+    envelope = (np.sin(2 * np.pi * 3 * t) > -0.3).astype(np.float32)
+    samples = (0.3 * voice * envelope).astype(np.float32)
+    return audio_dsp.encode(audio_dsp.Pcm(samples), format="mp3")
+
+
+def numpy_page(mp3: bytes) -> bytes:
+    """render_page_audio's mix, encoded to a single MP3 like pydub_page.
+
+    render_page_audio also encodes the compat rendition, which the pydub
+    path never did, so the mix steps are called directly here.
+    """
+    narration = audio_dsp.change_speed(audio_dsp.decode(mp3), 1.1)
+    music = audio_processor.generate_background_music(narration.duration, "magical")
+    final = audio_processor.mix_audio(narration, music)
+    final = audio_processor.add_sound_effects(final, "Tap the sun!")
+    return audio_dsp.encode(final, format="mp3")
+
+
+def pydub_page(mp3: bytes) -> bytes:
+    """The pre-NumPy implementation: pydub segments and ffmpeg subprocesses."""
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+
+    audio = AudioSegment.from_mp3(io.BytesIO(mp3))
+    audio = audio._spawn(audio.raw_data, overrides={"frame_rate": int(audio.frame_rate * 1.1)})
+    music = Sine(220).to_audio_segment(duration=len(audio)) - 20
+    mixed = audio.overlay(music[:len(audio)])
+    mixed = mixed + (Sine(880).to_audio_segment(duration=200) - 10)
+    buffer = io.BytesIO()
+    mixed.export(buffer, format="mp3")
+    return buffer.getvalue()
+
+
+def measure(fn: Callable[[bytes], bytes], mp3: bytes, pages: int) -> Dict[str, float]:
+    cpu: List[float] = []
+    wall: List[float] = []
+    for _ in range(pages):
+        # Includes child ffmpeg processes in the CPU figure
+        cpu_start = time.process_time() + _children_cpu()
+        wall_start = time.perf_counter()
+        fn(mp3)
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() + _children_cpu() - cpu_start)
+    return {
+        "cpu_ms": statistics.mean(cpu) * 1000,
+        "wall_ms": statistics.mean(wall) * 1000,
+        "wall_p95_ms": float(np.percentile(wall, 95)) * 1000
+    }
+
+
+def _children_cpu() -> float:
+    import os
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    args = parser.parse_args()
+
+    audio_processor.prime_audio_library()
+    mp3 = make_narration_mp3(args.seconds)
+
+    print(f"{args.pages} pages, {args.seconds:.0f}s narration each")
+    print(f"{'path':<10}{'cpu/page':>12}{'wall/page':>12}{'wall p95':>12}")
+    for name, fn in (("numpy", numpy_page), ("pydub", pydub_page)):
+        try:
+            result = measure(fn, mp3, args.pages)
+        except Exception as e:
+            print(f"{name:<10}unavailable: {e}")
+            continue
+        print(
+            f"{name:<10}{result['cpu_ms']:>10.1f}ms{result['wall_ms']:>10.1f}ms"
+            f"{result['wall_p95_ms']:>10.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
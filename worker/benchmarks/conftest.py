@@ -0,0 +1,32 @@
+"""
+pytest configuration for the microbenchmarks (`pytest benchmarks`).
+
+Runs are stored in benchmarks/baselines rather than ./.benchmarks, and
+`--benchmark-compare` fails the run when a benchmark's median is more
+than REGRESSION_THRESHOLD slower than the stored baseline, unless
+`--benchmark-compare-fail` is given explicitly.
+"""
+import os
+import sys
+
+# Same defaults as tests/conftest.py
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("GEMINI_API_KEY", "test-gemini-api-key")
+os.environ.setdefault("USE_MOCK_STORIES", "true")
+os.environ.setdefault("USE_MOCK_AUDIO", "true")
+os.environ.setdefault("NARRATION_CACHE_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+REGRESSION_THRESHOLD = "median:35%"
+
+
+def pytest_configure(config):
+    # Runs before pytest-benchmark's own (trylast) configure reads these
+    if config.getoption("benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{BASELINE_STORAGE}"
+    if config.getoption("benchmark_compare", None) and not config.getoption("benchmark_compare_fail", None):
+        from pytest_benchmark.utils import parse_compare_fail
+
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
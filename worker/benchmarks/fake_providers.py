@@ -0,0 +1,212 @@
+"""
+Offline stand-ins for Gemini (text and TTS), Imagen and gTTS.
+
+`install` swaps the SDK entry points behind the live providers
+(`genai.GenerativeModel`, `google.genai.Client`, `gTTS`) for fakes, so
+the real processor code (prompting, response parsing, audio splitting,
+placeholders) runs without the network. Each fake waits for a latency
+drawn from a log-normal distribution and fails at a configurable rate.
+Like the real Imagen SDK, the fake image call blocks its thread.
+"""
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from processors import audio_dsp
+
+TTS_SAMPLE_RATE = 24000
+TTS_MIME_TYPE = f"audio/L16;codec=pcm;rate={TTS_SAMPLE_RATE}"
+# Narration speed of the fake voice
+SECONDS_PER_CHARACTER = 0.06
+PAGE_PAUSE_SECONDS = 2.0
+
+
+class FakeProviderError(Exception):
+    """Simulated provider failure (rate limit or server error)."""
+
+
+@dataclass
+class Latency:
+    """Log-normal latency around `median_ms`, failing with `error_rate`."""
+
+    median_ms: float
+    sigma: float = 0.3
+    error_rate: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+    def maybe_fail(self, rng: random.Random, provider: str) -> None:
+        if rng.random() < self.error_rate:
+            raise FakeProviderError(f"429 {provider}: Resource has been exhausted (simulated)")
+
+
+@dataclass
+class FakeProfile:
+    """Latency and error settings for every fake provider."""
+
+    text: Latency
+    image: Latency
+    tts: Latency
+    gtts: Latency
+    pages: int = 10
+    image_size: tuple = (512, 384)
+    seed: Optional[int] = None
+
+
+class _Fakes:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.rng = random.Random(profile.seed)
+        self.calls: Dict[str, int] = {}
+        self._png = self._render_png(profile.image_size)
+        self._gtts_mp3 = audio_dsp.encode(audio_dsp.Pcm(_speech(3.0)), format="mp3")
+
+    def count(self, provider: str) -> None:
+        self.calls[provider] = self.calls.get(provider, 0) + 1
+
+    @staticmethod
+    def _render_png(size) -> bytes:
+        # Noise keeps the PNG about as incompressible as an illustration
+        pixels = np.random.default_rng(0).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def unique_png(self) -> bytes:
+        # Bytes after IEND are ignored by decoders; they keep content-addressed
+        # S3 keys distinct, as real images would be
+        return self._png + os.urandom(16)
+
+    def story(self, prompt: str) -> str:
+        title = re.search(r'based on this prompt: "([^"]*)"', prompt)
+        pages = [
+            {
+                "pageNumber": number,
+                "text": f"Page {number}: the little fox found another clue and followed it "
+                        f"past the river, over the hill and into the quiet woods.",
+                "imagePrompt": f"a little fox following clue number {number} through the woods",
+                "interactiveElement": "Tap the fox!"
+            }
+            for number in range(1, self.profile.pages + 1)
+        ]
+        return json.dumps({"title": title.group(1) if title else "A Fox Story", "pages": pages})
+
+
+_fakes: Optional[_Fakes] = None
+
+
+def _speech(seconds: float, sample_rate: int = audio_dsp.SAMPLE_RATE) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540)))
+    return (0.3 * voice).astype(np.float32)
+
+
+def _tts_pcm16(texts: List[str]) -> bytes:
+    parts = []
+    for i, text in enumerate(texts):
+        if i:
+            parts.append(np.zeros(int(PAGE_PAUSE_SECONDS * TTS_SAMPLE_RATE), dtype=np.float32))
+        parts.append(_speech(max(0.5, len(text) * SECONDS_PER_CHARACTER), TTS_SAMPLE_RATE))
+    return audio_dsp.to_int16(np.concatenate(parts)).tobytes()
+
+
+def _audio_response(data: bytes, mime_type: str):
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=data, mime_type=mime_type))
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(candidates=[candidate])
+
+
+class FakeGenerativeModel:
+    """Stands in for `google.generativeai.GenerativeModel` (text)."""
+
+    def __init__(self, model_name: str, *args, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, prompt: str, generation_config=None, **kwargs):
+        fakes = _fakes
+        fakes.count("gemini_text")
+        await asyncio.sleep(fakes.profile.text.sample(fakes.rng))
+        fakes.profile.text.maybe_fail(fakes.rng, "gemini_text")
+        return SimpleNamespace(text=fakes.story(prompt))
+
+
+class _FakeModels:
+    def generate_images(self, model: str, prompt: str, config=None):
+        fakes = _fakes
+        fakes.count("imagen")
+        # Blocking, like the real SDK call
+        time.sleep(fakes.profile.image.sample(fakes.rng))
+        fakes.profile.image.maybe_fail(fakes.rng, "imagen")
+        count = getattr(config, "number_of_images", 1) or 1
+        return SimpleNamespace(generated_images=[
+            SimpleNamespace(image=SimpleNamespace(image_bytes=fakes.unique_png()))
+            for _ in range(count)
+        ])
+
+
+class _FakeAsyncModels:
+    async def generate_content(self, model: str, contents: str, config=None):
+        from processors.audio_processor_gemini import PAGE_BREAK
+
+        fakes = _fakes
+        fakes.count("gemini_tts")
+        await asyncio.sleep(fakes.profile.tts.sample(fakes.rng))
+        fakes.profile.tts.maybe_fail(fakes.rng, "gemini_tts")
+        text = contents.split("Text to narrate:", 1)[-1]
+        texts = [page.strip() for page in text.split(PAGE_BREAK)]
+        return _audio_response(_tts_pcm16(texts), TTS_MIME_TYPE)
+
+
+class FakeGenAIClient:
+    """Stands in for `google.genai.Client` (Gemini TTS and Imagen)."""
+
+    def __init__(self, *args, **kwargs):
+        self.models = _FakeModels()
+        self.aio = SimpleNamespace(models=_FakeAsyncModels())
+
+
+class FakeGTTS:
+    """Stands in for `gtts.gTTS`; writes a short pre-encoded MP3."""
+
+    def __init__(self, text: str, lang: str = "en", slow: bool = False):
+        self.text = text
+
+    def write_to_fp(self, fp) -> None:
+        fakes = _fakes
+        fakes.count("gtts")
+        time.sleep(fakes.profile.gtts.sample(fakes.rng))
+        fakes.profile.gtts.maybe_fail(fakes.rng, "gtts")
+        fp.write(fakes._gtts_mp3)
+
+
+def install(profile: FakeProfile) -> Dict[str, int]:
+    """Route every provider call to the fakes; returns the live call counts."""
+    global _fakes
+    import google.generativeai
+    import gtts
+    from google import genai as google_genai
+
+    from processors import image_processor_gemini, providers
+
+    _fakes = _Fakes(profile)
+    google.generativeai.GenerativeModel = FakeGenerativeModel
+    google_genai.Client = FakeGenAIClient
+    gtts.gTTS = FakeGTTS
+    # Rebuilt on next use, with the fake clients
+    providers._providers = None
+    image_processor_gemini._processor = None
+    return _fakes.calls
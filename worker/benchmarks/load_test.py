@@ -0,0 +1,308 @@
+"""
+Offline end-to-end load test of the story worker.
+
+Enqueues N synthetic story jobs and runs the real `process_jobs` loop
+against fake Gemini/Imagen/gTTS providers (benchmarks.fake_providers) or
+a recorded provider cassette (`--replay DIR`, see processors.providers),
+moto or LocalStack S3, and a local mongod (or mongomock with
+`--mongodb-uri mock://`, for a quick smoke run). Reports throughput,
+time to first page, story latency percentiles, peak RSS and loop stalls.
+
+Usage:
+    python -m benchmarks.load_test [--jobs 20] [--concurrency 1] [--s3 moto]
+        [--mongodb-uri mongodb://localhost:27017] [--latency-scale 0.1]
+        [--replay DIR [--replay-latency synthetic] [--rate-limit-rate 0.05]] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+LOADTEST_DATABASE = "babel-books-loadtest"
+LOADTEST_BUCKET = "babel-books-loadtest"
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="job loops in this process (one per worker replica)")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--mongodb-uri", default=os.getenv("MONGODB_TEST_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--s3", choices=("off", "moto", "endpoint"), default="off",
+                        help="moto: in-process server; endpoint: AWS_ENDPOINT_URL (e.g. LocalStack)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiply every fake provider latency")
+    parser.add_argument("--text-ms", type=float, default=4000)
+    parser.add_argument("--image-ms", type=float, default=9000)
+    parser.add_argument("--tts-ms", type=float, default=6000)
+    parser.add_argument("--gtts-ms", type=float, default=800)
+    parser.add_argument("--sigma", type=float, default=0.3, help="log-normal latency spread")
+    parser.add_argument("--text-errors", type=float, default=0.0)
+    parser.add_argument("--image-errors", type=float, default=0.0)
+    parser.add_argument("--tts-errors", type=float, default=0.0)
+    parser.add_argument("--gtts-errors", type=float, default=0.0)
+    parser.add_argument("--replay", metavar="DIR",
+                        help="serve provider calls from this cassette instead of the fakes")
+    parser.add_argument("--replay-latency", choices=("recorded", "synthetic", "none"), default="recorded")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="replay: chance a call starts a burst of 429s")
+    parser.add_argument("--rate-limit-burst", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Set the worker's settings in the environment.
+
+    Settings are built on first access through get_settings(), so this
+    has to run before anything reads them.
+    """
+    os.environ["MONGODB_URI"] = (
+        "mongodb://localhost:27017" if args.mongodb_uri.startswith("mock://") else args.mongodb_uri
+    )
+    os.environ["MONGODB_DATABASE"] = LOADTEST_DATABASE
+    os.environ["GEMINI_API_KEY"] = "load-test-fake-key"
+    os.environ["USE_MOCK_STORIES"] = "false"
+    os.environ["USE_MOCK_AUDIO"] = "false"
+    os.environ["NARRATION_CACHE_ENABLED"] = "false"
+    os.environ["PAGE_PROCESSING_DELAY"] = "0"
+    os.environ["JOB_CHECK_INTERVAL"] = "0.2"
+    if args.replay:
+        os.environ["PROVIDER_MODE"] = "replay"
+        os.environ["PROVIDER_CASSETTE_DIR"] = args.replay
+        os.environ["PROVIDER_REPLAY_LATENCY"] = args.replay_latency
+        os.environ["PROVIDER_REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+        os.environ["PROVIDER_REPLAY_429_RATE"] = str(args.rate_limit_rate)
+        os.environ["PROVIDER_REPLAY_429_BURST"] = str(args.rate_limit_burst)
+        os.environ["PROVIDER_REPLAY_SEED"] = str(args.seed)
+    if args.s3 != "off":
+        os.environ["ENABLE_S3_STORAGE"] = "true"
+        os.environ["S3_BUCKET_NAME"] = LOADTEST_BUCKET
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        os.environ.setdefault("AWS_REGION", "us-east-1")
+
+
+def start_moto():
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    os.environ["AWS_ENDPOINT_URL"] = f"http://{host}:{port}"
+    return server
+
+
+def connect(uri: str):
+    if uri.startswith("mock://"):
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(uri)
+
+
+async def enqueue(db, count: int) -> List:
+    job_ids = []
+    for i in range(count):
+        now = datetime.utcnow()
+        story = {
+            "prompt": f"A curious fox looks for clue number {i}",
+            "childAge": "3-4 years",
+            "textLanguage": "English",
+            "narrationLanguage": "English",
+            "tone": "magical",
+            "status": "pending",
+            "createdAt": now,
+            "updatedAt": now
+        }
+        result = await db.stories.insert_one(story)
+        job = await db.jobs.insert_one({
+            "type": "generate_story",
+            "storyId": result.inserted_id,
+            "data": story,
+            "status": "pending",
+            "createdAt": now,
+            "attempts": 0
+        })
+        job_ids.append(job.inserted_id)
+    return job_ids
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    import main_progressive
+    from utils import progressive_save
+    from utils.indexes import ensure_indexes
+    from utils.job_archive import ARCHIVE_COLLECTION
+    from utils.loop_monitor import get_loop_monitor
+    from utils.memory_budget import current_rss_bytes
+    from benchmarks.fake_providers import FakeProfile, Latency, install
+
+    from processors.providers import get_providers
+
+    def latency(median_ms: float, error_rate: float) -> Latency:
+        return Latency(median_ms * args.latency_scale, args.sigma, error_rate)
+
+    if args.replay:
+        calls = get_providers().calls
+    else:
+        calls = install(FakeProfile(
+            text=latency(args.text_ms, args.text_errors),
+            image=latency(args.image_ms, args.image_errors),
+            tts=latency(args.tts_ms, args.tts_errors),
+            gtts=latency(args.gtts_ms, args.gtts_errors),
+            pages=args.pages,
+            seed=args.seed
+        ))
+
+    if args.s3 != "off":
+        from utils.s3 import get_s3_client
+
+        get_s3_client().create_bucket(Bucket=LOADTEST_BUCKET)
+
+    client = connect(args.mongodb_uri)
+    await client.drop_database(LOADTEST_DATABASE)
+    db = client[LOADTEST_DATABASE]
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        print(f"Skipping indexes: {e}")
+    main_progressive.db = db
+
+    # Time each story's first page write
+    first_page: Dict = {}
+    write_pages = progressive_save.write_pages
+
+    async def observed_write_pages(db, story_id, *args, **kwargs):
+        await write_pages(db, story_id, *args, **kwargs)
+        first_page.setdefault(story_id, datetime.utcnow())
+
+    progressive_save.write_pages = observed_write_pages
+
+    peak_rss = current_rss_bytes() or 0
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, current_rss_bytes() or 0)
+            await asyncio.sleep(0.1)
+
+    job_ids = await enqueue(db, args.jobs)
+    started = time.perf_counter()
+    workers = [asyncio.create_task(main_progressive.process_jobs()) for _ in range(args.concurrency)]
+    background = [
+        asyncio.create_task(sample_rss()),
+        asyncio.create_task(get_loop_monitor().run(main_progressive.shutdown_event))
+    ]
+
+    finished = []
+    deadline = started + args.timeout
+    while time.perf_counter() < deadline:
+        finished = await db.jobs.find(
+            {"_id": {"$in": job_ids}, "status": {"$in": ["completed", "failed"]}}
+        ).to_list(None)
+        finished += await db[ARCHIVE_COLLECTION].find({"_id": {"$in": job_ids}}).to_list(None)
+        if len(finished) >= args.jobs:
+            break
+        await asyncio.sleep(0.25)
+    elapsed = time.perf_counter() - started
+
+    main_progressive.shutdown_event.set()
+    await asyncio.gather(*workers, return_exceptions=True)
+    for task in background:
+        task.cancel()
+    progressive_save.write_pages = write_pages
+
+    stories = {job["storyId"]: job for job in finished}
+    latencies = [
+        (job["finishedAt"] - job["createdAt"]).total_seconds()
+        for job in finished if job.get("finishedAt")
+    ]
+    first_pages = [
+        (first_page[story_id] - job["createdAt"]).total_seconds()
+        for story_id, job in stories.items() if story_id in first_page
+    ]
+    completed = sum(1 for job in finished if job["status"] == "completed")
+
+    return {
+        "jobs": args.jobs,
+        "completed": completed,
+        "failed": len(finished) - completed,
+        "unfinished": args.jobs - len(finished),
+        "elapsed_seconds": round(elapsed, 2),
+        "jobs_per_minute": round(len(finished) / elapsed * 60, 2) if elapsed else None,
+        "time_to_first_page": summarize(first_pages),
+        "story_latency": summarize(latencies),
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+        "event_loop": {
+            "max_lag_seconds": get_loop_monitor().stats()["max_lag_seconds"],
+            "stalls": get_loop_monitor().stats()["stalls"]
+        },
+        "provider_calls": dict(calls)
+    }
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        "mean": rounded(statistics.mean(values)) if values else None,
+        "p50": rounded(percentile(values, 50)),
+        "p95": rounded(percentile(values, 95)),
+        "p99": rounded(percentile(values, 99))
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{report['jobs']} jobs: {report['completed']} completed, {report['failed']} failed, "
+        f"{report['unfinished']} unfinished in {report['elapsed_seconds']}s"
+    )
+    print(f"{'throughput':<20}{report['jobs_per_minute']} jobs/min")
+    for name in ("time_to_first_page", "story_latency"):
+        stats = report[name]
+        print(
+            f"{name.replace('_', ' '):<20}p50 {stats['p50']}s  p95 {stats['p95']}s  "
+            f"p99 {stats['p99']}s"
+        )
+    print(f"{'peak RSS':<20}{report['peak_rss_mb']} MB")
+    print(
+        f"{'event loop':<20}max lag {report['event_loop']['max_lag_seconds']}s, "
+        f"{report['event_loop']['stalls']} stalls"
+    )
+    print(f"{'provider calls':<20}{report['provider_calls']}")
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    configure_environment(args)
+    server = start_moto() if args.s3 == "moto" else None
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if server:
+            server.stop()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
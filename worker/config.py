@@ -30,11 +30,100 @@ class Settings(BaseSettings):
     use_mock_audio: bool = False
     enable_s3_storage: bool = False
     
+    # S3 uploads (shared client, bounded upload executor)
+    s3_upload_workers: int = 8
+    s3_upload_max_pending: int = 64
+    # Content-addressed keys: skip uploads of bytes already in S3
+    s3_dedup_head_check: bool = True
+    s3_known_keys_max: int = 100_000
+    
     # Application settings
     job_check_interval: float = 1.0
     job_error_retry_delay: float = 5.0
     page_processing_delay: float = 0.5
     log_level: str = "INFO"
+    ensure_indexes_on_startup: bool = True
+
+    # Finished jobs move to jobs_archive after this long (0 disables)
+    job_retention_hours: float = 24.0
+    job_archive_interval_seconds: float = 300.0
+    job_archive_batch_size: int = 500
+    # Archived jobs expire via a TTL index after this many days (0 keeps them)
+    job_archive_ttl_days: int = 30
+
+    # Job counts for /metrics come from one aggregation refreshed this often
+    metrics_queue_depth_interval_seconds: float = 15.0
+
+    # Store a span timeline per job in job_traces, expired after this many days
+    job_traces_enabled: bool = True
+    job_trace_ttl_days: int = 7
+
+    # Event-loop lag probe; stalls past the threshold are logged with a stack (0 disables)
+    loop_lag_interval_ms: int = 100
+    loop_lag_threshold_ms: int = 250
+
+    # Bearer token for /debug/profile and /debug/heap (disabled when unset)
+    debug_token: Optional[str] = None
+    debug_tracemalloc_frames: int = 10
+    # Trace allocations from startup so jobs record peak traced memory (slows allocation)
+    job_tracemalloc: bool = False
+
+    # Narration cache
+    narration_cache_enabled: bool = True
+    narration_cache_dir: str = "/tmp/babel-books/narration-cache"
+    narration_cache_max_bytes: int = 512 * 1024 * 1024
+
+    # Executor for blocking audio work (gTTS, decode/mix/encode)
+    audio_executor_workers: int = 4
+    audio_executor_max_pending: int = 32
+    executor_queue_warn_seconds: float = 1.0
+
+    # Narrate a whole story in one Gemini TTS request, split per page
+    batch_narration: bool = True
+
+    # Store narration as speech-tuned Opus plus an AAC/MP3 rendition
+    narration_transcode: bool = True
+    narration_opus_bitrate: int = 24000
+    narration_compat_bitrate: int = 48000
+
+    # Also build one continuous narration track per story
+    story_track_enabled: bool = True
+    story_track_gap_ms: int = 500
+
+    # Story status/progress is written at most this often (terminal states immediately)
+    progress_flush_interval_ms: int = 2000
+
+    # Coalesce page saves: flush after this many pages or this long
+    page_write_batch_size: int = 8
+    page_write_max_delay_ms: int = 1000
+
+    # Media larger than this is stored in GridFS instead of inline Binary
+    media_gridfs_threshold_bytes: int = 4 * 1024 * 1024
+
+    # Generated assets are spooled to disk until stored (system temp dir if unset)
+    asset_spool_dir: Optional[str] = None
+    # Stop claiming new jobs while the process RSS exceeds this (0 disables)
+    worker_memory_budget_mb: int = 1024
+
+    # Directory with bundled music/ and sounds/ files (synthesized if unset)
+    audio_assets_dir: Optional[str] = None
+
+    # Provider calls: live, record (live, written to the cassette) or replay (cassette only)
+    provider_mode: str = "live"
+    provider_cassette_dir: str = "/tmp/babel-books/provider-cassette"
+    # Replay latency: recorded, synthetic (log-normal around the recorded median) or none
+    provider_replay_latency: str = "recorded"
+    provider_replay_latency_scale: float = 1.0
+    # Only replay exact request matches (otherwise recordings are reused in order)
+    provider_replay_strict: bool = False
+    # Chance a replayed call starts a burst of 429s, and the calls per burst
+    provider_replay_429_rate: float = 0.0
+    provider_replay_429_burst: int = 3
+    provider_replay_seed: int = 0
+
+    # Warm up clients, caches and executors before claiming jobs (/ready waits for it)
+    warmup_enabled: bool = True
+    warmup_step_timeout_seconds: float = 60.0
     
     @field_validator("mongodb_uri")
     @classmethod
@@ -50,6 +139,13 @@ class Settings(BaseSettings):
             raise ValueError("Invalid Gemini API key")
         return v
     
+    @field_validator("provider_mode")
+    @classmethod
+    def validate_provider_mode(cls, v):
+        if v not in ("live", "record", "replay"):
+            raise ValueError("PROVIDER_MODE must be live, record or replay")
+        return v
+    
     @field_validator("enable_s3_storage")
     @classmethod
     def validate_s3_config(cls, v, info):
@@ -66,11 +162,43 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Build the settings on first use, so importing modules stays cheap."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class LazySettings:
+    """Stands in for the Settings singleton until an attribute is used."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+    def __delattr__(self, name):
+        delattr(get_settings(), name)
+
+
 # Singleton instance
-settings = Settings()
+settings = LazySettings()
 
 
 # Export commonly used values for backward compatibility
-MONGODB_URI = settings.mongodb_uri
-MONGODB_DATABASE = settings.mongodb_database
-GEMINI_API_KEY = settings.gemini_api_key
\ No newline at end of file
+_LEGACY_NAMES = {
+    "MONGODB_URI": "mongodb_uri",
+    "MONGODB_DATABASE": "mongodb_database",
+    "GEMINI_API_KEY": "gemini_api_key"
+}
+
+
+def __getattr__(name):
+    if name in _LEGACY_NAMES:
+        return getattr(get_settings(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
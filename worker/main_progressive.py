@@ -2,22 +2,54 @@
 Production-ready worker service with progressive story generation.
 """
 import asyncio
+import hmac
 import logging
 import signal
 import sys
+import time
+import tracemalloc
 from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import Optional
 
 import structlog
-from fastapi import FastAPI, HTTPException
+from bson import ObjectId
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from config import settings
-from processors import story_generator, image_processor, audio_processor
-from utils.db import update_story_status
+from processors import story_generator, image_processor, audio_processor, audio_dsp, audio_transcoder
+from processors.providers import get_providers
+from processors.story_track import StoryTrackBuilder
+from utils.asset_spool import AssetSpool
+from utils.indexes import ensure_indexes
+from utils.job_archive import run_job_archiver
+from utils.job_usage import JobUsage, current_usage, track_usage
+from utils.loop_monitor import get_loop_monitor
+from utils.memory_budget import get_memory_budget
+from utils.profiling import get_heap_tracker, sample_stacks
+from utils.metrics import (
+    JOB_SECONDS,
+    JOBS_IN_FLIGHT,
+    observe_job_usage,
+    queue_depth,
+    record_fallback,
+    record_media,
+    run_queue_depth_refresher,
+    write_timer
+)
+from utils.progress import StoryProgress
+from utils.s3 import get_s3_client, upload_stats
+from utils.warmup import Warmup, WarmupStep
+from utils.tracing import TRACE_COLLECTION, JobTrace, current_span, save_trace, span, to_otlp_json
+from utils.executors import executor_stats, get_audio_executor, get_upload_executor, shutdown_executors
 from utils.progressive_save import (
     save_story_metadata,
-    save_page_progressively,
+    PageWriteBatcher,
+    upload_page_assets,
+    save_story_track,
     mark_story_completed
 )
 
@@ -46,7 +78,13 @@ logger = structlog.get_logger()
 db_client: Optional[AsyncIOMotorClient] = None
 db: Optional[AsyncIOMotorDatabase] = None
 job_processor_task: Optional[asyncio.Task] = None
+job_archiver_task: Optional[asyncio.Task] = None
+queue_depth_task: Optional[asyncio.Task] = None
+loop_monitor_task: Optional[asyncio.Task] = None
+warmup_task: Optional[asyncio.Task] = None
+warmup = Warmup()
 shutdown_event = asyncio.Event()
+profile_lock = asyncio.Lock()
 
 
 async def connect_to_mongodb():
@@ -72,32 +110,56 @@ async def close_mongodb_connection():
         logger.info("Closed MongoDB connection")
 
 
+NARRATION_FIELDS = ("audioData", "compatAudioData")
+
+
+def media_size(entry: Optional[dict], fields) -> int:
+    """Bytes of media (bytes or spooled) held in the given fields."""
+    if not entry:
+        return 0
+    return sum(len(entry[field]) for field in fields if entry.get(field) is not None)
+
+
+def finish_usage(usage: JobUsage) -> dict:
+    """Summarize a job's resource usage for its document and metrics."""
+    summary = usage.summary()
+    observe_job_usage(summary)
+    return summary
+
+
 async def process_single_job(job: dict) -> None:
     """Process a single job with error handling."""
     job_id = str(job["_id"])
     story_id = job["storyId"]
     
+    # Generated assets are spooled here and passed along as references
+    spool = AssetSpool(str(story_id))
+    uploads = {}
+    track_builder = None
+    # Status/progress writes are debounced; terminal states go out at once
+    progress = StoryProgress(db, story_id)
+    started = time.perf_counter()
+    job_status = "failed"
+    # Resources charged to this job (see process_job)
+    usage = current_usage() or JobUsage()
+    JOBS_IN_FLIGHT.inc()
+    
     try:
         logger.info("Processing job", job_id=job_id, story_id=story_id)
         
-        # Update job status
-        await db.jobs.update_one(
-            {"_id": job["_id"]},
-            {"$set": {"status": "processing"}}
-        )
-        
         # Extract story data
         story_data_from_job = job["data"]
         
         # 1. Generate story text
-        await update_story_status(db, story_id, "generating_text")
+        await progress.update("generating_text")
         
-        story_data = await story_generator.generate(
-            prompt=story_data_from_job["prompt"],
-            age_group=story_data_from_job.get("childAge", "3-4 years"),
-            tone=story_data_from_job.get("tone", "playful"),
-            language=story_data_from_job.get("textLanguage", "English")
-        )
+        with span("generate_text"):
+            story_data = await story_generator.generate(
+                prompt=story_data_from_job["prompt"],
+                age_group=story_data_from_job.get("childAge", "3-4 years"),
+                tone=story_data_from_job.get("tone", "playful"),
+                language=story_data_from_job.get("textLanguage", "English")
+            )
         
         # 2. Save story metadata
         await save_story_metadata(db, story_id, story_data)
@@ -110,9 +172,7 @@ async def process_single_job(job: dict) -> None:
             total_pages=total_pages
         )
         
-        await update_story_status(
-            db, 
-            story_id, 
+        await progress.update(
             "generating_images",
             progress={"status": "generating_all_images", "total_pages": total_pages}
         )
@@ -120,16 +180,19 @@ async def process_single_job(job: dict) -> None:
         # Generate all images at once
         all_images = []
         try:
-            all_images = await image_processor.generate_story_images(
-                story_data["pages"],
-                age_group=story_data_from_job.get("childAge", "3-4 years"),
-                story_context=story_data
-            )
+            with span("generate_images", pages=total_pages):
+                all_images = await image_processor.generate_story_images(
+                    story_data["pages"],
+                    age_group=story_data_from_job.get("childAge", "3-4 years"),
+                    story_context=story_data,
+                    spool=spool
+                )
             logger.info(
                 "Batch image generation completed",
                 story_id=story_id,
                 images_generated=len(all_images)
             )
+            record_media("image", sum(media_size(image, ("imageData",)) for image in all_images))
         except Exception as e:
             logger.error(
                 "Batch image generation failed",
@@ -137,15 +200,61 @@ async def process_single_job(job: dict) -> None:
                 error=str(e)
             )
             # Create placeholder images for all pages
+            record_fallback("image_generation")
             all_images = [None] * total_pages
         
         # 4. Process audio and save pages progressively
-        await update_story_status(
-            db,
-            story_id,
-            "generating_audio"
+        await progress.update("generating_audio")
+        
+        narration_language = story_data_from_job.get(
+            "narrationLanguage",
+            story_data_from_job.get("textLanguage", "English")
         )
         
+        # Cached and batched narration up front (one TTS call); pages it
+        # misses are narrated one by one below, as each page is saved
+        narrations = {}
+        try:
+            with span("generate_narration", pages=total_pages, language=narration_language):
+                audio_list = await audio_processor.generate_story_narration(
+                    story_data["pages"],
+                    language=narration_language,
+                    age_group=story_data_from_job.get("childAge", "3-4 years")
+                )
+            for audio in audio_list:
+                record_media("narration", media_size(audio, NARRATION_FIELDS))
+                narrations[audio["pageNumber"]] = await get_audio_executor().run(
+                    spool.spool_fields, audio, NARRATION_FIELDS
+                )
+        except Exception as e:
+            record_fallback("story_narration")
+            logger.error(
+                "Story narration failed, narrating per page",
+                story_id=story_id,
+                error=str(e)
+            )
+        
+        # Continuous narration track, appended to as pages finish
+        if settings.story_track_enabled:
+            track_builder = StoryTrackBuilder(
+                story_id,
+                [page["pageNumber"] for page in story_data["pages"]]
+            )
+        
+        # Start S3 uploads for every page's ready assets at once; each page
+        # waits only for its own uploads before it is saved
+        if settings.enable_s3_storage:
+            for i, page in enumerate(story_data["pages"]):
+                uploads[page["pageNumber"]] = asyncio.create_task(upload_page_assets(
+                    story_id,
+                    page["pageNumber"],
+                    image_data=all_images[i] if i < len(all_images) else None,
+                    audio_data=narrations.get(page["pageNumber"])
+                ))
+        
+        # Pages that are ready together are saved with one story update
+        page_writer = PageWriteBatcher(db, story_id, total_pages, progress=progress)
+        
         for i, page in enumerate(story_data["pages"]):
             page_num = i + 1
             logger.info(
@@ -155,58 +264,90 @@ async def process_single_job(job: dict) -> None:
                 total=total_pages
             )
             
-            # Update progress
-            await update_story_status(
-                db, 
-                story_id, 
-                "generating_assets",
-                progress={"current_page": page_num, "total_pages": total_pages}
-            )
-            
             # Get image data from batch results
             image_data = all_images[i] if i < len(all_images) else None
             
-            # Generate audio
-            audio_data = None
-            try:
-                audio_list = await audio_processor.generate_narration(
-                    [page],
-                    language=story_data_from_job.get(
-                        "narrationLanguage",
-                        story_data_from_job.get("textLanguage", "English")
-                    ),
-                    tone=story_data_from_job.get("tone", "playful"),
-                    age_group=story_data_from_job.get("childAge", "3-4 years")
+            # Generate audio unless the story narration already covered this page
+            audio_data = narrations.get(page["pageNumber"])
+            if audio_data is None:
+                # Show the pages done so far before the slow per-page call
+                await page_writer.flush()
+                try:
+                    with span("generate_page_narration", page_number=page["pageNumber"]):
+                        audio_list = await audio_processor.generate_narration(
+                            [page],
+                            language=narration_language,
+                            tone=story_data_from_job.get("tone", "playful"),
+                            age_group=story_data_from_job.get("childAge", "3-4 years")
+                        )
+                    audio_data = audio_list[0] if audio_list else None
+                    record_media("narration", media_size(audio_data, NARRATION_FIELDS))
+                except Exception as e:
+                    record_fallback("page_without_audio")
+                    logger.error(
+                        "Audio generation failed",
+                        story_id=story_id,
+                        page=page_num,
+                        error=str(e)
+                    )
+            
+            # Save page with assets (already uploaded ones carry their URLs)
+            saved_image, saved_audio = image_data, audio_data
+            if page["pageNumber"] in uploads:
+                with span("wait_page_uploads", page_number=page["pageNumber"]):
+                    uploaded_image, uploaded_audio = await uploads.pop(page["pageNumber"])
+                saved_image = uploaded_image
+                if uploaded_audio is not None:
+                    saved_audio = uploaded_audio
+            await page_writer.add(
+                page,
+                image_data=saved_image,
+                audio_data=saved_audio
+            )
+            
+            if track_builder:
+                await get_audio_executor().run(
+                    track_builder.add_page,
+                    page["pageNumber"],
+                    audio_data.get("audioData") if audio_data else None
                 )
-                audio_data = audio_list[0] if audio_list else None
+            
+            # Rate limiting for per-page audio generation
+            if page["pageNumber"] not in narrations:
+                await asyncio.sleep(settings.page_processing_delay)
+        
+        await page_writer.flush()
+        
+        # Store the continuous track; a failure here doesn't fail the story
+        audio_track = None
+        if track_builder:
+            try:
+                track = await get_audio_executor().run(track_builder.finalize)
+                if track:
+                    record_media("track", media_size(track, NARRATION_FIELDS))
+                    audio_track = await save_story_track(db, story_id, track)
             except Exception as e:
                 logger.error(
-                    "Audio generation failed",
+                    "Story track generation failed",
                     story_id=story_id,
-                    page=page_num,
                     error=str(e)
                 )
-            
-            # Save page with assets
-            await save_page_progressively(
-                db,
-                story_id,
-                page,
-                image_data=image_data,
-                audio_data=audio_data
-            )
-            
-            # Rate limiting for audio generation
-            await asyncio.sleep(settings.page_processing_delay)
         
-        # 4. Mark story as completed
-        await mark_story_completed(db, story_id)
+        # 4. Mark story as completed (supersedes any pending progress)
+        await progress.close(discard=True)
+        await mark_story_completed(db, story_id, audio_track)
         
         # 5. Mark job as completed
-        await db.jobs.update_one(
-            {"_id": job["_id"]},
-            {"$set": {"status": "completed"}}
-        )
+        with write_timer("job_status"):
+            await db.jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": "completed",
+                    "finishedAt": datetime.utcnow(),
+                    "usage": finish_usage(usage)
+                }}
+            )
+        job_status = "completed"
         
         logger.info("Job completed successfully", job_id=job_id)
         
@@ -219,22 +360,56 @@ async def process_single_job(job: dict) -> None:
             exc_info=True
         )
         
-        # Update story status
-        await update_story_status(
-            db, 
-            story_id, 
-            "failed",
-            error=str(e)
-        )
+        # Update story status (terminal, so written immediately)
+        await progress.update("failed", error=str(e))
         
         # Update job status
-        await db.jobs.update_one(
-            {"_id": job["_id"]},
-            {
-                "$set": {"status": "failed", "error": str(e)},
-                "$inc": {"attempts": 1}
-            }
-        )
+        with write_timer("job_status"):
+            await db.jobs.update_one(
+                {"_id": job["_id"]},
+                {
+                    "$set": {
+                        "status": "failed",
+                        "error": str(e),
+                        "finishedAt": datetime.utcnow(),
+                        "usage": finish_usage(usage)
+                    },
+                    "$inc": {"attempts": 1}
+                }
+            )
+    
+    finally:
+        # Uploads still pending after a failure read from the spool
+        for upload in uploads.values():
+            upload.cancel()
+        spool.cleanup()
+        # Drops the track's PCM spool if the job failed before finalize()
+        if track_builder:
+            track_builder.close()
+        await progress.close(discard=True)
+        JOBS_IN_FLIGHT.dec()
+        JOB_SECONDS.labels(job_status).observe(time.perf_counter() - started)
+        current_span().set_attribute("job.status", job_status)
+
+
+async def process_job(job: dict) -> None:
+    """Process a claimed job, accounting its resource usage (and tracing it)."""
+    with track_usage(JobUsage()):
+        if settings.job_traces_enabled:
+            await process_traced_job(job)
+        else:
+            await process_single_job(job)
+
+
+async def process_traced_job(job: dict) -> None:
+    """Process a job inside a root span and store its trace."""
+    trace = JobTrace(job["_id"], job["storyId"])
+    with trace.root("process_job", job_id=str(job["_id"]), story_id=str(job["storyId"])):
+        await process_single_job(job)
+    try:
+        await save_trace(db, trace)
+    except Exception as e:
+        logger.error("Failed to save job trace", job_id=str(job["_id"]), error=str(e))
 
 
 async def process_jobs():
@@ -243,6 +418,11 @@ async def process_jobs():
     
     while not shutdown_event.is_set():
         try:
+            # Don't take on new work while over the memory budget
+            if get_memory_budget().exceeded():
+                await asyncio.sleep(settings.job_check_interval)
+                continue
+            
             # Find and claim a pending job
             job = await db.jobs.find_one_and_update(
                 {"status": "pending"},
@@ -251,7 +431,7 @@ async def process_jobs():
             )
             
             if job:
-                await process_single_job(job)
+                await process_job(job)
             else:
                 # No jobs available
                 await asyncio.sleep(settings.job_check_interval)
@@ -261,6 +441,47 @@ async def process_jobs():
             await asyncio.sleep(settings.job_error_retry_delay)
 
 
+async def verify_executors():
+    await get_audio_executor().warm_up()
+    if settings.enable_s3_storage:
+        await get_upload_executor().warm_up()
+
+
+async def warm_up_codecs():
+    """Encode a short tone, so the first narration doesn't pay for codec setup or ffmpeg's first spawn."""
+    pcm = audio_dsp.Pcm(audio_dsp.sine(440, 500))
+    await get_audio_executor().run(audio_transcoder.encode_narration, pcm, "pcm16")
+
+
+def warmup_steps():
+    """Startup work that would otherwise land on the first job."""
+    steps = [
+        WarmupStep("executors", verify_executors, required=True),
+        # Render music beds and sound effects once, off the event loop
+        WarmupStep("audio_library", lambda: get_audio_executor().run(audio_processor.prime_audio_library)),
+        WarmupStep("providers", lambda: asyncio.to_thread(get_providers().warm_up)),
+        WarmupStep("placeholder_image", lambda: asyncio.to_thread(image_processor.placeholder_png)),
+        WarmupStep("codecs", warm_up_codecs)
+    ]
+    if settings.enable_s3_storage:
+        steps.append(WarmupStep("s3_client", lambda: asyncio.to_thread(get_s3_client)))
+    return steps
+
+
+async def start_job_processor():
+    """Warm up, then start claiming jobs."""
+    global job_processor_task
+    if settings.warmup_enabled:
+        await warmup.run(warmup_steps())
+    else:
+        await warmup.run([])
+    if not warmup.ready:
+        logger.error("Warm-up failed; not claiming jobs", warmup=warmup.stats())
+        return
+    if not shutdown_event.is_set():
+        job_processor_task = asyncio.create_task(process_jobs(), name="job-processor")
+
+
 def handle_shutdown(signum, frame):
     """Handle shutdown signals gracefully."""
     logger.info("Shutdown signal received", signal=signum)
@@ -270,7 +491,7 @@ def handle_shutdown(signum, frame):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
-    global job_processor_task
+    global job_archiver_task, queue_depth_task, loop_monitor_task, warmup_task
     
     # Startup
     try:
@@ -278,11 +499,39 @@ async def lifespan(app: FastAPI):
         signal.signal(signal.SIGTERM, handle_shutdown)
         signal.signal(signal.SIGINT, handle_shutdown)
         
+        # Per-job peak traced memory needs allocation tracing from the start
+        if settings.job_tracemalloc:
+            tracemalloc.start(settings.debug_tracemalloc_frames)
+        
         # Connect to MongoDB
         await connect_to_mongodb()
         
-        # Start job processor
-        job_processor_task = asyncio.create_task(process_jobs())
+        # Indexes for the job claim query and media lookups
+        if settings.ensure_indexes_on_startup:
+            try:
+                await ensure_indexes(db)
+            except Exception as e:
+                logger.error("Failed to ensure indexes", error=str(e))
+        
+        # Warm up in the background so /live answers meanwhile; jobs start after it
+        warmup_task = asyncio.create_task(start_job_processor(), name="warm-up")
+        
+        # Keep the jobs collection down to pending and in-flight work
+        if settings.job_retention_hours > 0:
+            job_archiver_task = asyncio.create_task(
+                run_job_archiver(db, shutdown_event), name="job-archiver"
+            )
+        
+        # Job counts for /metrics, so scrapes don't query Mongo
+        queue_depth_task = asyncio.create_task(
+            run_queue_depth_refresher(db, shutdown_event), name="queue-depth"
+        )
+        
+        # Catch calls that block the event loop
+        if settings.loop_lag_threshold_ms > 0:
+            loop_monitor_task = asyncio.create_task(
+                get_loop_monitor().run(shutdown_event), name="loop-monitor"
+            )
         
         logger.info("Application startup complete")
         
@@ -298,6 +547,9 @@ async def lifespan(app: FastAPI):
     # Signal job processor to stop
     shutdown_event.set()
     
+    if warmup_task:
+        warmup_task.cancel()
+    
     # Wait for job processor to finish
     if job_processor_task:
         try:
@@ -306,6 +558,13 @@ async def lifespan(app: FastAPI):
             logger.warning("Job processor shutdown timeout")
             job_processor_task.cancel()
     
+    for task in (job_archiver_task, queue_depth_task, loop_monitor_task):
+        if task:
+            task.cancel()
+    
+    # Stop executor threads
+    shutdown_executors()
+    
     # Close database connection
     await close_mongodb_connection()
     
@@ -354,27 +613,125 @@ async def health():
         raise HTTPException(status_code=503, detail=str(e))
 
 
+@app.get("/live")
+async def live():
+    """Liveness: the process is up and hasn't lost its job processor.
+
+    Stays OK while warming up, so orchestrators don't restart a replica
+    that is still starting.
+    """
+    if warmup.failed:
+        raise HTTPException(status_code=503, detail="Warm-up failed")
+    if job_processor_task and job_processor_task.done() and not shutdown_event.is_set():
+        raise HTTPException(status_code=503, detail="Job processor stopped")
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: warmed up, connected to MongoDB and claiming jobs."""
+    checks = {
+        "warmup": "ready" if warmup.ready else ("failed" if warmup.failed else "warming_up"),
+        "database": "disconnected",
+        "job_processor": "stopped",
+        "shutting_down": shutdown_event.is_set()
+    }
+    if db is not None:
+        try:
+            await db.command('ping')
+            checks["database"] = "connected"
+        except Exception as e:
+            logger.warning("Readiness ping failed", error=str(e))
+    if job_processor_task and not job_processor_task.done():
+        checks["job_processor"] = "running"
+
+    is_ready = (
+        warmup.ready
+        and checks["database"] == "connected"
+        and checks["job_processor"] == "running"
+        and not checks["shutting_down"]
+    )
+    result = {"status": "ready" if is_ready else "not_ready", **checks, "warmup_steps": warmup.stats()}
+    if not is_ready:
+        raise HTTPException(status_code=503, detail=result)
+    return result
+
+
 @app.get("/metrics")
 async def metrics():
-    """Basic metrics endpoint."""
-    try:
-        # Get job counts
-        pending_jobs = await db.jobs.count_documents({"status": "pending"})
-        processing_jobs = await db.jobs.count_documents({"status": "processing"})
-        completed_jobs = await db.jobs.count_documents({"status": "completed"})
-        failed_jobs = await db.jobs.count_documents({"status": "failed"})
-        
-        return {
-            "jobs": {
-                "pending": pending_jobs,
-                "processing": processing_jobs,
-                "completed": completed_jobs,
-                "failed": failed_jobs
-            }
-        }
-    except Exception as e:
-        logger.error("Failed to get metrics", error=str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+    """Prometheus metrics (text exposition format)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/stats")
+async def stats():
+    """Worker statistics as JSON."""
+    result = {
+        "jobs": queue_depth.stats(),
+        "executors": executor_stats(),
+        "memory": get_memory_budget().stats(),
+        "event_loop": get_loop_monitor().stats()
+    }
+    if settings.enable_s3_storage:
+        result["s3"] = upload_stats()
+    return result
+
+
+@app.get("/jobs/{job_id}/trace")
+async def job_trace(job_id: str):
+    """A job's span timeline as OTLP JSON (importable by OpenTelemetry tools)."""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    trace_doc = await db[TRACE_COLLECTION].find_one({"_id": ObjectId(job_id)})
+    if trace_doc is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return to_otlp_json(trace_doc)
+
+
+def require_debug_token(authorization: Optional[str] = Header(None)) -> None:
+    """Allow debug endpoints only with `Authorization: Bearer <DEBUG_TOKEN>`."""
+    if not settings.debug_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token, settings.debug_token):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+
+@app.get("/debug/profile", dependencies=[Depends(require_debug_token)])
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    include_idle: bool = False
+):
+    """Sample every thread for `seconds`; returns collapsed stacks for flamegraphs."""
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        # Sampled from another thread so the job loop keeps running meanwhile
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, include_idle)
+    return PlainTextResponse(stacks)
+
+
+@app.get("/debug/heap", dependencies=[Depends(require_debug_token)])
+async def debug_heap(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    stop: bool = False
+):
+    """tracemalloc snapshot diffed against the previous call.
+
+    The first call starts tracing and returns a baseline; `stop=true`
+    stops tracing (it slows allocation-heavy code down), unless
+    JOB_TRACEMALLOC started it.
+    """
+    if stop:
+        if not get_heap_tracker().stop():
+            raise HTTPException(
+                status_code=409,
+                detail="Tracing was started by JOB_TRACEMALLOC; not stopping it"
+            )
+        return {"tracing": False}
+    return await asyncio.to_thread(get_heap_tracker().diff, limit, group_by)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""
+NumPy audio primitives for the narration pipeline.
+
+Audio is carried as mono float32 PCM in the range [-1, 1]. Decoding and
+encoding use libsndfile in-process (via soundfile) when it supports the
+format, and only fall back to pydub/ffmpeg otherwise.
+"""
+import io
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # libsndfile missing
+    sf = None
+
+logger = logging.getLogger(__name__)
+
+# Rate used for the pipeline; matches gTTS and Gemini TTS output
+SAMPLE_RATE = 24000
+
+
+@dataclass
+class Pcm:
+    """Mono float32 audio samples at a sample rate."""
+    samples: np.ndarray
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return len(self.samples) / self.sample_rate
+
+    def __len__(self) -> int:
+        """Length in milliseconds, like pydub's AudioSegment."""
+        return int(round(self.duration * 1000))
+
+
+def has_native_codec(format: str) -> bool:
+    """Whether libsndfile can encode/decode a container format in-process."""
+    return sf is not None and format.upper() in sf.available_formats()
+
+
+def _to_mono(samples: np.ndarray) -> np.ndarray:
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples.astype(np.float32, copy=False)
+
+
+def decode(data: bytes, sample_rate: int = SAMPLE_RATE) -> Pcm:
+    """Decode encoded audio bytes to mono PCM at the pipeline rate."""
+    if sf is not None:
+        try:
+            samples, rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+            return resample(Pcm(_to_mono(samples), rate), sample_rate)
+        except Exception as e:
+            logger.debug(f"In-process decode failed, falling back to pydub: {e}")
+
+    from pydub import AudioSegment
+    segment = AudioSegment.from_file(io.BytesIO(data))
+    return resample(from_segment(segment), sample_rate)
+
+
+def from_segment(segment) -> Pcm:
+    """Convert a pydub AudioSegment to PCM."""
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
+    if segment.channels > 1:
+        samples = samples.reshape(-1, segment.channels)
+    samples = _to_mono(samples) / float(1 << (8 * segment.sample_width - 1))
+    return Pcm(samples, segment.frame_rate)
+
+
+def to_segment(pcm: Pcm):
+    """Convert PCM to a 16-bit pydub AudioSegment."""
+    from pydub import AudioSegment
+    return AudioSegment(
+        to_int16(pcm.samples).tobytes(),
+        frame_rate=pcm.sample_rate,
+        sample_width=2,
+        channels=1
+    )
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def encode(
+    pcm: Pcm,
+    format: str = "mp3",
+    subtype: Optional[str] = None,
+    compression_level: Optional[float] = None,
+    bitrate_mode: Optional[str] = None
+) -> bytes:
+    """Encode PCM, in-process when libsndfile supports the format.
+
+    `compression_level` (0 = best quality, 1 = smallest) and `bitrate_mode`
+    are passed to libsndfile and ignored by the pydub fallback.
+    """
+    buffer = io.BytesIO()
+    if has_native_codec(format):
+        sf.write(
+            buffer,
+            np.clip(pcm.samples, -1.0, 1.0),
+            pcm.sample_rate,
+            format=format.upper(),
+            subtype=subtype,
+            compression_level=compression_level,
+            bitrate_mode=bitrate_mode
+        )
+    else:
+        to_segment(pcm).export(buffer, format=format)
+    return buffer.getvalue()
+
+
+def resample(pcm: Pcm, sample_rate: int) -> Pcm:
+    """Linearly resample to a new rate."""
+    if pcm.sample_rate == sample_rate or not len(pcm.samples):
+        return Pcm(pcm.samples, sample_rate)
+    length = int(round(len(pcm.samples) * sample_rate / pcm.sample_rate))
+    return Pcm(_stretch(pcm.samples, length), sample_rate)
+
+
+def change_speed(pcm: Pcm, factor: float) -> Pcm:
+    """Play faster (and higher) by a factor, keeping the sample rate."""
+    length = int(round(len(pcm.samples) / factor))
+    return Pcm(_stretch(pcm.samples, length), pcm.sample_rate)
+
+
+def _stretch(samples: np.ndarray, length: int) -> np.ndarray:
+    positions = np.linspace(0, len(samples) - 1, num=length, dtype=np.float64)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def db_to_gain(db: float) -> float:
+    return float(10 ** (db / 20))
+
+
+def apply_gain(samples: np.ndarray, db: float) -> np.ndarray:
+    return samples * np.float32(db_to_gain(db))
+
+
+def sine(frequency: float, duration_ms: int, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Synthesize a full-scale sine tone."""
+    t = np.arange(int(sample_rate * duration_ms / 1000)) / sample_rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+
+def loop_to_length(samples: np.ndarray, length: int) -> np.ndarray:
+    """Slice to a sample count, looping only when too short.
+
+    Returns a view (no copy) whenever the source is long enough.
+    """
+    if len(samples) >= length:
+        return samples[:length]
+    return np.resize(samples, length)
+
+
+def overlay(base: Pcm, layer: np.ndarray) -> Pcm:
+    """Mix a layer over base, trimmed or looped to base's length."""
+    mixed = base.samples + loop_to_length(layer, len(base.samples))
+    np.clip(mixed, -1.0, 1.0, out=mixed)
+    return Pcm(mixed, base.sample_rate)
+
+
+def concat(parts: List[Pcm]) -> Pcm:
+    """Concatenate clips that share a sample rate."""
+    return Pcm(np.concatenate([p.samples for p in parts]), parts[0].sample_rate)
+
+
+def decode_pcm16(data: bytes, sample_rate: int) -> Pcm:
+    """Decode headerless little-endian 16-bit mono PCM."""
+    samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2")
+    return Pcm(samples.astype(np.float32) / 32768.0, sample_rate)
+
+
+def find_silences(
+    pcm: Pcm,
+    min_silence_ms: int = 300,
+    threshold_db: float = -35.0,
+    window_ms: int = 20
+) -> List[Tuple[int, int]]:
+    """Find silent stretches as (start, end) sample offsets.
+
+    A window is silent when its RMS is `threshold_db` below the loudest
+    window, so the threshold adapts to the clip's overall level.
+    """
+    window = max(1, int(pcm.sample_rate * window_ms / 1000))
+    frames = len(pcm.samples) // window
+    if frames == 0:
+        return []
+
+    rms = np.sqrt(np.mean(
+        np.square(pcm.samples[:frames * window].reshape(frames, window), dtype=np.float64),
+        axis=1
+    ))
+    peak = rms.max()
+    if peak == 0:
+        return [(0, len(pcm.samples))]
+    silent = rms < peak * db_to_gain(threshold_db)
+
+    # Run boundaries of the silent mask
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    min_frames = max(1, int(min_silence_ms / window_ms))
+    return [
+        (int(start * window), len(pcm.samples) if end == frames else int(end * window))
+        for start, end in zip(starts, ends)
+        if end - start >= min_frames
+    ]
+
+
+def split_on_silences(
+    pcm: Pcm,
+    weights: List[float],
+    min_silence_ms: int = 300,
+    tolerance: float = 2.5
+) -> Optional[List[Pcm]]:
+    """Split a clip into len(weights) parts at its longest pauses.
+
+    `weights` is the expected relative length of each part (e.g. the text
+    length of each page). Returns None when there are too few pauses or a
+    part's share of the audio is off by more than `tolerance` times from
+    its expected share, so callers can fall back to another strategy.
+    """
+    count = len(weights)
+    if count == 1:
+        return [pcm]
+
+    total = len(pcm.samples)
+    # Only pauses between speech can be page boundaries
+    pauses = [
+        (start, end) for start, end in find_silences(pcm, min_silence_ms)
+        if start > 0 and end < total
+    ]
+    if len(pauses) < count - 1:
+        return None
+
+    longest = sorted(pauses, key=lambda p: p[1] - p[0], reverse=True)[:count - 1]
+    cuts = sorted((start + end) // 2 for start, end in longest)
+    bounds = [0] + cuts + [total]
+
+    weight_total = float(sum(weights)) or 1.0
+    parts = []
+    for i, weight in enumerate(weights):
+        part = pcm.samples[bounds[i]:bounds[i + 1]]
+        expected = weight / weight_total
+        actual = len(part) / total
+        if expected > 0 and not (expected / tolerance <= actual <= expected * tolerance):
+            return None
+        parts.append(Pcm(part, pcm.sample_rate))
+    return parts
+
+
+def decode_mime(data: bytes, mime_type: Optional[str] = None, sample_rate: int = SAMPLE_RATE) -> Pcm:
+    """Decode audio, honouring raw PCM mime types such as Gemini's audio/L16."""
+    if mime_type and mime_type.lower().startswith(("audio/l16", "audio/pcm")):
+        rate = SAMPLE_RATE
+        for param in mime_type.split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "rate" and value.isdigit():
+                rate = int(value)
+        return resample(decode_pcm16(data, rate), sample_rate)
+    return decode(data, sample_rate)
@@ -0,0 +1,114 @@
+"""
+In-memory library of background music beds and sound effects.
+
+Beds and effects are decoded once, either from bundled audio files or by
+synthesizing a tone, and kept as PCM so per-page mixing only slices them.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from config import settings
+from . import audio_dsp
+
+logger = logging.getLogger(__name__)
+
+# Bed length covers typical page narration; longer pages loop the bed.
+# 30 seconds is a whole number of cycles for every synthesized frequency,
+# so loops are seamless.
+BED_DURATION_MS = 30_000
+
+# Bundled track per tone (see public/music/README.md)
+MUSIC_FILES = {
+    "funny": "bouncy-xylophone.mp3",
+    "magical": "twinkly-chimes.mp3",
+    "scary": "soft-whooshes.mp3",
+    "wholesome": "soft-piano.mp3",
+    "adventurous": "rhythmic-drums.mp3"
+}
+
+# Bundled sound effect per name (see public/sounds/README.md)
+SOUND_EFFECT_FILES = {
+    "interactive": "sound-interactive.mp3"
+}
+
+_music_beds: Dict[str, np.ndarray] = {}
+_sound_effects: Dict[str, np.ndarray] = {}
+_tones: Dict[int, np.ndarray] = {}
+_lock = threading.Lock()
+
+
+def _load_bundled(subdir: str, filename: str) -> Optional[np.ndarray]:
+    """Load a bundled audio file if an assets directory is configured."""
+    if not settings.audio_assets_dir or not filename:
+        return None
+    path = os.path.join(settings.audio_assets_dir, subdir, filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return audio_dsp.decode(f.read()).samples
+    except Exception as e:
+        logger.warning(f"Could not load bundled audio {path}: {e}")
+        return None
+
+
+def _render_bed(tone: str, style: Dict) -> np.ndarray:
+    bed = _load_bundled("music", MUSIC_FILES.get(tone, ""))
+    if bed is None:
+        frequency = 440 if style["pitch"] == "high" else 220
+        # Tones sharing a frequency share one synthesized bed
+        if frequency not in _tones:
+            _tones[frequency] = audio_dsp.apply_gain(
+                audio_dsp.sine(frequency, BED_DURATION_MS), -20
+            )
+        return _tones[frequency]
+    # Background level
+    return audio_dsp.apply_gain(bed, -20)
+
+
+def _render_sound_effect(name: str) -> np.ndarray:
+    effect = _load_bundled("sounds", SOUND_EFFECT_FILES.get(name, ""))
+    if effect is None:
+        effect = audio_dsp.sine(880, 200)
+    return audio_dsp.apply_gain(effect, -10)
+
+
+def prime(music_styles: Dict[str, Dict]) -> None:
+    """Render every music bed and sound effect ahead of the first job."""
+    with _lock:
+        for tone, style in music_styles.items():
+            if tone not in _music_beds:
+                _music_beds[tone] = _render_bed(tone, style)
+        for name in SOUND_EFFECT_FILES:
+            if name not in _sound_effects:
+                _sound_effects[name] = _render_sound_effect(name)
+    logger.info(
+        f"Audio library ready: {len(_music_beds)} music beds, "
+        f"{len(_sound_effects)} sound effects"
+    )
+
+
+def get_music_bed(tone: str, style: Dict) -> np.ndarray:
+    """Get the pre-rendered background bed for a tone."""
+    bed = _music_beds.get(tone)
+    if bed is None:
+        with _lock:
+            bed = _music_beds.get(tone)
+            if bed is None:
+                bed = _music_beds[tone] = _render_bed(tone, style)
+    return bed
+
+
+def get_sound_effect(name: str = "interactive") -> np.ndarray:
+    """Get a pre-rendered sound effect."""
+    effect = _sound_effects.get(name)
+    if effect is None:
+        with _lock:
+            effect = _sound_effects.get(name)
+            if effect is None:
+                effect = _sound_effects[name] = _render_sound_effect(name)
+    return effect
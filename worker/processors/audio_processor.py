@@ -1,18 +1,20 @@
-import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
-import io
 import base64
-import google.generativeai as genai
-from gtts import gTTS
-from pydub import AudioSegment
-from pydub.generators import Sine
 
-logger = logging.getLogger(__name__)
+from . import audio_dsp, audio_library, audio_transcoder
+from .audio_processor_gemini import (
+    generate_story_with_gemini_tts,
+    generate_with_gemini_tts,
+    get_voice_style
+)
+from .providers import get_providers
+from config import settings
+from utils.executors import get_audio_executor
+from utils.metrics import record_fallback, stage_timer
+from utils.narration_cache import get_narration_cache, make_cache_key
 
-# Configure Gemini if available
-if os.getenv("GEMINI_API_KEY"):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+logger = logging.getLogger(__name__)
 
 # Background music styles by tone
 MUSIC_STYLES = {
@@ -32,6 +34,147 @@ VOICE_SETTINGS = {
     "4-5 years": {"speed": "normal", "pitch": "normal", "emphasis": "dynamic"}
 }
 
+def rendition() -> str:
+    """Stored audio rendition; part of cache keys so settings changes miss"""
+    if settings.narration_transcode:
+        return f"opus-{settings.narration_opus_bitrate}/compat-{settings.narration_compat_bitrate}"
+    return "mp3"
+
+def gemini_cache_key(text: str, language: str, age_group: str) -> str:
+    """Narration cache key for Gemini TTS audio"""
+    return make_cache_key(
+        text,
+        language,
+        {"style": get_voice_style(age_group), "rendition": rendition()},
+        "gemini-tts"
+    )
+
+def gtts_cache_key(page: Dict, language: str, voice_config: Dict, tone: str) -> str:
+    """Narration cache key for gTTS audio.
+    
+    The rendered clip also carries the tone's background music and the
+    interactive sound effect, so both are part of the key.
+    """
+    return make_cache_key(
+        page["text"],
+        language,
+        {
+            **voice_config,
+            "tone": tone,
+            "soundEffects": bool(page.get("interactiveElement")),
+            "rendition": rendition()
+        },
+        "gtts"
+    )
+
+def cache_get_narration(cache, key: str) -> Optional[Dict]:
+    """Blocking read of encoded narration (both renditions) from the cache"""
+    # An empty NarrationCache is falsy (it has a length), so test for None
+    cached = cache.get(key) if cache is not None else None
+    if not cached:
+        return None
+    audio_bytes, metadata = cached
+    encoded = {**metadata, "audioData": audio_bytes}
+    if metadata.get("compatFormat"):
+        compat = cache.get(key + ".compat")
+        if not compat:
+            return None
+        encoded["compatAudioData"] = compat[0]
+    return encoded
+
+def cache_put_narration(cache, key: str, encoded: Dict) -> None:
+    """Blocking write of encoded narration (both renditions) to the cache"""
+    if cache is None:
+        return
+    metadata = {
+        name: value for name, value in encoded.items()
+        if name not in ("audioData", "compatAudioData")
+    }
+    if encoded.get("compatAudioData"):
+        cache.put(key + ".compat", encoded["compatAudioData"], {})
+    cache.put(key, encoded["audioData"], metadata)
+
+async def load_cached_narration(cache, key: str) -> Optional[Dict]:
+    """Read cached narration off the event loop (it's on disk)"""
+    if cache is None:
+        return None
+    return await get_audio_executor().run(cache_get_narration, cache, key)
+
+async def store_cached_narration(cache, key: str, encoded: Dict) -> None:
+    """Write narration to the cache off the event loop"""
+    if cache is None:
+        return
+    await get_audio_executor().run(cache_put_narration, cache, key, encoded)
+
+def narration_entry(page_number: int, encoded: Dict) -> Dict:
+    """Build the per-page narration dict (audio stays raw bytes)"""
+    return {"pageNumber": page_number, **encoded}
+
+async def generate_story_narration(
+    pages: List[Dict],
+    language: str,
+    age_group: str
+) -> List[Dict]:
+    """Narrate a whole story in one batched Gemini TTS call.
+    
+    Uncached pages are narrated in one Gemini TTS request and split into
+    per-page clips on the pauses between pages. Returns the cached and
+    batched clips only: if batching is disabled, the request fails or the
+    audio can't be split cleanly, the missing pages are left out, for the
+    caller to narrate one by one (generate_narration) as it saves them.
+    """
+    results: Dict[int, Dict] = {}
+    cache = get_narration_cache()
+    pending = []
+    
+    for page in pages:
+        encoded = await load_cached_narration(cache, gemini_cache_key(page["text"], language, age_group))
+        if encoded:
+            results[page["pageNumber"]] = narration_entry(page["pageNumber"], encoded)
+        else:
+            pending.append(page)
+    
+    if settings.batch_narration and len(pending) > 1:
+        clips = None
+        story_audio = await generate_story_with_gemini_tts(
+            [page["text"] for page in pending],
+            language,
+            age_group
+        )
+        if story_audio:
+            data, mime_type = story_audio
+            clips = await get_audio_executor().run(
+                split_story_audio,
+                data,
+                mime_type,
+                [len(page["text"]) for page in pending]
+            )
+        
+        if clips:
+            logger.info(f"Split batched narration into {len(clips)} page clips")
+            for page, encoded in zip(pending, clips):
+                await store_cached_narration(cache, gemini_cache_key(page["text"], language, age_group), encoded)
+                results[page["pageNumber"]] = narration_entry(page["pageNumber"], encoded)
+        else:
+            record_fallback("batch_narration")
+            logger.warning("Batched narration unavailable, narrating pages individually")
+    
+    return [results[page["pageNumber"]] for page in pages if page["pageNumber"] in results]
+
+def split_story_audio(data: bytes, mime_type: str, weights: List[float]):
+    """Blocking split of story narration into encoded page clips.
+    
+    Returns a list of encoded narrations (see encode_narration) per page,
+    or None if the audio doesn't have a clean pause for every page boundary.
+    """
+    with stage_timer("audio_split", bytes=len(data), pages=len(weights)):
+        source_format = audio_transcoder.detect_format(data, mime_type)
+        story = audio_dsp.decode_mime(data, mime_type)
+        parts = audio_dsp.split_on_silences(story, weights)
+        if parts is None:
+            return None
+        return [audio_transcoder.encode_narration(part, source_format) for part in parts]
+
 async def generate_narration(
     pages: List[Dict], 
     language: str, 
@@ -41,12 +184,19 @@ async def generate_narration(
     """Generate narration audio for each page"""
     audio_files = []
     voice_config = VOICE_SETTINGS.get(age_group, VOICE_SETTINGS["3-4 years"])
+    cache = get_narration_cache()
     
     for page in pages:
         try:
             # Try Gemini TTS first
+            gemini_key = gemini_cache_key(page["text"], language, age_group)
+            encoded = await load_cached_narration(cache, gemini_key)
+            if encoded:
+                logger.info(f"Narration cache hit (Gemini TTS) for page {page['pageNumber']}")
+                audio_files.append(narration_entry(page["pageNumber"], encoded))
+                continue
+            
             try:
-                from .audio_processor_gemini import generate_with_gemini_tts
                 gemini_audio = await generate_with_gemini_tts(
                     page["text"],
                     language,
@@ -55,42 +205,47 @@ async def generate_narration(
                 
                 if gemini_audio:
                     logger.info(f"Generated audio with Gemini TTS for page {page['pageNumber']}")
-                    audio_files.append({
-                        "pageNumber": page["pageNumber"],
-                        "audioData": gemini_audio,
-                        "duration": estimate_duration(page["text"]),
-                        "format": "mp3"
-                    })
+                    data, mime_type = gemini_audio
+                    # Provider output is stored in whatever format it came
+                    # back in; normalize it to the stored renditions
+                    encoded = await get_audio_executor().run(
+                        audio_transcoder.transcode_narration,
+                        data,
+                        mime_type
+                    )
+                    await store_cached_narration(cache, gemini_key, encoded)
+                    audio_files.append(narration_entry(page["pageNumber"], encoded))
                     continue
             except Exception as e:
                 logger.warning(f"Gemini TTS failed: {e}, falling back to gTTS")
             
             # Fall back to gTTS
-            narration = await generate_tts(
+            record_fallback("gtts")
+            gtts_key = gtts_cache_key(page, language, voice_config, tone)
+            encoded = await load_cached_narration(cache, gtts_key)
+            if encoded:
+                logger.info(f"Narration cache hit (gTTS) for page {page['pageNumber']}")
+                audio_files.append(narration_entry(page["pageNumber"], encoded))
+                continue
+            
+            narration, is_fallback = await generate_tts(
                 page["text"],
                 language,
                 voice_config
             )
             
-            # Generate background music
-            music = generate_background_music(
-                duration=len(page["text"]) * 0.1,  # Rough estimate
-                tone=tone
+            # Mix, add sound effects and encode off the event loop
+            encoded = await get_audio_executor().run(
+                render_page_audio,
+                narration,
+                page,
+                tone
             )
-            
-            # Mix narration with background music
-            final_audio = mix_audio(narration, music)
-            
-            # Add sound effects if there are interactive elements
-            if page.get("interactiveElement"):
-                final_audio = add_sound_effects(final_audio, page["interactiveElement"])
-            
-            audio_files.append({
-                "pageNumber": page["pageNumber"],
-                "audioData": audio_to_base64(final_audio),
-                "duration": len(final_audio) / 1000.0,  # Convert to seconds
-                "format": "mp3"
-            })
+            # The fallback beep is never cached under the page's text, so the
+            # next story retries gTTS
+            if not is_fallback:
+                await store_cached_narration(cache, gtts_key, encoded)
+            audio_files.append(narration_entry(page["pageNumber"], encoded))
             
             logger.info(f"Generated audio for page {page['pageNumber']}")
             
@@ -101,7 +256,11 @@ async def generate_narration(
     return audio_files
 
 async def generate_tts(text: str, language: str, voice_config: Dict):
-    """Generate text-to-speech audio"""
+    """Generate text-to-speech audio
+    
+    Returns:
+        (PCM audio, True if gTTS failed and the audio is a fallback beep)
+    """
     try:
         # Map language codes to gTTS language codes
         lang_map = {
@@ -116,73 +275,89 @@ async def generate_tts(text: str, language: str, voice_config: Dict):
         
         tts_lang = lang_map.get(language, "en")
         
-        # Generate TTS
-        tts = gTTS(text=text, lang=tts_lang, slow=(voice_config["speed"] == "slow"))
-        
-        # Save to buffer
-        buffer = io.BytesIO()
-        tts.write_to_fp(buffer)
-        buffer.seek(0)
-        
-        # Load as AudioSegment
-        audio = AudioSegment.from_mp3(buffer)
-        
-        # Apply voice modifications based on age group
-        if voice_config["pitch"] == "high":
-            audio = audio._spawn(audio.raw_data, overrides={
-                "frame_rate": int(audio.frame_rate * 1.1)
-            })
-        
-        return audio
+        # gTTS makes a blocking HTTP request; run it and the decode on the
+        # audio executor so the event loop keeps serving other jobs
+        audio = await get_audio_executor().run(
+            synthesize_tts,
+            text,
+            tts_lang,
+            voice_config
+        )
+        return audio, False
         
     except Exception as e:
         logger.error(f"TTS generation error: {str(e)}")
         # Return a simple beep as fallback
-        return Sine(440).to_audio_segment(duration=1000)
+        record_fallback("tts_beep")
+        return audio_dsp.Pcm(audio_dsp.sine(440, 1000)), True
 
-def generate_background_music(duration: float, tone: str):
-    """Generate simple background music based on tone"""
-    music_config = MUSIC_STYLES.get(tone, MUSIC_STYLES["wholesome"])
+def synthesize_tts(text: str, tts_lang: str, voice_config: Dict):
+    """Blocking gTTS synthesis and decode to PCM"""
+    with stage_timer("tts_gtts", provider="gtts", language=tts_lang, characters=len(text)):
+        mp3 = get_providers().synthesize_speech(
+            text,
+            tts_lang,
+            slow=(voice_config["speed"] == "slow")
+        )
     
-    # For now, generate a simple tone
-    # In production, this would load actual music files
-    frequency = 440 if music_config["pitch"] == "high" else 220
-    music = Sine(frequency).to_audio_segment(duration=int(duration * 1000))
+    # Decode to PCM in-process
+    audio = audio_dsp.decode(mp3)
     
-    # Make it quieter (background level)
-    music = music - 20  # Reduce by 20dB
+    # Apply voice modifications based on age group
+    if voice_config["pitch"] == "high":
+        audio = audio_dsp.change_speed(audio, 1.1)
     
-    return music
+    return audio
+
+def render_page_audio(narration, page: Dict, tone: str) -> Dict:
+    """Blocking mix of narration, music and effects, encoded for storage"""
+    with stage_timer("audio_mix", page_number=page.get("pageNumber")):
+        # Generate background music
+        music = generate_background_music(
+            duration=len(page["text"]) * 0.1,  # Rough estimate
+            tone=tone
+        )
+        
+        # Mix narration with background music
+        final_audio = mix_audio(narration, music)
+        
+        # Add sound effects if there are interactive elements
+        if page.get("interactiveElement"):
+            final_audio = add_sound_effects(final_audio, page["interactiveElement"])
+    
+    with stage_timer("audio_encode"):
+        return audio_transcoder.encode_narration(final_audio, "mp3")
+
+def generate_background_music(duration: float, tone: str):
+    """Get background music for a tone, sliced from its pre-rendered bed"""
+    if tone not in MUSIC_STYLES:
+        tone = "wholesome"
+    bed = audio_library.get_music_bed(tone, MUSIC_STYLES[tone])
+    return audio_dsp.loop_to_length(bed, int(duration * audio_dsp.SAMPLE_RATE))
+
+def prime_audio_library():
+    """Render music beds and sound effects so pages never synthesize them"""
+    audio_library.prime(MUSIC_STYLES)
 
 def mix_audio(narration, music):
     """Mix narration with background music"""
-    # Ensure music is at least as long as narration
-    if len(music) < len(narration):
-        music = music * (len(narration) // len(music) + 1)
-    
-    # Trim music to match narration length
-    music = music[:len(narration)]
-    
-    # Mix with narration prominent
-    mixed = narration.overlay(music)
-    
-    return mixed
+    # Slice (or loop) music to match narration length, narration prominent
+    return audio_dsp.overlay(narration, music)
 
 def add_sound_effects(audio, interactive_element: str):
     """Add sound effects for interactive elements"""
     # Simple sound effect at the end
     # In production, this would add contextual sounds
-    beep = Sine(880).to_audio_segment(duration=200)
-    beep = beep - 10  # Make it quieter
-    
-    return audio + beep
+    effect = audio_dsp.Pcm(audio_library.get_sound_effect("interactive"))
+    return audio_dsp.concat([audio, effect])
+
+def audio_to_bytes(audio) -> bytes:
+    """Encode PCM audio as MP3 bytes"""
+    return audio_dsp.encode(audio, format="mp3")
 
 def audio_to_base64(audio) -> str:
-    """Convert AudioSegment to base64 string"""
-    buffer = io.BytesIO()
-    audio.export(buffer, format="mp3")
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode()
+    """Convert PCM audio to base64 string"""
+    return base64.b64encode(audio_to_bytes(audio)).decode()
 
 def estimate_duration(text: str) -> float:
     """Estimate audio duration based on text length"""
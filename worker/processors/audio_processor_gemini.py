@@ -1,33 +1,46 @@
-import os
-import google.generativeai as genai
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import logging
 import base64
 from io import BytesIO
 import json
 
+from utils.metrics import stage_timer
+from .providers import get_providers
+
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-if os.getenv("USE_MOCK_AUDIO") != "true":
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+TTS_MODEL = 'gemini-2.5-flash-preview-tts'
+# Prebuilt Gemini TTS voice; the style prompt shapes its delivery
+TTS_VOICE = 'Kore'
+
+# Marker between pages in batched narration prompts
+PAGE_BREAK = "[PAGE BREAK]"
+
+# Voice prompt by age group
+VOICE_STYLES = {
+    "0-6 months": "gentle, slow, soothing female voice",
+    "6-18 months": "cheerful, playful female voice with clear pronunciation",
+    "18-36 months": "animated, expressive female voice",
+    "3-4 years": "warm storyteller voice with character expressions",
+    "4-5 years": "dynamic narrator voice with emotion"
+}
 
-async def generate_with_gemini_tts(text: str, language: str, age_group: str) -> str:
-    """Generate audio using Gemini's TTS models"""
+def get_voice_style(age_group: str) -> str:
+    """Get the narrator voice description for an age group"""
+    return VOICE_STYLES.get(age_group, "friendly female narrator voice")
+
+async def generate_with_gemini_tts(
+    text: str,
+    language: str,
+    age_group: str
+) -> Optional[Tuple[bytes, str]]:
+    """Generate audio using Gemini's TTS models
+    
+    Returns:
+        (audio bytes, mime type), or None if no audio was generated
+    """
     try:
-        # Use Gemini 2.5 Flash TTS model
-        tts_model = genai.GenerativeModel('gemini-2.5-flash-preview-tts')
-        
-        # Create a voice prompt based on age group
-        voice_settings = {
-            "0-6 months": "gentle, slow, soothing female voice",
-            "6-18 months": "cheerful, playful female voice with clear pronunciation",
-            "18-36 months": "animated, expressive female voice",
-            "3-4 years": "warm storyteller voice with character expressions",
-            "4-5 years": "dynamic narrator voice with emotion"
-        }
-        
-        voice_style = voice_settings.get(age_group, "friendly female narrator voice")
+        voice_style = get_voice_style(age_group)
         
         # Create TTS prompt
         tts_prompt = f"""Generate speech audio for this children's story text in {language}.
@@ -36,28 +49,17 @@ async def generate_with_gemini_tts(text: str, language: str, age_group: str) ->
         
         logger.info(f"Attempting TTS generation for {language} text")
         
-        # Configure generation to only output audio
-        generation_config = genai.GenerationConfig(
-            temperature=0.7,
-            response_modalities=["audio"]  # Only request audio output
-        )
-        
-        response = await tts_model.generate_content_async(
-            tts_prompt,
-            generation_config=generation_config
-        )
+        with stage_timer("tts_gemini", provider="gemini", model=TTS_MODEL, characters=len(text)) as span:
+            audio = await get_providers().generate_speech(
+                TTS_MODEL,
+                tts_prompt,
+                voice=TTS_VOICE,
+                temperature=0.7
+            )
+            span.set_attribute("bytes", len(audio[0]) if audio else 0)
         
-        # Check for audio data in response
-        if hasattr(response, '_result') and hasattr(response._result, 'candidates'):
-            for candidate in response._result.candidates:
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                    for part in candidate.content.parts:
-                        # Check for inline_data with audio
-                        if hasattr(part, 'inline_data') and part.inline_data:
-                            audio_data = part.inline_data.data
-                            mime_type = part.inline_data.mime_type
-                            logger.info(f"Generated audio with mime_type: {mime_type}")
-                            return audio_data
+        if audio:
+            return audio
         
         # If no audio generated, return None
         logger.warning("No audio data in TTS response")
@@ -65,4 +67,45 @@ async def generate_with_gemini_tts(text: str, language: str, age_group: str) ->
         
     except Exception as e:
         logger.error(f"Gemini TTS error: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+async def generate_story_with_gemini_tts(
+    texts: List[str],
+    language: str,
+    age_group: str
+) -> Optional[Tuple[bytes, str]]:
+    """Narrate several pages in one Gemini TTS request.
+
+    Pages are joined with PAGE_BREAK markers and the model is asked to
+    pause at each one, so the result can be split on silence.
+
+    Returns:
+        (audio bytes, mime type), or None if no audio was generated
+    """
+    try:
+        story_text = f"\n{PAGE_BREAK}\n".join(texts)
+        tts_prompt = f"""Generate speech audio for this children's story text in {language}.
+        Voice style: {get_voice_style(age_group)}
+        The text is split into pages by {PAGE_BREAK} markers. Never read a marker
+        aloud; instead pause in silence for two full seconds at each marker.
+        Text to narrate:
+        {story_text}"""
+        
+        logger.info(f"Attempting batched TTS generation for {len(texts)} pages of {language} text")
+        
+        with stage_timer("tts_gemini_story", provider="gemini", model=TTS_MODEL, pages=len(texts)) as span:
+            audio = await get_providers().generate_speech(
+                TTS_MODEL,
+                tts_prompt,
+                voice=TTS_VOICE,
+                temperature=0.7
+            )
+            span.set_attribute("bytes", len(audio[0]) if audio else 0)
+        
+        if not audio:
+            logger.warning("No audio data in batched TTS response")
+        return audio
+        
+    except Exception as e:
+        logger.error(f"Gemini batched TTS error: {str(e)}")
+        return None
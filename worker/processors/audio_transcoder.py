@@ -0,0 +1,146 @@
+"""
+Transcoding stage for narration audio.
+
+Whatever a TTS provider returns (MP3, WAV, raw L16 PCM, ...) is detected
+from its bytes, decoded, and re-encoded as speech-tuned low-bitrate Opus,
+plus a compatibility rendition (AAC when ffmpeg is available, otherwise
+low-bitrate MP3) for clients that can't play Ogg/Opus.
+"""
+import io
+import logging
+import shutil
+from typing import Any, Dict, Optional
+
+from config import settings
+from utils.metrics import stage_timer
+from . import audio_dsp
+
+logger = logging.getLogger(__name__)
+
+OPUS_MIME_TYPE = "audio/ogg; codecs=opus"
+
+MIME_TYPES = {
+    "opus": OPUS_MIME_TYPE,
+    "ogg": "audio/ogg",
+    "mp3": "audio/mpeg",
+    "aac": "audio/aac",
+    "mp4": "audio/mp4",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "pcm16": "audio/L16"
+}
+
+
+def detect_format(data: bytes, mime_type: Optional[str] = None) -> str:
+    """Identify the container/codec of encoded audio from its leading bytes.
+
+    Falls back to the declared mime type for headerless formats (raw PCM).
+    """
+    head = data[:64]
+    if head.startswith(b"OggS"):
+        return "opus" if b"OpusHead" in head else "ogg"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        # MPEG audio frame sync; AAC ADTS uses layer bits 00
+        if len(head) > 1 and head[1] & 0x06 == 0:
+            return "aac"
+        return "mp3"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+
+    if mime_type:
+        mime = mime_type.lower()
+        if mime.startswith(("audio/l16", "audio/pcm")):
+            return "pcm16"
+        for name, known in MIME_TYPES.items():
+            if mime.startswith(known):
+                return name
+    return "unknown"
+
+
+def _opus_compression_level(bitrate: int) -> float:
+    # libsndfile maps Opus compression 0..1 linearly onto 256..6 kbit/s
+    return min(1.0, max(0.0, (256_000 - bitrate) / 250_000))
+
+
+def _mp3_compression_level(bitrate: int, sample_rate: int) -> float:
+    # libsndfile maps MP3 compression 0..1 linearly onto the MPEG bitrate
+    # range, which is 320..32 kbit/s for MPEG-1 and 160..8 kbit/s below 32 kHz
+    top, bottom = (320_000, 32_000) if sample_rate >= 32_000 else (160_000, 8_000)
+    return min(1.0, max(0.0, (top - bitrate) / (top - bottom)))
+
+
+def _encode_compat(pcm: audio_dsp.Pcm) -> Dict[str, Any]:
+    bitrate = settings.narration_compat_bitrate
+    if shutil.which("ffmpeg"):
+        buffer = io.BytesIO()
+        audio_dsp.to_segment(pcm).export(
+            buffer,
+            format="adts",
+            codec="aac",
+            bitrate=f"{bitrate // 1000}k"
+        )
+        return {"data": buffer.getvalue(), "format": "aac"}
+
+    return {
+        "data": audio_dsp.encode(
+            pcm,
+            format="mp3",
+            compression_level=_mp3_compression_level(bitrate, pcm.sample_rate),
+            bitrate_mode="CONSTANT"
+        ),
+        "format": "mp3"
+    }
+
+
+def encode_narration(pcm: audio_dsp.Pcm, source_format: str) -> Dict[str, Any]:
+    """Encode decoded narration into the stored renditions (blocking).
+
+    Returns:
+        Dictionary with audioData, format, mimeType, duration (measured
+        from the samples), sourceFormat and, when transcoding is enabled,
+        the compatibility rendition as compatAudioData/compatFormat/
+        compatMimeType.
+    """
+    duration = round(pcm.duration, 2)
+
+    if not settings.narration_transcode:
+        return {
+            "audioData": audio_dsp.encode(pcm, format="mp3"),
+            "format": "mp3",
+            "mimeType": MIME_TYPES["mp3"],
+            "duration": duration,
+            "sourceFormat": source_format
+        }
+
+    opus = audio_dsp.encode(
+        pcm,
+        format="ogg",
+        subtype="OPUS",
+        compression_level=_opus_compression_level(settings.narration_opus_bitrate)
+    )
+    compat = _encode_compat(pcm)
+    return {
+        "audioData": opus,
+        "format": "opus",
+        "mimeType": OPUS_MIME_TYPE,
+        "duration": duration,
+        "sourceFormat": source_format,
+        "compatAudioData": compat["data"],
+        "compatFormat": compat["format"],
+        "compatMimeType": MIME_TYPES[compat["format"]]
+    }
+
+
+def transcode_narration(data: bytes, mime_type: Optional[str] = None) -> Dict[str, Any]:
+    """Detect, decode and re-encode provider audio (blocking)."""
+    source_format = detect_format(data, mime_type)
+    pcm = audio_dsp.decode_mime(data, mime_type)
+    logger.debug(
+        f"Transcoding {source_format} narration ({len(data)} bytes, {pcm.duration:.1f}s)"
+    )
+    with stage_timer("audio_encode", source_format=source_format, bytes=len(data)):
+        return encode_narration(pcm, source_format)
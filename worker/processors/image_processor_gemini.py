@@ -1,19 +1,21 @@
 """
 Production-ready Gemini image processor with proper error handling and typing.
 """
-import base64
 import logging
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Union
 from io import BytesIO
 
-from google import genai
-from google.genai import types
-from PIL import Image
 
 from config import settings
+from utils.asset_spool import AssetSpool, SpooledAsset
+from utils.metrics import record_placeholder_images, stage_timer
+from .providers import Providers, get_providers
 
 logger = logging.getLogger(__name__)
 
+IMAGEN_MODEL = 'imagen-4.0-generate-preview-06-06'
+
 
 class ImageGenerationError(Exception):
     """Custom exception for image generation failures."""
@@ -24,12 +26,12 @@ class GeminiImageProcessor:
     """Handles image generation using Google's Imagen model."""
 
     def __init__(self, api_key: Optional[str] = None):
-        """Initialize the Gemini client."""
+        """Initialize the Imagen provider."""
         self.api_key = api_key or settings.gemini_api_key
-        self.client: Optional[genai.Client] = None
+        self.providers: Optional[Providers] = None
 
         if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
+            self.providers = get_providers()
             logger.info("Gemini image processor initialized")
         else:
             logger.warning("No Gemini API key provided, image generation will use placeholders")
@@ -38,7 +40,8 @@ class GeminiImageProcessor:
             self,
             pages: List[Dict[str, Any]],
             age_group: str,
-            story_context: Optional[Dict[str, Any]] = None
+            story_context: Optional[Dict[str, Any]] = None,
+            spool: Optional[AssetSpool] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate images for story pages with consistent visual style.
@@ -47,13 +50,16 @@ class GeminiImageProcessor:
             pages: List of page dictionaries with 'pageNumber' and 'text'
             age_group: Target age group for style selection
             story_context: Optional story metadata for consistency
+            spool: Optional spool; each image is written to it as soon as
+                its batch arrives, and imageData holds the reference
             
         Returns:
-            List of dictionaries with pageNumber, imageData, and format
+            List of dictionaries with pageNumber, imageData (PNG bytes or
+            SpooledAsset), and format
         """
-        if not self.client:
+        if not self.providers:
             logger.warning("No Gemini client available, using placeholders")
-            return self._generate_placeholder_images(pages)
+            return self._generate_placeholder_images(pages, spool)
 
         story_title = self._extract_story_title(story_context)
         style = self._get_style_for_age_group(age_group)
@@ -61,7 +67,7 @@ class GeminiImageProcessor:
         try:
             # Generate all images in one request
             generated_images = self._generate_all_images_batch(
-                pages, story_title, style, age_group
+                pages, story_title, style, age_group, spool
             )
             
             # Map generated images to pages
@@ -77,7 +83,7 @@ class GeminiImageProcessor:
                     # Fallback if we didn't get enough images
                     images.append({
                         "pageNumber": page["pageNumber"],
-                        "imageData": self._create_placeholder(),
+                        "imageData": self._hand_off(self._create_placeholder(), spool),
                         "format": "png"
                     })
             
@@ -86,17 +92,18 @@ class GeminiImageProcessor:
         except Exception as e:
             logger.error(f"Error generating images batch: {str(e)}")
             # Fallback to placeholders for all pages
-            return self._generate_placeholder_images(pages)
+            return self._generate_placeholder_images(pages, spool)
 
     def _generate_all_images_batch(
             self,
             pages: List[Dict[str, Any]],
             story_title: str,
             style: str,
-            age_group: str
-    ) -> List[str]:
+            age_group: str,
+            spool: Optional[AssetSpool] = None
+    ) -> List[Union[bytes, SpooledAsset]]:
         """Generate all images in batches (max 4 images per batch)."""
-        if not self.client:
+        if not self.providers:
             raise ImageGenerationError("Gemini client not initialized")
         
         # Imagen API supports max 4 images per request
@@ -142,41 +149,50 @@ IMPORTANT: Each image must depict different scenes corresponding to the specific
             logger.debug(f"Batch prompt preview: {prompt[:300]}...")
 
             try:
-                response = self.client.models.generate_images(
-                    model='imagen-4.0-generate-preview-06-06',
-                    prompt=prompt,
-                    config=types.GenerateImagesConfig(
-                        number_of_images=batch_size,
+                with stage_timer(
+                    "image_batch",
+                    provider="imagen",
+                    model=IMAGEN_MODEL,
+                    first_page=batch_pages[0]["pageNumber"],
+                    images=batch_size
+                ) as span:
+                    response_images = self.providers.generate_images(
+                        IMAGEN_MODEL,
+                        prompt,
+                        batch_size,
                         safety_filter_level="block_low_and_above",
                         person_generation="allow_adult"
                     )
-                )
+                    span.set_attribute("generated", len(response_images))
 
-                if not response.generated_images:
+                if not response_images:
                     logger.warning(f"No images generated for batch starting at page {batch_start + 1}")
                     # Add placeholders for this batch
-                    generated_images.extend([self._create_placeholder() for _ in range(batch_size)])
+                    generated_images.extend([
+                        self._hand_off(self._create_placeholder(), spool) for _ in range(batch_size)
+                    ])
                 else:
                     # Extract images from this batch
-                    batch_images = []
-                    for generated_image in response.generated_images:
-                        if hasattr(generated_image, 'image') and hasattr(generated_image.image, 'image_bytes'):
-                            image_data = base64.b64encode(generated_image.image.image_bytes).decode()
-                            batch_images.append(image_data)
-                        else:
-                            batch_images.append(self._create_placeholder())
+                    batch_images = [
+                        image if image else self._create_placeholder()
+                        for image in response_images
+                    ]
                     
                     # Ensure we have the right number of images
                     while len(batch_images) < batch_size:
                         batch_images.append(self._create_placeholder())
                     
-                    generated_images.extend(batch_images[:batch_size])
+                    generated_images.extend(
+                        self._hand_off(image, spool) for image in batch_images[:batch_size]
+                    )
                     logger.info(f"Successfully generated {len(batch_images)} images in batch")
 
             except Exception as e:
                 logger.error(f"Gemini batch API error for pages {batch_start + 1}-{batch_end}: {str(e)}")
                 # Add placeholders for failed batch
-                generated_images.extend([self._create_placeholder() for _ in range(batch_size)])
+                generated_images.extend([
+                    self._hand_off(self._create_placeholder(), spool) for _ in range(batch_size)
+                ])
         
         logger.info(f"Total images generated: {len(generated_images)} for {len(pages)} pages")
         return generated_images
@@ -198,7 +214,7 @@ IMPORTANT: Each image must depict different scenes corresponding to the specific
             story_summary: str,
             style: str,
             age_group: str
-    ) -> str:
+    ) -> bytes:
         """Generate a single page image with story context."""
         page_num = page['pageNumber']
         page_text = page.get('text', '')
@@ -236,32 +252,29 @@ IMPORTANT: Each image must depict different scenes corresponding to the specific
                 - Be bright, colorful, and age-appropriate for {age_group}"""
 
 
-    async def _generate_with_gemini(self, prompt: str, total_pages: int) -> str:
+    async def _generate_with_gemini(self, prompt: str, total_pages: int) -> bytes:
         """Generate an image using Gemini's Imagen model."""
-        if not self.client:
+        if not self.providers:
             raise ImageGenerationError("Gemini client not initialized")
 
         try:
-            response = self.client.models.generate_images(
-                model='imagen-4.0-generate-preview-06-06',
-                prompt=prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=total_pages,
-                    safety_filter_level="block_low_and_above",
-                    person_generation="allow_adult"
-                )
+            response_images = self.providers.generate_images(
+                IMAGEN_MODEL,
+                prompt,
+                total_pages,
+                safety_filter_level="block_low_and_above",
+                person_generation="allow_adult"
             )
 
-            if not response.generated_images:
+            if not response_images:
                 logger.warning("No images generated by Imagen")
                 return self._create_placeholder()
 
             # Extract image data from response
-            for generated_image in response.generated_images:
-                if hasattr(generated_image, 'image') and hasattr(generated_image.image, 'image_bytes'):
-                    image_data = base64.b64encode(generated_image.image.image_bytes).decode()
+            for image in response_images:
+                if image:
                     logger.info("Successfully generated image with Imagen")
-                    return image_data
+                    return image
 
             logger.warning("Could not extract image data from response")
             return self._create_placeholder()
@@ -296,24 +309,44 @@ IMPORTANT: Each image must depict different scenes corresponding to the specific
         }
         return style_map.get(age_group, "children's book illustration")
 
-    def _generate_placeholder_images(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _generate_placeholder_images(
+            self,
+            pages: List[Dict[str, Any]],
+            spool: Optional[AssetSpool] = None
+    ) -> List[Dict[str, Any]]:
         """Generate placeholder images for all pages."""
         return [
             {
                 "pageNumber": page["pageNumber"],
-                "imageData": self._create_placeholder(),
+                "imageData": self._hand_off(self._create_placeholder(), spool),
                 "format": "png"
             }
             for page in pages
         ]
 
-    def _create_placeholder(self) -> str:
-        """Create a simple placeholder image."""
-        img = Image.new('RGB', (1024, 768), color=(135, 206, 235))  # Sky blue
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        return base64.b64encode(buffer.read()).decode()
+    def _hand_off(
+            self,
+            image: bytes,
+            spool: Optional[AssetSpool]
+    ) -> Union[bytes, SpooledAsset]:
+        """Spool an image as soon as it's produced, when a spool is given."""
+        return spool.put(image, ".png") if spool else image
+
+    def _create_placeholder(self) -> bytes:
+        """Create a simple placeholder image (PNG bytes)."""
+        record_placeholder_images()
+        return placeholder_png()
+
+
+@lru_cache(maxsize=1)
+def placeholder_png() -> bytes:
+    """The placeholder image, rendered once per process."""
+    from PIL import Image
+
+    img = Image.new('RGB', (1024, 768), color=(135, 206, 235))  # Sky blue
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
 
 
 # Create a singleton instance for backward compatibility
@@ -323,10 +356,11 @@ _processor = None
 async def generate_story_images(
         pages: List[Dict[str, Any]],
         age_group: str,
-        story_context: Optional[Dict[str, Any]] = None
+        story_context: Optional[Dict[str, Any]] = None,
+        spool: Optional[AssetSpool] = None
 ) -> List[Dict[str, Any]]:
     """Legacy function for backward compatibility."""
     global _processor
     if _processor is None:
         _processor = GeminiImageProcessor()
-    return _processor.generate_story_images(pages, age_group, story_context)
+    return _processor.generate_story_images(pages, age_group, story_context, spool)
@@ -0,0 +1,561 @@
+"""
+Provider calls (Gemini text and TTS, Imagen, gTTS) behind one interface.
+
+Processors make every external call through `get_providers()`:
+
+- `LiveProviders` calls the SDKs.
+- `RecordingProviders` (PROVIDER_MODE=record) calls them too and writes
+  each request, response, latency and error to a cassette directory.
+- `ReplayProviders` (PROVIDER_MODE=replay) serves calls from a cassette
+  without the network, waiting for the recorded latency (or a synthetic
+  one) and optionally injecting bursts of 429s, so performance and
+  regression runs are offline and deterministic.
+
+The SDKs take seconds to import, so they are imported on first use.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_MODES = ("live", "record", "replay")
+REPLAY_LATENCIES = ("recorded", "synthetic", "none")
+
+# Cassette names for each kind of call
+TEXT = "gemini_text"
+SPEECH = "gemini_tts"
+IMAGES = "imagen"
+GTTS = "gtts"
+
+BLOB_DIR = "blobs"
+
+
+class ProviderError(Exception):
+    """A provider call failed (replayed or injected failures included)."""
+
+
+class RateLimited(ProviderError):
+    """The provider answered 429 Resource Exhausted."""
+
+
+class CassetteMiss(ProviderError):
+    """Replay found no recording for a request."""
+
+
+def extract_audio(response) -> Optional[Tuple[bytes, str]]:
+    """Get (audio bytes, mime type) from the first audio part of a response"""
+    for candidate in getattr(response, 'candidates', None) or []:
+        content = getattr(candidate, 'content', None)
+        for part in getattr(content, 'parts', None) or []:
+            # Check for inline_data with audio
+            if getattr(part, 'inline_data', None) and part.inline_data.data:
+                audio_data = part.inline_data.data
+                mime_type = part.inline_data.mime_type
+                logger.info(f"Generated audio with mime_type: {mime_type}")
+                return audio_data, mime_type
+    return None
+
+
+class Providers(ABC):
+    """Every external model call the worker makes.
+
+    The Imagen and gTTS calls block their thread, like the SDKs they wrap.
+    """
+
+    @abstractmethod
+    async def generate_text(self, model: str, prompt: str, **options: Any) -> str:
+        """Gemini text generation; returns the response text."""
+
+    @abstractmethod
+    async def generate_speech(self, model: str, prompt: str, **options: Any) -> Optional[Tuple[bytes, str]]:
+        """Gemini TTS; returns (audio bytes, mime type), or None without audio."""
+
+    @abstractmethod
+    def generate_images(self, model: str, prompt: str, count: int, **options: Any) -> List[Optional[bytes]]:
+        """Imagen; returns image bytes (None where an image has no data)."""
+
+    @abstractmethod
+    def synthesize_speech(self, text: str, lang: str, slow: bool = False) -> bytes:
+        """gTTS; returns MP3 bytes."""
+
+    def warm_up(self) -> None:
+        """Import SDKs and build clients ahead of the first call (blocking)."""
+
+
+class LiveProviders(Providers):
+    """Calls the real SDKs."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or settings.gemini_api_key
+        self._genai = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def genai(self):
+        """google.generativeai, configured with the API key."""
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+            return self._genai
+
+    def client(self):
+        """google.genai client (Gemini TTS and Imagen)."""
+        with self._lock:
+            if self._client is None:
+                from google import genai as google_genai
+
+                self._client = google_genai.Client(api_key=self.api_key)
+            return self._client
+
+    def warm_up(self) -> None:
+        import gtts  # noqa: F401
+
+        self.genai()
+        self.client()
+
+    async def generate_text(self, model: str, prompt: str, safety_settings=None, **options: Any) -> str:
+        genai = self.genai()
+        response = await genai.GenerativeModel(
+            model,
+            safety_settings=safety_settings
+        ).generate_content_async(
+            prompt,
+            generation_config=genai.types.GenerationConfig(**options)
+        )
+        return response.text
+
+    async def generate_speech(
+        self,
+        model: str,
+        prompt: str,
+        voice: Optional[str] = None,
+        **options: Any
+    ) -> Optional[Tuple[bytes, str]]:
+        from google.genai import types
+
+        # The google.generativeai GenerationConfig has no response_modalities,
+        # so speech goes through the google.genai client
+        speech_config = None
+        if voice:
+            speech_config = types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=voice)
+                )
+            )
+        response = await self.client().aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_modalities=["AUDIO"],
+                speech_config=speech_config,
+                **options
+            )
+        )
+        return extract_audio(response)
+
+    def generate_images(self, model: str, prompt: str, count: int, **options: Any) -> List[Optional[bytes]]:
+        from google.genai import types
+
+        response = self.client().models.generate_images(
+            model=model,
+            prompt=prompt,
+            config=types.GenerateImagesConfig(number_of_images=count, **options)
+        )
+        return [
+            getattr(getattr(generated, "image", None), "image_bytes", None)
+            for generated in response.generated_images or []
+        ]
+
+    def synthesize_speech(self, text: str, lang: str, slow: bool = False) -> bytes:
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+def request_key(provider: str, model: str, request: Dict[str, Any]) -> str:
+    """Stable key of a provider request (hex SHA-256)."""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "request": request},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded provider interactions in a directory.
+
+    Each request is a JSON file `<provider>/<key>.json` holding every
+    recorded take of it (latency, error or response); bytes in responses
+    are stored once under `blobs/<sha256>`.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # provider -> keys in recording order (loose replay walks these)
+        self._order: Dict[str, List[str]] = {}
+        self._takes: Dict[str, List[Dict[str, Any]]] = {}
+        self._load()
+
+    def _path(self, provider: str, key: str) -> str:
+        return os.path.join(self.directory, provider, key + ".json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, BLOB_DIR, digest)
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for provider in os.listdir(self.directory):
+            folder = os.path.join(self.directory, provider)
+            if provider == BLOB_DIR or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                        takes = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable cassette entry {provider}/{name}: {e}")
+                    continue
+                key = name[:-len(".json")]
+                self._takes[key] = takes
+                found.append((takes[0]["recordedAt"], provider, key))
+        for _, provider, key in sorted(found):
+            self._order.setdefault(provider, []).append(key)
+        logger.info(f"Loaded {len(found)} recorded provider requests from {self.directory}")
+
+    def _dump(self, value: Any) -> Any:
+        if isinstance(value, (bytes, bytearray)):
+            digest = hashlib.sha256(value).hexdigest()
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(value)
+                os.replace(tmp_path, path)
+            return {"$blob": digest}
+        if isinstance(value, (list, tuple)):
+            return [self._dump(item) for item in value]
+        if isinstance(value, dict):
+            return {name: self._dump(item) for name, item in value.items()}
+        return value
+
+    def _restore(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            if set(value) == {"$blob"}:
+                with open(self._blob_path(value["$blob"]), "rb") as f:
+                    return f.read()
+            return {name: self._restore(item) for name, item in value.items()}
+        if isinstance(value, list):
+            return [self._restore(item) for item in value]
+        return value
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        request: Dict[str, Any],
+        seconds: float,
+        response: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Append a take of a request to the cassette."""
+        key = request_key(provider, model, request)
+        take = {
+            "provider": provider,
+            "model": model,
+            "request": request,
+            "seconds": round(seconds, 4),
+            "recordedAt": datetime.utcnow().isoformat(),
+            "error": None if error is None else {
+                "type": type(error).__name__,
+                "message": str(error),
+                "rateLimited": is_rate_limit(error)
+            },
+            "response": None if error is not None else self._dump(response)
+        }
+        with self._lock:
+            takes = self._takes.setdefault(key, [])
+            if not takes:
+                self._order.setdefault(provider, []).append(key)
+            takes.append(take)
+            path = self._path(provider, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(takes, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+
+    def takes(self, key: str) -> List[Dict[str, Any]]:
+        return self._takes.get(key, [])
+
+    def keys(self, provider: str) -> List[str]:
+        return self._order.get(provider, [])
+
+    def response(self, take: Dict[str, Any]) -> Any:
+        return self._restore(take["response"])
+
+    def latencies(self, provider: str) -> List[float]:
+        return [
+            take["seconds"]
+            for key in self.keys(provider)
+            for take in self._takes[key]
+            if not take["error"]
+        ]
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return isinstance(error, RateLimited) or "429" in str(error) or "exhausted" in str(error).lower()
+
+
+class RecordingProviders(Providers):
+    """Calls another provider set and records every call to a cassette."""
+
+    def __init__(self, inner: Providers, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def warm_up(self) -> None:
+        self.inner.warm_up()
+
+    async def _record_async(self, provider: str, model: str, request: Dict[str, Any], call):
+        started = time.perf_counter()
+        try:
+            response = await call()
+        except Exception as e:
+            self.cassette.record(provider, model, request, time.perf_counter() - started, error=e)
+            raise
+        self.cassette.record(provider, model, request, time.perf_counter() - started, response)
+        return response
+
+    def _record(self, provider: str, model: str, request: Dict[str, Any], call: Callable):
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception as e:
+            self.cassette.record(provider, model, request, time.perf_counter() - started, error=e)
+            raise
+        self.cassette.record(provider, model, request, time.perf_counter() - started, response)
+        return response
+
+    async def generate_text(self, model: str, prompt: str, **options: Any) -> str:
+        return await self._record_async(
+            TEXT, model, {"prompt": prompt, **options},
+            lambda: self.inner.generate_text(model, prompt, **options)
+        )
+
+    async def generate_speech(self, model: str, prompt: str, **options: Any) -> Optional[Tuple[bytes, str]]:
+        return await self._record_async(
+            SPEECH, model, {"prompt": prompt, **options},
+            lambda: self.inner.generate_speech(model, prompt, **options)
+        )
+
+    def generate_images(self, model: str, prompt: str, count: int, **options: Any) -> List[Optional[bytes]]:
+        return self._record(
+            IMAGES, model, {"prompt": prompt, "count": count, **options},
+            lambda: self.inner.generate_images(model, prompt, count, **options)
+        )
+
+    def synthesize_speech(self, text: str, lang: str, slow: bool = False) -> bytes:
+        return self._record(
+            GTTS, "gtts", {"text": text, "lang": lang, "slow": slow},
+            lambda: self.inner.synthesize_speech(text, lang, slow)
+        )
+
+
+class RateLimitBursts:
+    """Deterministic bursts of 429s: each call starts a burst with
+    probability `rate`, and a burst fails `length` consecutive calls of
+    the same provider."""
+
+    def __init__(self, rate: float, length: int, seed: int = 0):
+        self.rate = rate
+        self.length = max(1, length)
+        self._rng = random.Random(seed)
+        self._remaining: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.injected = 0
+
+    def check(self, provider: str) -> None:
+        """Raise RateLimited if this call falls in a burst."""
+        with self._lock:
+            remaining = self._remaining.get(provider, 0)
+            if not remaining and self._rng.random() < self.rate:
+                remaining = self.length
+            if not remaining:
+                return
+            self._remaining[provider] = remaining - 1
+            self.injected += 1
+        raise RateLimited(f"429 {provider}: Resource has been exhausted (replayed burst)")
+
+
+class ReplayProviders(Providers):
+    """Serves calls from a cassette, without the network.
+
+    A request is matched to its recording by key; takes of a repeated
+    request are served in turn. Unless `strict`, a request without a
+    recording gets the provider's next recording in order instead, so a
+    cassette of a few stories can drive any number of jobs.
+
+    `latency` is "recorded" (each take's own), "synthetic" (log-normal
+    around the provider's recorded median, spread `sigma`) or "none",
+    and is multiplied by `latency_scale`.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: str = "recorded",
+        latency_scale: float = 1.0,
+        sigma: float = 0.3,
+        strict: bool = False,
+        faults: Optional[RateLimitBursts] = None,
+        seed: int = 0
+    ):
+        if latency not in REPLAY_LATENCIES:
+            raise ValueError(f"Unknown replay latency {latency!r}; expected one of {REPLAY_LATENCIES}")
+        self.cassette = cassette
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.sigma = sigma
+        self.strict = strict
+        self.faults = faults
+        self._rng = random.Random(seed)
+        self._medians: Dict[str, float] = {}
+        # Calls served per provider (loose matches) and per recorded request
+        self._loose: Dict[str, int] = {}
+        self._turns: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _take(self, provider: str, model: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(provider, model, request)
+        with self._lock:
+            self.calls[provider] = self.calls.get(provider, 0) + 1
+            if not self.cassette.takes(key):
+                keys = self.cassette.keys(provider)
+                if self.strict or not keys:
+                    raise CassetteMiss(f"No recording of {provider} request {key[:12]}")
+                served = self._loose.get(provider, 0)
+                self._loose[provider] = served + 1
+                key = keys[served % len(keys)]
+            takes = self.cassette.takes(key)
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            return takes[turn % len(takes)]
+
+    def _delay(self, provider: str, take: Dict[str, Any]) -> float:
+        if self.latency == "none":
+            return 0.0
+        if self.latency == "recorded":
+            return take["seconds"] * self.latency_scale
+        with self._lock:
+            if provider not in self._medians:
+                self._medians[provider] = statistics.median(
+                    self.cassette.latencies(provider) or [take["seconds"]]
+                )
+            median = self._medians[provider]
+            if median <= 0:
+                return 0.0
+            return self._rng.lognormvariate(math.log(median), self.sigma) * self.latency_scale
+
+    def _result(self, take: Dict[str, Any]) -> Any:
+        error = take["error"]
+        if error:
+            raise (RateLimited if error["rateLimited"] else ProviderError)(
+                f"{error['type']}: {error['message']} (replayed)"
+            )
+        return self.cassette.response(take)
+
+    async def _replay_async(self, provider: str, model: str, request: Dict[str, Any]) -> Any:
+        if self.faults:
+            self.faults.check(provider)
+        take = self._take(provider, model, request)
+        await asyncio.sleep(self._delay(provider, take))
+        return self._result(take)
+
+    def _replay(self, provider: str, model: str, request: Dict[str, Any]) -> Any:
+        if self.faults:
+            self.faults.check(provider)
+        take = self._take(provider, model, request)
+        # Blocking, like the SDK call it stands in for
+        time.sleep(self._delay(provider, take))
+        return self._result(take)
+
+    async def generate_text(self, model: str, prompt: str, **options: Any) -> str:
+        return await self._replay_async(TEXT, model, {"prompt": prompt, **options})
+
+    async def generate_speech(self, model: str, prompt: str, **options: Any) -> Optional[Tuple[bytes, str]]:
+        audio = await self._replay_async(SPEECH, model, {"prompt": prompt, **options})
+        return tuple(audio) if audio else None
+
+    def generate_images(self, model: str, prompt: str, count: int, **options: Any) -> List[Optional[bytes]]:
+        return self._replay(IMAGES, model, {"prompt": prompt, "count": count, **options})
+
+    def synthesize_speech(self, text: str, lang: str, slow: bool = False) -> bytes:
+        return self._replay(GTTS, "gtts", {"text": text, "lang": lang, "slow": slow})
+
+
+_providers: Optional[Providers] = None
+
+
+def create_providers(mode: Optional[str] = None) -> Providers:
+    """Build the provider set for a mode (PROVIDER_MODE by default)."""
+    mode = mode or settings.provider_mode
+    if mode == "live":
+        return LiveProviders()
+    cassette = Cassette(settings.provider_cassette_dir)
+    if mode == "record":
+        logger.info(f"Recording provider calls to {settings.provider_cassette_dir}")
+        return RecordingProviders(LiveProviders(), cassette)
+    if mode == "replay":
+        logger.info(f"Replaying provider calls from {settings.provider_cassette_dir}")
+        faults = None
+        if settings.provider_replay_429_rate > 0:
+            faults = RateLimitBursts(
+                settings.provider_replay_429_rate,
+                settings.provider_replay_429_burst,
+                settings.provider_replay_seed
+            )
+        return ReplayProviders(
+            cassette,
+            latency=settings.provider_replay_latency,
+            latency_scale=settings.provider_replay_latency_scale,
+            strict=settings.provider_replay_strict,
+            faults=faults,
+            seed=settings.provider_replay_seed
+        )
+    raise ValueError(f"Unknown provider mode {mode!r}; expected one of {PROVIDER_MODES}")
+
+
+def get_providers() -> Providers:
+    """Return the process-wide provider set."""
+    global _providers
+    if _providers is None:
+        _providers = create_providers()
+    return _providers
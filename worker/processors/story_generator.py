@@ -1,14 +1,14 @@
 import os
-import google.generativeai as genai
 from typing import Dict, List
 import json
 import logging
 
+from utils.metrics import stage_timer
+from .providers import get_providers
+
 logger = logging.getLogger(__name__)
 
-# Configure Gemini only if not using mock
-if os.getenv("USE_MOCK_STORIES") != "true":
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+STORY_MODEL = 'gemini-1.5-flash-latest'
 
 # Age-specific story parameters
 AGE_CONFIGS = {
@@ -101,26 +101,24 @@ For interactiveZones:
 
     try:
         # Generate with Gemini
-        model = genai.GenerativeModel(
-            'gemini-1.5-flash-latest',
-            safety_settings={
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE'
-            }
-        )
-        response = await model.generate_content_async(
-            system_prompt,
-            generation_config=genai.types.GenerationConfig(
+        with stage_timer("text_generation", provider="gemini", model=STORY_MODEL) as span:
+            response_text = await get_providers().generate_text(
+                STORY_MODEL,
+                system_prompt,
+                safety_settings={
+                    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+                    'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE'
+                },
                 temperature=0.9,
                 max_output_tokens=2048,
                 response_mime_type="application/json"
             )
-        )
+            span.set_attribute("characters", len(response_text))
         
         # Parse the response
-        story_data = json.loads(response.text)
+        story_data = json.loads(response_text)
         
         # Validate structure
         if not all(key in story_data for key in ["title", "pages"]):
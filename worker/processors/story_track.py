@@ -0,0 +1,115 @@
+"""
+Continuous narration track for a whole story.
+
+Page clips are appended to a spooled PCM buffer as pages finish, so memory
+stays flat while the story is generated; the track is encoded once at the
+end together with a marker table of page start offsets.
+"""
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from utils.media_store import MediaValue, media_bytes
+from utils.metrics import stage_timer
+from . import audio_dsp, audio_transcoder
+
+logger = logging.getLogger(__name__)
+
+
+class StoryTrackBuilder:
+    """Builds one narration track from per-page clips, in page order.
+
+    Pages may be added in any order; each is appended as soon as every
+    earlier page has arrived (or been skipped).
+    """
+
+    def __init__(self, story_id: str, page_numbers: List[int], gap_ms: Optional[int] = None):
+        self.story_id = story_id
+        self.sample_rate = audio_dsp.SAMPLE_RATE
+        self._order = list(page_numbers)
+        self._next = 0
+        self._pending: Dict[int, Optional[MediaValue]] = {}
+        self._gap = np.zeros(
+            int(self.sample_rate * (settings.story_track_gap_ms if gap_ms is None else gap_ms) / 1000),
+            dtype=np.int16
+        )
+        self._spool = tempfile.TemporaryFile(prefix="story-track-")
+        self._samples = 0
+        self.markers: List[Dict[str, Any]] = []
+
+    def add_page(self, page_number: int, audio_data: Optional[MediaValue]) -> None:
+        """Queue a page's encoded narration (blocking: decodes audio).
+
+        Accepts raw bytes, a spooled asset, or base64 text from documents
+        stored before media was kept as Binary.
+        """
+        self._pending[page_number] = audio_data
+        self._drain()
+
+    def skip_page(self, page_number: int) -> None:
+        """Mark a page as having no narration."""
+        self.add_page(page_number, None)
+
+    def _drain(self) -> None:
+        while self._next < len(self._order) and self._order[self._next] in self._pending:
+            page_number = self._order[self._next]
+            self._append(page_number, self._pending.pop(page_number))
+            self._next += 1
+
+    def _append(self, page_number: int, audio_data: Optional[MediaValue]) -> None:
+        start = self._samples
+        if audio_data:
+            try:
+                pcm = audio_dsp.decode(media_bytes(audio_data), self.sample_rate)
+                if self._samples:
+                    self._write(self._gap)
+                    start = self._samples
+                self._write(audio_dsp.to_int16(pcm.samples))
+            except Exception as e:
+                logger.warning(
+                    f"Could not add page {page_number} to story track {self.story_id}: {e}"
+                )
+        self.markers.append({
+            "pageNumber": page_number,
+            "start": round(start / self.sample_rate, 3),
+            "duration": round((self._samples - start) / self.sample_rate, 3)
+        })
+
+    def _write(self, samples: np.ndarray) -> None:
+        self._spool.write(samples.tobytes())
+        self._samples += len(samples)
+
+    @property
+    def complete(self) -> bool:
+        return self._next == len(self._order)
+
+    def finalize(self) -> Optional[Dict[str, Any]]:
+        """Encode the track (blocking).
+
+        Returns:
+            Encoded narration (see audio_transcoder.encode_narration) plus
+            a `markers` list of {pageNumber, start, duration} in seconds,
+            or None if no page had audio.
+        """
+        try:
+            if not self._samples:
+                return None
+            self._spool.seek(0)
+            samples = np.frombuffer(self._spool.read(), dtype=np.int16)
+            pcm = audio_dsp.Pcm(samples.astype(np.float32) / 32768.0, self.sample_rate)
+            with stage_timer("story_track_encode"):
+                track = audio_transcoder.encode_narration(pcm, "pcm16")
+            track["markers"] = self.markers
+            logger.info(
+                f"Encoded story track for {self.story_id}: "
+                f"{len(self.markers)} pages, {track['duration']}s"
+            )
+            return track
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._spool.close()
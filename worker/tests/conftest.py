@@ -0,0 +1,15 @@
+"""
+Shared pytest configuration for the worker test suite.
+"""
+import os
+import sys
+
+# Settings are built on first access through get_settings(), so the
+# required values must be in the environment before that first access.
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("GEMINI_API_KEY", "test-gemini-api-key")
+os.environ.setdefault("USE_MOCK_STORIES", "true")
+os.environ.setdefault("USE_MOCK_AUDIO", "true")
+os.environ.setdefault("NARRATION_CACHE_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,75 @@
+"""
+In-memory stand-ins for the Motor collections the save path writes to,
+and for the google.genai client behind the live providers.
+"""
+from types import SimpleNamespace
+
+from processors.providers import LiveProviders
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.updates = []
+        self.operations = 0
+
+    async def insert_one(self, doc):
+        self.operations += 1
+        self.inserted.append(doc)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.operations += 1
+        self.inserted.extend(request._doc for request in requests)
+
+    async def update_one(self, query, update, upsert=False):
+        self.operations += 1
+        self.updates.append((query, update))
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.operations += 1
+        self.inserted.append(doc)
+
+
+class FakeDb:
+    def __init__(self):
+        self.story_media = FakeCollection()
+        self.story_audio_tracks = FakeCollection()
+        self.stories = FakeCollection()
+        self.jobs = FakeCollection()
+
+    @property
+    def operations(self):
+        return sum(
+            collection.operations
+            for collection in (self.story_media, self.story_audio_tracks, self.stories, self.jobs)
+        )
+
+    def pushed_pages(self):
+        return [
+            page
+            for _, update in self.stories.updates
+            for page in update.get("$push", {}).get("story.pages", {}).get("$each", [])
+        ]
+
+
+class StubGenAIClient:
+    """google.genai client returning one inline audio part."""
+
+    def __init__(self, data=b"\x00\x01" * 2400, mime_type="audio/L16;codec=pcm;rate=24000"):
+        self.requests = []
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content))
+        self.response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[
+            SimpleNamespace(text=None, inline_data=None),
+            SimpleNamespace(inline_data=SimpleNamespace(data=data, mime_type=mime_type))
+        ]))])
+
+    async def generate_content(self, model, contents, config):
+        self.requests.append({"model": model, "contents": contents, "config": config})
+        return self.response
+
+
+def stub_live_providers(client=None):
+    providers = LiveProviders(api_key="test-key")
+    providers._client = client or StubGenAIClient()
+    return providers
+
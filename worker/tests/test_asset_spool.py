@@ -0,0 +1,43 @@
+import hashlib
+
+from processors.image_processor_gemini import GeminiImageProcessor
+from utils import s3
+from utils.asset_spool import AssetSpool, SpooledAsset
+from utils.media_store import media_bytes
+from utils.memory_budget import MemoryBudget, current_rss_bytes
+
+
+def test_spooled_assets_are_read_back_from_disk(tmp_path):
+    spool = AssetSpool("story", directory=str(tmp_path))
+
+    asset = spool.put(b"\x89PNG image", ".png")
+    entry = spool.spool_fields({"audioData": b"OggS", "duration": 1.0}, ("audioData", "compatAudioData"))
+
+    assert len(asset) == 10
+    assert media_bytes(asset) == b"\x89PNG image"
+    assert isinstance(entry["audioData"], SpooledAsset)
+    assert media_bytes(entry["audioData"]) == b"OggS"
+    assert s3.generate_asset_key(asset, "image", "png") == s3.generate_asset_key(b"\x89PNG image", "image", "png")
+    assert asset.sha256 == hashlib.sha256(b"\x89PNG image").hexdigest()
+
+    spool.cleanup()
+    assert not list(tmp_path.iterdir())
+
+
+def test_images_are_spooled_as_produced(tmp_path):
+    processor = GeminiImageProcessor()
+    processor.providers = None
+    spool = AssetSpool("story", directory=str(tmp_path))
+
+    images = processor.generate_story_images([{"pageNumber": 1}, {"pageNumber": 2}], "3-4 years", spool=spool)
+
+    assert all(isinstance(image["imageData"], SpooledAsset) for image in images)
+    assert media_bytes(images[0]["imageData"]).startswith(b"\x89PNG")
+    spool.cleanup()
+
+
+def test_memory_budget_throttles_when_exceeded():
+    assert current_rss_bytes() > 0
+    assert MemoryBudget(1).exceeded()
+    assert not MemoryBudget(0).exceeded()
+    assert not MemoryBudget(1 << 50).exceeded()
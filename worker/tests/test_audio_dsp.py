@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from processors import audio_dsp
+
+
+def test_resample_preserves_duration():
+    pcm = audio_dsp.Pcm(audio_dsp.sine(440, 500, sample_rate=22050), 22050)
+
+    resampled = audio_dsp.resample(pcm, 24000)
+
+    assert resampled.sample_rate == 24000
+    assert resampled.duration == pytest.approx(0.5, abs=1e-3)
+
+
+def test_change_speed_shortens_clip():
+    pcm = audio_dsp.Pcm(audio_dsp.sine(440, 1100))
+
+    faster = audio_dsp.change_speed(pcm, 1.1)
+
+    assert faster.duration == pytest.approx(1.0, abs=1e-3)
+
+
+def test_loop_to_length_returns_view_when_long_enough():
+    bed = audio_dsp.sine(220, 1000)
+
+    assert np.shares_memory(audio_dsp.loop_to_length(bed, 100), bed)
+    assert len(audio_dsp.loop_to_length(bed, 30_000)) == 30_000
+
+
+def test_gain_matches_decibels():
+    samples = np.ones(10, dtype=np.float32)
+
+    assert audio_dsp.apply_gain(samples, -20)[0] == pytest.approx(0.1)
+
+
+@pytest.mark.skipif(not audio_dsp.has_native_codec("mp3"), reason="libsndfile without MP3")
+def test_mp3_round_trip_in_process():
+    pcm = audio_dsp.Pcm(audio_dsp.sine(440, 2000) * 0.5)
+
+    decoded = audio_dsp.decode(audio_dsp.encode(pcm, format="mp3"))
+
+    assert decoded.sample_rate == audio_dsp.SAMPLE_RATE
+    assert decoded.duration == pytest.approx(2.0, abs=0.1)
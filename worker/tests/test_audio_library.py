@@ -0,0 +1,36 @@
+import numpy as np
+
+from processors import audio_dsp, audio_library, audio_processor
+
+
+def test_background_music_is_sliced_from_shared_bed():
+    first = audio_processor.generate_background_music(duration=2.0, tone="magical")
+    second = audio_processor.generate_background_music(duration=2.0, tone="wholesome")
+
+    assert len(first) == 2 * audio_dsp.SAMPLE_RATE
+    # Same synthesized frequency, so both tones are views of the same PCM
+    assert np.shares_memory(first, second)
+
+
+def test_unknown_tone_uses_wholesome_bed():
+    audio_processor.generate_background_music(duration=1.0, tone="playful")
+
+    assert "playful" not in audio_library._music_beds
+
+
+def test_mix_audio_matches_narration_length():
+    narration = audio_dsp.Pcm(audio_dsp.sine(300, 45_000) * 0.5)
+    music = audio_processor.generate_background_music(duration=0.3, tone="funny")
+
+    mixed = audio_processor.mix_audio(narration, music)
+
+    assert len(mixed.samples) == len(narration.samples)
+    assert np.abs(mixed.samples).max() <= 1.0
+
+
+def test_sound_effect_is_appended():
+    narration = audio_dsp.Pcm(audio_dsp.sine(300, 1000))
+
+    with_effect = audio_processor.add_sound_effects(narration, "Tap the sun!")
+
+    assert len(with_effect) == 1200
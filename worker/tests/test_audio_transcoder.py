@@ -0,0 +1,56 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from processors import audio_dsp, audio_transcoder
+
+
+def speech_pcm(seconds: float) -> audio_dsp.Pcm:
+    t = np.arange(int(audio_dsp.SAMPLE_RATE * seconds)) / audio_dsp.SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540)))
+    return audio_dsp.Pcm((0.3 * voice).astype(np.float32))
+
+
+def wav_bytes(pcm: audio_dsp.Pcm) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(pcm.sample_rate)
+        f.writeframes(audio_dsp.to_int16(pcm.samples).tobytes())
+    return buffer.getvalue()
+
+
+def test_detects_formats_from_bytes():
+    pcm = speech_pcm(0.5)
+
+    assert audio_transcoder.detect_format(wav_bytes(pcm)) == "wav"
+    assert audio_transcoder.detect_format(audio_dsp.encode(pcm, format="mp3")) == "mp3"
+    assert audio_transcoder.detect_format(audio_dsp.encode(pcm, format="ogg", subtype="OPUS")) == "opus"
+    assert audio_transcoder.detect_format(b"\x01\x02" * 100, "audio/L16;codec=pcm;rate=24000") == "pcm16"
+    # A mislabelled mime type doesn't override the bytes
+    assert audio_transcoder.detect_format(wav_bytes(pcm), "audio/mpeg") == "wav"
+
+
+def test_transcodes_raw_pcm_to_compact_opus():
+    pcm = speech_pcm(10.0)
+    raw = audio_dsp.to_int16(pcm.samples).tobytes()
+
+    encoded = audio_transcoder.transcode_narration(raw, "audio/L16;codec=pcm;rate=24000")
+
+    assert encoded["format"] == "opus"
+    assert encoded["sourceFormat"] == "pcm16"
+    assert encoded["duration"] == pytest.approx(10.0, abs=0.05)
+    assert audio_transcoder.detect_format(encoded["audioData"]) == "opus"
+    # ~24 kbit/s for 10 s of speech, several times smaller than the source
+    assert len(encoded["audioData"]) < len(raw) / 8
+    assert encoded["compatFormat"] in ("aac", "mp3")
+    assert encoded["compatAudioData"]
+
+
+def test_duration_comes_from_the_audio():
+    encoded = audio_transcoder.transcode_narration(wav_bytes(speech_pcm(3.3)))
+
+    assert encoded["duration"] == pytest.approx(3.3, abs=0.05)
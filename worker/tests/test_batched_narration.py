@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+import main_progressive
+from config import settings
+from processors import audio_dsp, audio_processor, audio_transcoder, providers
+from tests.fakes import StubGenAIClient, stub_live_providers
+
+PAGES = [
+    {"pageNumber": 1, "text": "The sun woke up and smiled at the sleepy town."},
+    {"pageNumber": 2, "text": "A little fox stretched, yawned and went looking for breakfast."},
+    {"pageNumber": 3, "text": "Good night, fox."},
+]
+
+
+def speech(seconds: float) -> np.ndarray:
+    return audio_dsp.sine(200, int(seconds * 1000)) * 0.5
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * audio_dsp.SAMPLE_RATE), dtype=np.float32)
+
+
+def story_pcm16(*segments: np.ndarray) -> bytes:
+    return audio_dsp.to_int16(np.concatenate(segments)).tobytes()
+
+
+def test_split_on_silences_cuts_at_longest_pauses():
+    pcm = audio_dsp.Pcm(np.concatenate([
+        speech(3.0), silence(1.5), speech(4.0), silence(0.3), speech(0.5), silence(1.5), speech(1.0)
+    ]))
+
+    parts = audio_dsp.split_on_silences(pcm, [3, 4.5, 1])
+
+    assert [round(p.duration) for p in parts] == [4, 6, 2]
+
+
+def test_split_on_silences_rejects_implausible_split():
+    pcm = audio_dsp.Pcm(np.concatenate([speech(0.5), silence(1.0), speech(8.0)]))
+
+    assert audio_dsp.split_on_silences(pcm, [1, 1]) is None
+
+
+async def test_story_narration_uses_one_batched_call(monkeypatch):
+    calls = []
+
+    async def fake_story_tts(texts, language, age_group):
+        calls.append(texts)
+        data = story_pcm16(speech(2.5), silence(2.0), speech(3.0), silence(2.0), speech(1.0))
+        return data, "audio/L16;codec=pcm;rate=24000"
+
+    async def no_per_page(*args, **kwargs):
+        raise AssertionError("should not narrate per page")
+
+    monkeypatch.setattr(audio_processor, "generate_story_with_gemini_tts", fake_story_tts)
+    monkeypatch.setattr(audio_processor, "generate_narration", no_per_page)
+
+    narration = await audio_processor.generate_story_narration(PAGES, "English", "3-4 years")
+
+    assert len(calls) == 1
+    assert [a["pageNumber"] for a in narration] == [1, 2, 3]
+    assert narration[0]["duration"] == pytest.approx(3.5, abs=0.1)
+
+
+async def test_story_narration_leaves_out_pages_the_batch_missed(monkeypatch):
+    async def unsplittable(texts, language, age_group):
+        return story_pcm16(speech(6.0)), "audio/L16;rate=24000"
+
+    async def no_per_page(*args, **kwargs):
+        raise AssertionError("pages are narrated one by one by the caller")
+
+    monkeypatch.setattr(audio_processor, "generate_story_with_gemini_tts", unsplittable)
+    monkeypatch.setattr(audio_processor, "generate_narration", no_per_page)
+
+    assert await audio_processor.generate_story_narration(PAGES, "English", "3-4 years") == []
+
+
+async def test_failed_batch_saves_each_page_before_narrating_the_next(monkeypatch):
+    db = AsyncMongoMockClient()["babel-books-test"]
+    story_id = ObjectId()
+    await db.stories.insert_one({"_id": story_id, "status": "pending"})
+    job = {"_id": ObjectId(), "storyId": story_id, "data": {"prompt": "a fox"}}
+    await db.jobs.insert_one({**job, "status": "processing"})
+    saved_before_narrating = {}
+
+    async def story(**kwargs):
+        return {"title": "Fox", "metadata": {}, "pages": [dict(page) for page in PAGES]}
+
+    async def no_images(pages, **kwargs):
+        return [None] * len(pages)
+
+    async def failed_batch(texts, language, age_group):
+        return None
+
+    async def per_page(pages, language, tone, age_group):
+        story_doc = await db.stories.find_one({"_id": story_id})
+        saved = story_doc.get("story", {}).get("pages", [])
+        for page in pages:
+            saved_before_narrating[page["pageNumber"]] = [p["pageNumber"] for p in saved]
+        return [
+            {"pageNumber": page["pageNumber"], "audioData": b"ID3", "format": "mp3", "duration": 1.0}
+            for page in pages
+        ]
+
+    monkeypatch.setattr(main_progressive, "db", db)
+    monkeypatch.setattr(main_progressive.story_generator, "generate", story)
+    monkeypatch.setattr(main_progressive.image_processor, "generate_story_images", no_images)
+    monkeypatch.setattr(audio_processor, "generate_story_with_gemini_tts", failed_batch)
+    monkeypatch.setattr(audio_processor, "generate_narration", per_page)
+    monkeypatch.setattr(audio_processor, "get_narration_cache", lambda: None)
+    monkeypatch.setattr(settings, "story_track_enabled", False)
+    monkeypatch.setattr(settings, "page_processing_delay", 0)
+
+    await main_progressive.process_single_job(job)
+
+    assert saved_before_narrating == {1: [], 2: [1], 3: [1, 2]}
+    assert (await db.jobs.find_one({"_id": job["_id"]}))["status"] == "completed"
+
+
+async def test_live_gemini_narration_is_transcoded(monkeypatch):
+    client = StubGenAIClient(story_pcm16(speech(2.0)), "audio/L16;codec=pcm;rate=24000")
+    monkeypatch.setattr(providers, "_providers", stub_live_providers(client))
+    monkeypatch.setattr(audio_processor, "get_narration_cache", lambda: None)
+
+    narration = await audio_processor.generate_narration(PAGES[:1], "English", "magical", "3-4 years")
+
+    assert len(client.requests) == 1
+    assert narration[0]["sourceFormat"] == "pcm16"
+    assert narration[0]["format"] == "opus"
+    assert audio_transcoder.detect_format(narration[0]["audioData"]) == "opus"
+    assert narration[0]["duration"] == pytest.approx(2.0, abs=0.05)
+    assert narration[0]["compatAudioData"]
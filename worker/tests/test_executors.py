@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+from utils.executors import BoundedExecutor
+
+
+async def test_runs_blocking_work_off_the_loop():
+    executor = BoundedExecutor("test", max_workers=1, max_pending=1)
+    loop_thread = threading.get_ident()
+
+    worker_thread = await executor.run(threading.get_ident)
+
+    assert worker_thread != loop_thread
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+async def test_records_queue_time_when_saturated():
+    executor = BoundedExecutor("test", max_workers=1, max_pending=4)
+
+    await asyncio.gather(*(executor.run(time.sleep, 0.05) for _ in range(3)))
+
+    stats = executor.stats()
+    assert stats["completed"] == 3
+    assert stats["waiting"] == 0
+    assert stats["queue_time_max"] >= 0.09
+    executor.shutdown()
+
+
+async def test_bounds_pending_calls():
+    executor = BoundedExecutor("test", max_workers=1, max_pending=2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    tasks = [asyncio.create_task(executor.run(block)) for _ in range(4)]
+    await asyncio.sleep(0.05)
+
+    # One running, one queued in the pool, two waiting for a slot
+    assert executor.stats()["active"] == 1
+    assert executor.stats()["waiting"] == 3
+
+    tasks[-1].cancel()
+    release.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert executor.stats()["waiting"] == 0
+    assert executor.stats()["completed"] == 3
+    executor.shutdown()
@@ -0,0 +1,68 @@
+"""
+Startup import budget: importing the worker must not load the provider
+SDKs or other heavy dependencies, which are imported on first use, and
+must not build the settings, which are read on first use.
+"""
+import os
+import subprocess
+import sys
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use, never at startup
+LAZY_MODULES = (
+    "google.generativeai",
+    "google.genai",
+    "gtts",
+    "pydub",
+    "PIL",
+    "boto3",
+    "aiohttp"
+)
+# The worker imports in about 1.2s; headroom for slower CI machines
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.5"))
+
+
+def import_times(module: str):
+    """Cumulative import time in seconds of every module loaded by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WORKER_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_startup_skips_heavy_imports_and_stays_within_budget():
+    times = import_times("main_progressive")
+
+    loaded = sorted(
+        name for name in times
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    assert not loaded, f"imported at startup: {loaded}"
+    assert times["main_progressive"] < IMPORT_BUDGET_SECONDS, (
+        f"importing main_progressive took {times['main_progressive']:.2f}s "
+        f"(budget {IMPORT_BUDGET_SECONDS}s)"
+    )
+
+
+def test_startup_does_not_build_settings():
+    result = subprocess.run(
+        [sys.executable, "-c", "import main_progressive, config; print(config._settings is None)"],
+        cwd=WORKER_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert result.stdout.strip() == "True", "importing main_progressive built Settings()"
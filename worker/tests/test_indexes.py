@@ -0,0 +1,93 @@
+"""
+Explain-plan checks against a local mongod.
+
+Uses MONGODB_TEST_URI (default mongodb://localhost:27017, e.g. the
+docker-compose mongodb service) and skips when no server is reachable.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from utils.indexes import ensure_indexes
+
+TEST_DATABASE = "babel-books-index-test"
+
+
+@pytest.fixture
+async def mongo_db():
+    uri = os.getenv("MONGODB_TEST_URI", "mongodb://localhost:27017")
+    client = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=1000)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"No mongod reachable at {uri}")
+
+    await client.drop_database(TEST_DATABASE)
+    yield client[TEST_DATABASE]
+    await client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+def plan_stages(explain):
+    """Stage names of the winning plan, outermost first."""
+    plan = explain["queryPlanner"]["winningPlan"]
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    while plan:
+        stages.append(plan)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def assert_uses_index(explain, index_name):
+    stages = plan_stages(explain)
+    names = [stage["stage"] for stage in stages]
+    assert "COLLSCAN" not in names
+    assert "SORT" not in names
+    assert any(stage.get("indexName") == index_name for stage in stages), names
+
+
+async def test_claim_query_uses_status_created_at_index(mongo_db):
+    start = datetime.utcnow()
+    await mongo_db.jobs.insert_many([
+        {
+            "status": ("pending", "processing", "completed", "failed")[i % 4],
+            "createdAt": start + timedelta(seconds=i)
+        }
+        for i in range(2000)
+    ])
+    await ensure_indexes(mongo_db)
+
+    claim = mongo_db.jobs.find({"status": "pending"}).sort("createdAt", 1).limit(1)
+    assert_uses_index(await claim.explain(), "status_createdAt")
+
+    count = await mongo_db.command(
+        "explain", {"count": "jobs", "query": {"status": "completed"}}, verbosity="queryPlanner"
+    )
+    assert_uses_index(count, "status_createdAt")
+
+
+async def test_media_fetch_uses_story_page_index(mongo_db):
+    stories = [ObjectId() for _ in range(200)]
+    await mongo_db.story_media.insert_many([
+        {"storyId": story_id, "pageNumber": page}
+        for story_id in stories
+        for page in range(1, 11)
+    ])
+    await ensure_indexes(mongo_db)
+
+    fetch = mongo_db.story_media.find({"storyId": stories[42]})
+    assert_uses_index(await fetch.explain(), "storyId_pageNumber")
+
+
+async def test_ensure_indexes_is_idempotent(mongo_db):
+    await ensure_indexes(mongo_db)
+    await ensure_indexes(mongo_db)
+
+    indexes = await mongo_db.jobs.index_information()
+    assert indexes["status_createdAt"]["key"] == [("status", 1), ("createdAt", 1)]
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from utils.job_archive import ARCHIVE_COLLECTION, archive_finished_jobs
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["babel-books-test"]
+
+
+def job(status, age_hours, finished_hours=None, **fields):
+    now = datetime.utcnow()
+    doc = {"status": status, "createdAt": now - timedelta(hours=age_hours), **fields}
+    if finished_hours is not None:
+        doc["finishedAt"] = now - timedelta(hours=finished_hours)
+    return doc
+
+
+async def test_moves_only_finished_jobs_past_retention(db):
+    await db.jobs.insert_many([
+        job("completed", 48, 47, storyId="old-completed"),
+        job("failed", 30, 29, storyId="old-failed"),
+        job("completed", 30, storyId="legacy-completed"),
+        job("completed", 2, 1, storyId="recent-completed"),
+        # Created long ago but only just finished
+        job("failed", 30, 1, storyId="slow-failed"),
+        job("pending", 48, storyId="old-pending"),
+        job("processing", 48, storyId="old-processing")
+    ])
+
+    archived = await archive_finished_jobs(db, timedelta(hours=24), batch_size=2)
+
+    assert archived == 3
+    remaining = {doc["storyId"] for doc in await db.jobs.find().to_list(None)}
+    assert remaining == {"recent-completed", "slow-failed", "old-pending", "old-processing"}
+    archive = await db[ARCHIVE_COLLECTION].find().to_list(None)
+    assert {doc["storyId"] for doc in archive} == {"old-completed", "old-failed", "legacy-completed"}
+    assert all(isinstance(doc["archivedAt"], datetime) for doc in archive)
+
+
+async def test_resumes_after_partial_run(db):
+    result = await db.jobs.insert_one(job("completed", 48, 47))
+    # A previous run copied the job but stopped before deleting it
+    copy = await db.jobs.find_one({"_id": result.inserted_id})
+    await db[ARCHIVE_COLLECTION].insert_one(copy)
+
+    assert await archive_finished_jobs(db, timedelta(hours=24)) == 1
+    assert await db.jobs.count_documents({}) == 0
+    assert await db[ARCHIVE_COLLECTION].count_documents({}) == 1
+
+
+async def test_nothing_to_archive(db):
+    await db.jobs.insert_one(job("pending", 1))
+
+    assert await archive_finished_jobs(db, timedelta(hours=24)) == 0
+    assert await db.jobs.count_documents({}) == 1
+
+
+async def test_jobs_changed_after_the_scan_are_kept(db, monkeypatch):
+    await db.jobs.insert_many([job("completed", 48, 47, storyId="done"), job("failed", 48, 47, storyId="retried")])
+    collection_type = type(db[ARCHIVE_COLLECTION])
+    insert_many = collection_type.insert_many
+
+    async def requeue_then_insert(collection, docs, **kwargs):
+        # A retry re-queues a job between the scan and the delete
+        await db.jobs.update_one({"storyId": "retried"}, {"$set": {"status": "pending"}})
+        return await insert_many(collection, docs, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", requeue_then_insert)
+
+    assert await archive_finished_jobs(db, timedelta(hours=24)) == 1
+    assert [doc["storyId"] for doc in await db.jobs.find().to_list(None)] == ["retried"]
+    archive = await db[ARCHIVE_COLLECTION].find().to_list(None)
+    assert [doc["storyId"] for doc in archive] == ["done"]
@@ -0,0 +1,65 @@
+import tracemalloc
+
+import pytest
+
+from utils.executors import BoundedExecutor
+from utils.job_usage import JobUsage, current_usage, track_usage
+from utils.metrics import record_fallback, record_media, record_placeholder_images, stage_timer
+
+
+async def test_provider_calls_media_and_fallbacks_are_charged_to_the_job():
+    usage = JobUsage()
+    executor = BoundedExecutor("usage-test", 1, 1)
+
+    def synthesize():
+        with stage_timer("tts_gtts", provider="gtts"):
+            record_media("narration", 300)
+
+    try:
+        with track_usage(usage):
+            with stage_timer("image_batch", provider="imagen", model="imagen-4"):
+                record_placeholder_images(2)
+            with pytest.raises(RuntimeError):
+                with stage_timer("image_batch", provider="imagen", model="imagen-4"):
+                    raise RuntimeError("quota")
+            await executor.run(synthesize)
+            record_media("image", 1000)
+            record_fallback("gtts")
+    finally:
+        executor.shutdown()
+
+    assert current_usage() is None
+    summary = usage.summary()
+    calls = {(c["provider"], c["model"]): c for c in summary["providerCalls"]}
+    assert calls[("imagen", "imagen-4")]["calls"] == 2
+    assert calls[("imagen", "imagen-4")]["errors"] == 1
+    assert calls[("gtts", "")]["calls"] == 1
+    assert calls[("gtts", "")]["maxSeconds"] <= calls[("gtts", "")]["seconds"] + 0.001
+    assert summary["mediaBytes"] == {"image": 1000, "narration": 300}
+    assert summary["fallbacks"] == {"gtts": 1}
+    assert summary["placeholderImages"] == 2
+    assert summary["cpuSeconds"] >= 0
+    assert summary["peakRssBytes"] > 0
+
+
+def test_stages_outside_a_job_are_not_charged():
+    usage = JobUsage()
+    with stage_timer("tts_gemini", provider="gemini", model="tts"):
+        record_media("narration", 10)
+
+    assert usage.summary()["providerCalls"] == []
+    assert usage.summary()["mediaBytes"] == {}
+
+
+def test_peak_traced_memory_is_per_job():
+    tracemalloc.start()
+    try:
+        retained = bytearray(8 * 2**20)
+        del retained
+        usage = JobUsage()
+        retained = bytearray(2**20)
+        summary = usage.summary()
+    finally:
+        tracemalloc.stop()
+
+    assert 2**20 <= summary["peakTracedBytes"] < 8 * 2**20
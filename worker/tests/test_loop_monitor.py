@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from prometheus_client import REGISTRY
+
+from utils.loop_monitor import LoopLagMonitor
+
+
+def blocking_render():
+    time.sleep(0.4)
+
+
+async def test_captures_stack_of_blocking_call():
+    monitor = LoopLagMonitor(interval_ms=20, threshold_ms=150)
+    stop = asyncio.Event()
+    lag_count = REGISTRY.get_sample_value("babel_event_loop_lag_seconds_count") or 0
+
+    async def job():
+        await asyncio.sleep(0.05)
+        blocking_render()
+
+    probe = asyncio.create_task(monitor.run(stop))
+    await asyncio.create_task(job(), name="story-job")
+    await asyncio.sleep(0.1)
+    stop.set()
+    await probe
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    stall = stats["recent_stalls"][0]
+    assert stall["task"] == "story-job"
+    assert "blocking_render" in "".join(stall["stack"])
+    assert stall["duration"] >= 0.3
+    assert stats["max_lag_seconds"] >= 0.3
+    assert REGISTRY.get_sample_value("babel_event_loop_lag_seconds_count") > lag_count
+
+
+async def test_short_pauses_are_not_stalls():
+    monitor = LoopLagMonitor(interval_ms=20, threshold_ms=200)
+    stop = asyncio.Event()
+
+    probe = asyncio.create_task(monitor.run(stop))
+    for _ in range(5):
+        await asyncio.sleep(0.02)
+        time.sleep(0.01)
+    stop.set()
+    await probe
+
+    assert monitor.stats()["stalls"] == 0
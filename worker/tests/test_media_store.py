@@ -0,0 +1,69 @@
+import base64
+
+from bson import Binary
+
+from config import settings
+from tests.fakes import FakeDb
+from utils import media_store
+from utils.progressive_save import save_page_progressively
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+
+    async def upload_from_stream(self, filename, data, metadata=None):
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = bytes(data)
+        return file_id
+
+    async def open_download_stream(self, file_id):
+        data = self.files[file_id]
+
+        class Stream:
+            async def read(self):
+                return data
+
+        return Stream()
+
+
+def test_media_bytes_reads_binary_and_legacy_base64():
+    assert media_store.media_bytes(Binary(b"\x00\x01")) == b"\x00\x01"
+    assert media_store.media_bytes(base64.b64encode(b"\x00\x01").decode()) == b"\x00\x01"
+    assert media_store.media_bytes(None) is None
+
+
+async def test_page_media_is_stored_as_binary():
+    db = FakeDb()
+
+    await save_page_progressively(
+        db,
+        "story",
+        {"pageNumber": 1, "text": "Hello"},
+        image_data={"imageData": b"\x89PNG", "format": "png"},
+        audio_data={"audioData": b"OggS", "format": "opus", "duration": 1.0}
+    )
+
+    media = db.story_media.inserted[0]
+    assert isinstance(media["imageData"], Binary)
+    assert bytes(media["imageData"]) == b"\x89PNG"
+    assert bytes(media["audioData"]) == b"OggS"
+    assert await media_store.load_media(db, media, "audioData") == b"OggS"
+
+
+async def test_large_media_goes_to_gridfs(monkeypatch):
+    db = FakeDb()
+    bucket = FakeBucket()
+    monkeypatch.setattr(media_store, "get_media_bucket", lambda db: bucket)
+    monkeypatch.setattr(settings, "media_gridfs_threshold_bytes", 4)
+
+    fields = await media_store.store_media(db, "imageData", b"large image", "story/page-1.png")
+
+    assert "imageData" not in fields
+    assert await media_store.load_media(db, fields, "imageData") == b"large image"
+
+
+async def test_legacy_base64_documents_are_readable():
+    legacy = {"audioData": base64.b64encode(b"ID3 legacy").decode()}
+
+    assert await media_store.load_media(FakeDb(), legacy, "audioData") == b"ID3 legacy"
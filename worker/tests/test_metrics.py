@@ -0,0 +1,58 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from prometheus_client import REGISTRY, generate_latest
+
+from utils.executors import get_audio_executor
+from utils.job_archive import ARCHIVE_COLLECTION
+from utils.metrics import QueueDepth, queue_depth, record_fallback, stage_timer, write_timer
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["babel-books-test"]
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+async def test_queue_depth_counts_every_status_in_one_refresh(db):
+    statuses = ["pending"] * 3 + ["processing"] + ["failed"] * 2
+    await db.jobs.insert_many([{"status": status} for status in statuses])
+    await db[ARCHIVE_COLLECTION].insert_many([{"status": "completed"} for _ in range(4)])
+
+    depth = QueueDepth()
+    await depth.refresh(db)
+
+    assert depth.stats() == {
+        "pending": 3, "processing": 1, "completed": 0, "failed": 2, "archived": 4
+    }
+    assert depth.refreshed_at is not None
+
+
+async def test_scrape_reports_cached_counts_and_executors(db):
+    await db.jobs.insert_one({"status": "pending"})
+    await queue_depth.refresh(db)
+    await get_audio_executor().run(lambda: None)
+
+    text = generate_latest().decode()
+
+    assert 'babel_jobs{status="pending"} 1.0' in text
+    assert 'babel_executor_completed_total{executor="audio"}' in text
+    assert sample("babel_executor_waiting", {"executor": "audio"}) == 0
+
+
+def test_timers_and_fallbacks_record_samples():
+    stages = sample("babel_stage_duration_seconds_count", {"stage": "test_stage"})
+    writes = sample("babel_mongo_write_duration_seconds_count", {"operation": "test_write"})
+    fallbacks = sample("babel_fallbacks_total", {"kind": "test_fallback"})
+
+    with stage_timer("test_stage"):
+        pass
+    with write_timer("test_write"):
+        pass
+    record_fallback("test_fallback", 2)
+
+    assert sample("babel_stage_duration_seconds_count", {"stage": "test_stage"}) == stages + 1
+    assert sample("babel_mongo_write_duration_seconds_count", {"operation": "test_write"}) == writes + 1
+    assert sample("babel_fallbacks_total", {"kind": "test_fallback"}) == fallbacks + 2
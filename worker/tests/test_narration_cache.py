@@ -0,0 +1,125 @@
+import os
+import threading
+
+import pytest
+
+from processors import audio_dsp, audio_processor, providers
+from utils.narration_cache import NarrationCache, make_cache_key
+
+
+def test_cache_key_depends_on_every_input():
+    base = make_cache_key("Once upon a time", "English", {"speed": "slow"}, "gtts")
+
+    assert base == make_cache_key("Once upon a time", "English", {"speed": "slow"}, "gtts")
+    assert base != make_cache_key("Once upon a time!", "English", {"speed": "slow"}, "gtts")
+    assert base != make_cache_key("Once upon a time", "Spanish", {"speed": "slow"}, "gtts")
+    assert base != make_cache_key("Once upon a time", "English", {"speed": "medium"}, "gtts")
+    assert base != make_cache_key("Once upon a time", "English", {"speed": "slow"}, "gemini-tts")
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = NarrationCache(str(tmp_path), max_bytes=10_000)
+    cache.put("abc", b"audio-bytes", {"duration": 1.5, "format": "mp3"})
+
+    data, metadata = cache.get("abc")
+
+    assert data == b"audio-bytes"
+    assert metadata == {"duration": 1.5, "format": "mp3"}
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = NarrationCache(str(tmp_path), max_bytes=1_000)
+    cache.put("first", b"x" * 300, {})
+    cache.put("second", b"x" * 300, {})
+    cache.get("first")
+    cache.put("third", b"x" * 300, {})
+    cache.put("fourth", b"x" * 300, {})
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.total_bytes <= 1_000
+    assert not os.path.exists(tmp_path / "second.audio")
+
+
+def test_index_survives_restart(tmp_path):
+    cache = NarrationCache(str(tmp_path), max_bytes=10_000)
+    cache.put("abc", b"audio-bytes", {"format": "mp3"})
+
+    reopened = NarrationCache(str(tmp_path), max_bytes=10_000)
+
+    assert len(reopened) == 1
+    assert reopened.get("abc")[0] == b"audio-bytes"
+
+
+class FlakyGTTS(providers.LiveProviders):
+    """gTTS that fails on its first call."""
+
+    def __init__(self):
+        super().__init__(api_key="test-key")
+        self.calls = 0
+
+    def synthesize_speech(self, text, lang, slow=False):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("gTTS unreachable")
+        return audio_dsp.encode(audio_dsp.Pcm(audio_dsp.sine(200, 3000) * 0.5), format="mp3")
+
+
+async def test_fallback_beep_is_not_cached(tmp_path, monkeypatch):
+    async def no_gemini(*args):
+        return None
+
+    cache = NarrationCache(str(tmp_path), max_bytes=10_000_000)
+    gtts = FlakyGTTS()
+    monkeypatch.setattr(audio_processor, "get_narration_cache", lambda: cache)
+    monkeypatch.setattr(audio_processor, "generate_with_gemini_tts", no_gemini)
+    monkeypatch.setattr(providers, "_providers", gtts)
+    page = {"pageNumber": 1, "text": "A fox."}
+
+    beep = await audio_processor.generate_narration([page], "English", "magical", "3-4 years")
+    assert beep[0]["duration"] == pytest.approx(1.0, abs=0.1)
+    assert len(cache) == 0
+
+    narration = await audio_processor.generate_narration([page], "English", "magical", "3-4 years")
+    assert gtts.calls == 2
+    assert narration[0]["duration"] == pytest.approx(3.0, abs=0.1)
+    # Real narration is cached (both renditions)
+    assert len(cache) == 2
+
+
+class ThreadRecordingCache(NarrationCache):
+    """Records the thread every read and write runs on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.current_thread())
+        return super().get(key)
+
+    def put(self, key, data, metadata):
+        self.threads.add(threading.current_thread())
+        return super().put(key, data, metadata)
+
+
+async def test_cache_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    async def no_gemini(*args):
+        return None
+
+    cache = ThreadRecordingCache(str(tmp_path), max_bytes=10_000_000)
+    gtts = FlakyGTTS()
+    gtts.calls = 1
+    monkeypatch.setattr(audio_processor, "get_narration_cache", lambda: cache)
+    monkeypatch.setattr(audio_processor, "generate_with_gemini_tts", no_gemini)
+    monkeypatch.setattr(providers, "_providers", gtts)
+    page = {"pageNumber": 1, "text": "A fox."}
+
+    await audio_processor.generate_narration([page], "English", "magical", "3-4 years")
+    await audio_processor.generate_narration([page], "English", "magical", "3-4 years")
+
+    assert gtts.calls == 2
+    assert cache.hits > 0 and len(cache) == 2
+    assert cache.threads and threading.current_thread() not in cache.threads
@@ -0,0 +1,84 @@
+from tests.fakes import FakeDb
+from utils.db import update_story_status
+from utils.progressive_save import PageWriteBatcher, save_page_progressively
+
+
+def page(number):
+    return {"pageNumber": number, "text": f"Page {number}"}
+
+
+def assets():
+    return (
+        {"imageData": b"\x89PNG", "format": "png"},
+        {"audioData": b"OggS", "format": "opus", "duration": 1.0}
+    )
+
+
+async def test_pages_ready_together_are_written_together():
+    db = FakeDb()
+    writer = PageWriteBatcher(db, "story", total_pages=3, max_pages=8, max_delay_ms=60_000)
+
+    for number in (1, 2, 3):
+        image, audio = assets()
+        await writer.add(page(number), image_data=image, audio_data=audio)
+    assert db.operations == 0
+    await writer.flush()
+
+    assert db.stories.operations == 1
+    assert db.story_media.operations == 1
+    assert [p["pageNumber"] for p in db.pushed_pages()] == [1, 2, 3]
+    assert len(db.story_media.inserted) == 3
+
+    fields = db.stories.updates[0][1]["$set"]
+    assert fields["status"] == "generating_assets"
+    assert fields["progress.current_page"] == 3
+    assert fields["progress.page2"] == "completed"
+
+
+async def test_batch_flushes_when_full():
+    db = FakeDb()
+    writer = PageWriteBatcher(db, "story", total_pages=3, max_pages=2, max_delay_ms=60_000)
+
+    for number in (1, 2, 3):
+        await writer.add(page(number))
+
+    assert [p["pageNumber"] for p in db.pushed_pages()] == [1, 2]
+    await writer.flush()
+    assert [p["pageNumber"] for p in db.pushed_pages()] == [1, 2, 3]
+
+
+async def test_batching_at_least_halves_page_writes():
+    per_page, batched = FakeDb(), FakeDb()
+
+    # Previous save path: progress update, media insert and page push per page
+    for number in range(1, 11):
+        image, audio = assets()
+        await update_story_status(
+            per_page, "story", "generating_assets",
+            progress={"current_page": number, "total_pages": 10}
+        )
+        await save_page_progressively(per_page, "story", page(number), image, audio)
+
+    writer = PageWriteBatcher(batched, "story", total_pages=10)
+    for number in range(1, 11):
+        image, audio = assets()
+        await writer.add(page(number), image_data=image, audio_data=audio)
+    await writer.flush()
+
+    assert batched.pushed_pages() == per_page.pushed_pages()
+    assert batched.operations * 2 <= per_page.operations
+
+
+async def test_compat_rendition_uses_the_narration_field_names():
+    db = FakeDb()
+    audio = {
+        "audioData": b"OggS", "format": "opus", "duration": 1.0,
+        "compatAudioData": b"ID3", "compatFormat": "mp3", "compatMimeType": "audio/mpeg"
+    }
+
+    await save_page_progressively(db, "story", page(1), audio_data=audio)
+
+    [media_doc] = db.story_media.inserted
+    assert bytes(media_doc["compatAudioData"]) == b"ID3"
+    assert (media_doc["compatFormat"], media_doc["compatMimeType"]) == ("mp3", "audio/mpeg")
+    assert db.pushed_pages()[0]["audio"]["compat"] == {"format": "mp3", "mimeType": "audio/mpeg"}
@@ -0,0 +1,102 @@
+import threading
+import time
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main_progressive
+from config import settings
+from utils.profiling import HeapTracker, sample_stacks
+
+
+def spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_returns_collapsed_stacks_of_busy_threads():
+    stop = threading.Event()
+    busy = threading.Thread(target=spin_until, args=(stop,), name="busy-worker")
+    busy.start()
+    try:
+        stacks = sample_stacks(0.2, interval=0.002)
+    finally:
+        stop.set()
+        busy.join()
+
+    lines = stacks.splitlines()
+    busy_lines = [line for line in lines if line.startswith("busy-worker;")]
+    assert busy_lines
+    stack, count = busy_lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "spin_until (test_profiling.py:" in stack
+
+
+def test_heap_diff_reports_new_allocations():
+    tracker = HeapTracker(frames=5)
+    try:
+        baseline = tracker.diff()
+        assert baseline["baseline"] is True
+
+        retained = [bytearray(1024) for _ in range(2000)]
+        diff = tracker.diff(limit=5)
+
+        assert diff["baseline"] is False
+        top = diff["top"][0]
+        assert "test_profiling.py" in top["location"]
+        assert top["size_diff"] >= 2000 * 1024
+        del retained
+    finally:
+        tracker.stop()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "debug_token", "secret")
+    # No lifespan: the debug endpoints don't need MongoDB or the job loop
+    return TestClient(main_progressive.app)
+
+
+def test_debug_endpoints_require_the_token(client):
+    assert client.get("/debug/heap").status_code == 401
+    assert client.get("/debug/heap", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_debug_endpoints_are_hidden_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "debug_token", None)
+    assert client.get("/debug/profile").status_code == 404
+
+
+def test_profile_endpoint_returns_collapsed_stacks(client):
+    response = client.get(
+        "/debug/profile",
+        params={"seconds": 0.1},
+        headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+
+
+def test_heap_endpoint_diffs_and_stops(client):
+    headers = {"Authorization": "Bearer secret"}
+
+    assert client.get("/debug/heap", headers=headers).json()["baseline"] is True
+    assert client.get("/debug/heap", headers=headers).json()["baseline"] is False
+    assert client.get("/debug/heap", params={"stop": True}, headers=headers).json() == {
+        "tracing": False
+    }
+
+
+def test_heap_endpoint_leaves_job_tracing_running(client):
+    headers = {"Authorization": "Bearer secret"}
+    # As JOB_TRACEMALLOC does at startup
+    tracemalloc.start()
+    try:
+        assert client.get("/debug/heap", headers=headers).json()["baseline"] is True
+        assert client.get("/debug/heap", params={"stop": True}, headers=headers).status_code == 409
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,86 @@
+import asyncio
+
+from tests.fakes import FakeDb
+from utils.progress import StoryProgress
+from utils.progressive_save import PageWriteBatcher
+
+
+def written(db):
+    return [update["$set"] for _, update in db.stories.updates]
+
+
+async def test_rapid_updates_are_debounced_to_latest_state():
+    db = FakeDb()
+    progress = StoryProgress(db, "story", interval_ms=50)
+
+    await progress.update("generating_text")
+    for page in range(1, 21):
+        await progress.update("generating_assets", progress={"current_page": page})
+    assert len(written(db)) == 1
+
+    await asyncio.sleep(0.1)
+
+    assert len(written(db)) == 2
+    assert written(db)[1]["progress.current_page"] == 20
+    assert written(db)[1]["status"] == "generating_assets"
+
+
+async def test_terminal_states_flush_immediately():
+    db = FakeDb()
+    progress = StoryProgress(db, "story", interval_ms=60_000)
+
+    await progress.update("generating_text")
+    await progress.update("generating_images", progress={"total_pages": 5})
+    await progress.update("failed", error="boom")
+
+    assert len(written(db)) == 2
+    assert written(db)[1]["status"] == "failed"
+    assert written(db)[1]["error"] == "boom"
+    # The images phase's progress ended with it
+    assert "progress.total_pages" not in written(db)[1]
+
+
+async def test_pending_progress_rides_along_with_page_writes():
+    db = FakeDb()
+    progress = StoryProgress(db, "story", interval_ms=60_000)
+    writer = PageWriteBatcher(db, "story", total_pages=1, progress=progress)
+
+    await progress.update("generating_text")
+    await progress.update("generating_audio", progress={"narration": "batched"})
+    await writer.add({"pageNumber": 1, "text": "Hello"})
+    await writer.flush()
+    await progress.close()
+
+    assert len(written(db)) == 2
+    assert written(db)[1]["progress.narration"] == "batched"
+    assert written(db)[1]["status"] == "generating_assets"
+
+
+async def test_progress_fields_are_unset_when_the_phase_changes():
+    db = FakeDb()
+    progress = StoryProgress(db, "story", interval_ms=0)
+
+    await progress.update("generating_images", progress={"status": "generating_all_images", "total_pages": 3})
+    await progress.update("generating_images", progress={"status": "generating_all_images"})
+    await progress.update("generating_audio", progress={"narration": "batched"})
+
+    updates = [update for _, update in db.stories.updates]
+    assert "$unset" not in updates[1]
+    assert updates[2]["$unset"] == {"progress.status": "", "progress.total_pages": ""}
+    assert updates[2]["$set"]["progress.narration"] == "batched"
+
+
+async def test_page_writes_carry_unsets_without_conflicting():
+    db = FakeDb()
+    progress = StoryProgress(db, "story", interval_ms=60_000)
+    writer = PageWriteBatcher(db, "story", total_pages=1, progress=progress)
+
+    await progress.update("generating_images", progress={"status": "generating_all_images", "total_pages": 1})
+    await progress.update("generating_audio")
+    await writer.add({"pageNumber": 1, "text": "Hello"})
+    await writer.flush()
+
+    update = db.stories.updates[-1][1]
+    # total_pages is set again by the page write, so only the stale status is unset
+    assert update["$unset"] == {"progress.status": ""}
+    assert update["$set"]["progress.total_pages"] == 1
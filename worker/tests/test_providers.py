@@ -0,0 +1,137 @@
+import pytest
+
+from processors.providers import (
+    Cassette,
+    CassetteMiss,
+    ProviderError,
+    Providers,
+    RateLimitBursts,
+    RateLimited,
+    RecordingProviders,
+    ReplayProviders
+)
+from tests.fakes import stub_live_providers
+
+
+class ScriptedProviders(Providers):
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_text(self, model, prompt, **options):
+        self.calls += 1
+        if "fail" in prompt:
+            raise RuntimeError("429 Resource has been exhausted")
+        return f"story for {prompt}"
+
+    async def generate_speech(self, model, prompt, **options):
+        self.calls += 1
+        return b"RIFF audio", "audio/wav"
+
+    def generate_images(self, model, prompt, count, **options):
+        self.calls += 1
+        return [b"\x89PNG" + bytes([i]) for i in range(count - 1)] + [None]
+
+    def synthesize_speech(self, text, lang, slow=False):
+        self.calls += 1
+        return b"ID3 " + text.encode()
+
+
+async def record(directory):
+    providers = RecordingProviders(ScriptedProviders(), Cassette(directory))
+    await providers.generate_text("gemini", "a fox", temperature=0.9)
+    await providers.generate_text("gemini", "a bear", temperature=0.9)
+    await providers.generate_speech("tts", "read this", temperature=0.7)
+    providers.generate_images("imagen", "pictures", 3, safety_filter_level="low")
+    providers.synthesize_speech("hello", "en")
+    with pytest.raises(RuntimeError):
+        await providers.generate_text("gemini", "fail", temperature=0.9)
+    return providers
+
+
+async def test_replays_recorded_responses_offline(tmp_path):
+    await record(str(tmp_path))
+    replay = ReplayProviders(Cassette(str(tmp_path)), latency="none")
+
+    assert await replay.generate_text("gemini", "a bear", temperature=0.9) == "story for a bear"
+    assert await replay.generate_speech("tts", "read this", temperature=0.7) == (b"RIFF audio", "audio/wav")
+    assert replay.generate_images("imagen", "pictures", 3, safety_filter_level="low") == [
+        b"\x89PNG\x00", b"\x89PNG\x01", None
+    ]
+    assert replay.synthesize_speech("hello", "en") == b"ID3 hello"
+    # Recorded failures fail again, as rate limits
+    with pytest.raises(RateLimited):
+        await replay.generate_text("gemini", "fail", temperature=0.9)
+
+
+async def test_unrecorded_requests_reuse_recordings_unless_strict(tmp_path):
+    await record(str(tmp_path))
+    cassette = Cassette(str(tmp_path))
+
+    loose = ReplayProviders(cassette, latency="none")
+    assert await loose.generate_text("gemini", "a cat", temperature=0.9) == "story for a fox"
+    assert await loose.generate_text("gemini", "a dog", temperature=0.9) == "story for a bear"
+
+    strict = ReplayProviders(cassette, latency="none", strict=True)
+    with pytest.raises(CassetteMiss):
+        await strict.generate_text("gemini", "a cat", temperature=0.9)
+    with pytest.raises(CassetteMiss):
+        ReplayProviders(Cassette(str(tmp_path / "empty")), latency="none").synthesize_speech("hi", "en")
+
+
+async def test_rate_limit_bursts_are_deterministic(tmp_path):
+    await record(str(tmp_path))
+    cassette = Cassette(str(tmp_path))
+
+    def outcomes(seed):
+        replay = ReplayProviders(cassette, latency="none", faults=RateLimitBursts(0.3, 3, seed))
+        results = []
+        for _ in range(30):
+            try:
+                replay.synthesize_speech("hello", "en")
+                results.append("ok")
+            except RateLimited:
+                results.append("429")
+        return results
+
+    first = outcomes(7)
+    assert first == outcomes(7)
+    assert "429,429,429" in ",".join(first)
+    assert isinstance(RateLimited("x"), ProviderError)
+
+
+async def test_recorded_and_synthetic_latency(tmp_path):
+    await record(str(tmp_path))
+    cassette = Cassette(str(tmp_path))
+    take = cassette.takes(cassette.keys("gtts")[0])[0]
+
+    recorded = ReplayProviders(cassette, latency="recorded", latency_scale=2.0)
+    synthetic = ReplayProviders(cassette, latency="synthetic", seed=1)
+
+    assert recorded._delay("gtts", take) == take["seconds"] * 2.0
+    assert synthetic._delay("gtts", take) >= 0
+    with pytest.raises(ValueError):
+        ReplayProviders(cassette, latency="fast")
+
+
+async def test_live_speech_requests_audio_through_genai_client():
+    providers = stub_live_providers()
+
+    audio = await providers.generate_speech("gemini-tts", "read this", voice="Kore", temperature=0.7)
+
+    assert audio == (b"\x00\x01" * 2400, "audio/L16;codec=pcm;rate=24000")
+    request = providers._client.requests[0]
+    assert request["model"] == "gemini-tts"
+    assert request["contents"] == "read this"
+    config = request["config"]
+    assert config.response_modalities == ["AUDIO"]
+    assert config.temperature == 0.7
+    assert config.speech_config.voice_config.prebuilt_voice_config.voice_name == "Kore"
+
+
+def test_providers_must_implement_every_call():
+    class TextOnly(Providers):
+        async def generate_text(self, model, prompt, **options):
+            return ""
+
+    with pytest.raises(TypeError):
+        TextOnly()
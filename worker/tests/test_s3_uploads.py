@@ -0,0 +1,160 @@
+"""
+S3 upload tests against a local S3 endpoint.
+
+Runs against LocalStack when S3_TEST_ENDPOINT_URL is set (e.g.
+http://localhost:4566 from docker-compose), otherwise against an
+in-process moto server.
+"""
+import asyncio
+import os
+
+import pytest
+
+from config import settings
+from tests.fakes import FakeDb
+from utils import s3
+from utils.progressive_save import save_page_progressively, save_story_track, upload_page_assets
+
+BUCKET = "babel-books-test"
+
+
+@pytest.fixture
+def s3_endpoint(monkeypatch):
+    endpoint = os.getenv("S3_TEST_ENDPOINT_URL")
+    server = None
+    if not endpoint:
+        moto_server = pytest.importorskip("moto.server")
+        server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(s3, "AWS_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(s3, "S3_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(s3, "_s3_client", None)
+    monkeypatch.setattr(s3, "_known_keys", s3.KnownKeys(100))
+    monkeypatch.setattr(s3, "_upload_stats", dict.fromkeys(s3._upload_stats, 0))
+
+    client = s3.get_s3_client()
+    try:
+        client.create_bucket(Bucket=BUCKET)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    yield client
+
+    monkeypatch.setattr(s3, "_s3_client", None)
+    if server:
+        server.stop()
+
+
+def test_client_is_shared():
+    assert s3.get_s3_client() is s3.get_s3_client()
+
+
+async def test_page_assets_upload_concurrently(s3_endpoint):
+    image, audio = await upload_page_assets(
+        "story",
+        1,
+        image_data={"imageData": b"\x89PNG image", "format": "png"},
+        audio_data={
+            "audioData": b"OggS narration",
+            "format": "opus",
+            "mimeType": "audio/ogg; codecs=opus",
+            "compatAudioData": b"ID3 narration",
+            "compatFormat": "mp3",
+            "compatMimeType": "audio/mpeg"
+        }
+    )
+
+    assert "imageData" not in image and "audioData" not in audio
+    stored = s3_endpoint.get_object(Bucket=BUCKET, Key=image["key"])
+    assert stored["Body"].read() == b"\x89PNG image"
+    assert stored["ContentType"] == "image/png"
+    assert s3_endpoint.get_object(Bucket=BUCKET, Key=audio["compatKey"])["Body"].read() == b"ID3 narration"
+    assert stored["CacheControl"] == s3.IMMUTABLE_CACHE_CONTROL
+    assert image["url"].endswith(f"/{BUCKET}/{image['key']}")
+
+
+def test_keys_are_content_addressed():
+    assert s3.generate_asset_key(b"same", "image", "png") == s3.generate_asset_key(b"same", "image", "png")
+    assert s3.generate_asset_key(b"same", "image", "png") != s3.generate_asset_key(b"other", "image", "png")
+
+
+async def test_duplicate_bytes_are_uploaded_once(s3_endpoint):
+    placeholder = b"\x89PNG placeholder"
+
+    results = await asyncio.gather(*(
+        upload_page_assets("story", n, image_data={"imageData": placeholder, "format": "png"})
+        for n in (1, 2, 3)
+    ))
+    await upload_page_assets("story", 4, image_data={"imageData": placeholder, "format": "png"})
+
+    assert len({image["key"] for image, _ in results}) == 1
+    assert s3.upload_stats()["uploaded"] == 1
+    assert s3.upload_stats()["deduplicated"] == 3
+
+
+async def test_existing_objects_are_not_uploaded_again(s3_endpoint, monkeypatch):
+    url, key = await s3.upload_content_addressed(b"narration", "audio", "mp3", "audio/mpeg")
+    # Another worker process: same bucket, empty known-keys index
+    monkeypatch.setattr(s3, "_known_keys", s3.KnownKeys(100))
+
+    assert await s3.upload_content_addressed(b"narration", "audio", "mp3", "audio/mpeg") == (url, key)
+    assert s3.upload_stats()["uploaded"] == 1
+
+
+async def test_s3_pages_store_urls_not_bytes(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(settings, "enable_s3_storage", True)
+    db = FakeDb()
+
+    await asyncio.gather(*(
+        save_page_progressively(
+            db,
+            "story",
+            {"pageNumber": n, "text": "Hello"},
+            image_data={"imageData": b"\x89PNG", "format": "png"},
+            audio_data={"audioData": b"ID3", "format": "mp3", "duration": 1.0}
+        )
+        for n in (1, 2, 3)
+    ))
+
+    assert db.story_media.inserted == []
+    pages = db.pushed_pages()
+    assert all(page["image"]["url"] and page["audio"]["url"] for page in pages)
+
+
+async def test_s3_story_track_stores_urls_not_bytes(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(settings, "enable_s3_storage", True)
+    db = FakeDb()
+    track = {
+        "audioData": b"OggS track", "format": "opus", "mimeType": "audio/ogg; codecs=opus",
+        "compatAudioData": b"ID3 track", "compatFormat": "mp3", "compatMimeType": "audio/mpeg",
+        "duration": 12.5, "markers": [{"pageNumber": 1, "start": 0, "duration": 12.5}]
+    }
+
+    reference = await save_story_track(db, "story", track)
+
+    [track_doc] = db.story_audio_tracks.inserted
+    assert "audioData" not in track_doc and "compatAudioData" not in track_doc
+    assert track_doc["url"] == reference["url"]
+    assert track_doc["compatUrl"] == reference["compatUrl"]
+    assert reference["hasCompat"]
+    assert s3.upload_stats()["uploaded"] == 2
+
+
+async def test_failed_upload_falls_back_to_mongo(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(settings, "enable_s3_storage", True)
+    monkeypatch.setattr(s3, "S3_BUCKET_NAME", "missing-bucket")
+    db = FakeDb()
+
+    await save_page_progressively(
+        db,
+        "story",
+        {"pageNumber": 1, "text": "Hello"},
+        image_data={"imageData": b"\x89PNG", "format": "png"}
+    )
+
+    assert bytes(db.story_media.inserted[0]["imageData"]) == b"\x89PNG"
@@ -0,0 +1,50 @@
+import base64
+
+import pytest
+
+from processors import audio_dsp, audio_transcoder
+from processors.story_track import StoryTrackBuilder
+
+
+def clip(seconds: float, base64_encoded: bool = False):
+    pcm = audio_dsp.Pcm(audio_dsp.sine(220, int(seconds * 1000)) * 0.3)
+    data = audio_transcoder.encode_narration(pcm, "pcm16")["audioData"]
+    return base64.b64encode(data).decode() if base64_encoded else data
+
+
+def test_markers_follow_page_order_even_when_pages_finish_out_of_order():
+    builder = StoryTrackBuilder("story", [1, 2, 3], gap_ms=500)
+
+    builder.add_page(2, clip(2.0))
+    assert builder.markers == []
+    builder.add_page(1, clip(1.0, base64_encoded=True))
+    builder.add_page(3, clip(1.5))
+    track = builder.finalize()
+
+    assert [m["pageNumber"] for m in track["markers"]] == [1, 2, 3]
+    starts = [m["start"] for m in track["markers"]]
+    assert starts[0] == 0
+    assert starts[1] == pytest.approx(1.5, abs=0.05)
+    assert starts[2] == pytest.approx(4.0, abs=0.1)
+    assert track["duration"] == pytest.approx(5.5, abs=0.1)
+    assert track["format"] == "opus"
+
+
+def test_pages_without_audio_get_empty_markers():
+    builder = StoryTrackBuilder("story", [1, 2], gap_ms=0)
+
+    builder.skip_page(1)
+    builder.add_page(2, clip(1.0))
+    track = builder.finalize()
+
+    assert track["markers"][0] == {"pageNumber": 1, "start": 0.0, "duration": 0.0}
+    assert track["markers"][1]["start"] == 0.0
+
+
+def test_finalize_without_audio_returns_none():
+    builder = StoryTrackBuilder("story", [1])
+
+    builder.skip_page(1)
+
+    assert builder.complete
+    assert builder.finalize() is None
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from utils.executors import BoundedExecutor
+from utils.metrics import record_fallback, stage_timer
+from utils.tracing import (
+    NOOP_SPAN,
+    TRACE_COLLECTION,
+    JobTrace,
+    save_trace,
+    span,
+    to_otlp_json
+)
+
+
+def spans_by_name(trace):
+    return {s["name"]: s for s in trace.to_doc()["spans"]}
+
+
+async def test_spans_link_to_parents_across_tasks_and_threads():
+    trace = JobTrace(ObjectId(), ObjectId())
+    executor = BoundedExecutor("trace-test", 2, 2)
+
+    def blocking_stage():
+        with stage_timer("audio_mix", page_number=3):
+            pass
+
+    async def upload():
+        with span("s3_upload", bytes=10):
+            await asyncio.sleep(0)
+
+    try:
+        with trace.root("process_job"):
+            with span("generate_narration", pages=4):
+                await executor.run(blocking_stage)
+            await asyncio.gather(asyncio.create_task(upload()), upload())
+    finally:
+        executor.shutdown()
+
+    spans = trace.to_doc()["spans"]
+    names = [s["name"] for s in spans]
+    assert names.count("s3_upload") == 2
+    by_name = spans_by_name(trace)
+    root = by_name["process_job"]
+    assert root["parentSpanId"] is None
+    assert by_name["generate_narration"]["parentSpanId"] == root["spanId"]
+    assert by_name["audio_mix"]["parentSpanId"] == by_name["generate_narration"]["spanId"]
+    assert by_name["audio_mix"]["attributes"] == {"page_number": 3}
+    assert all(s["parentSpanId"] == root["spanId"] for s in spans if s["name"] == "s3_upload")
+    assert all(s["start"] <= s["end"] for s in spans)
+
+
+async def test_fallbacks_and_errors_are_marked():
+    trace = JobTrace(ObjectId(), ObjectId())
+
+    with trace.root("process_job"):
+        with span("generate_images"):
+            record_fallback("image_generation")
+        with pytest.raises(ValueError):
+            with span("generate_text"):
+                raise ValueError("bad story")
+
+    by_name = spans_by_name(trace)
+    event = by_name["generate_images"]["events"][0]
+    assert event["name"] == "fallback"
+    assert event["attributes"] == {"kind": "image_generation", "count": 1}
+    assert by_name["generate_text"]["error"] == "ValueError: bad story"
+    assert "error" not in by_name["process_job"]
+
+
+def test_span_outside_a_trace_is_a_noop():
+    with span("orphan") as orphan:
+        orphan.set_attribute("bytes", 1)
+    assert orphan is NOOP_SPAN
+
+
+async def test_stored_trace_exports_as_otlp_json():
+    db = AsyncMongoMockClient()["babel-books-test"]
+    job_id, story_id = ObjectId(), ObjectId()
+    trace = JobTrace(job_id, story_id)
+    with trace.root("process_job", job_id=str(job_id)):
+        with span("image_batch", model="imagen", images=4, cached=False, ratio=0.5):
+            record_fallback("gtts")
+
+    await save_trace(db, trace)
+    stored = await db[TRACE_COLLECTION].find_one({"_id": job_id})
+    exported = to_otlp_json(stored)
+
+    resource_spans = exported["resourceSpans"][0]
+    resource = {a["key"]: a["value"] for a in resource_spans["resource"]["attributes"]}
+    assert resource["story.id"] == {"stringValue": str(story_id)}
+    root, batch = resource_spans["scopeSpans"][0]["spans"]
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert "parentSpanId" not in root
+    assert batch["parentSpanId"] == root["spanId"]
+    assert batch["attributes"] == [
+        {"key": "model", "value": {"stringValue": "imagen"}},
+        {"key": "images", "value": {"intValue": "4"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}}
+    ]
+    assert int(batch["endTimeUnixNano"]) >= int(batch["startTimeUnixNano"])
+    assert batch["events"][0]["name"] == "fallback"
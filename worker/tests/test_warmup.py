@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main_progressive
+from utils.executors import BoundedExecutor
+from utils.warmup import Warmup, WarmupStep
+
+
+async def test_warmup_records_steps_and_only_required_failures_block():
+    async def ok():
+        pass
+
+    async def broken():
+        raise RuntimeError("no ffmpeg")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    warmup = Warmup(step_timeout=0.05)
+    assert not warmup.ready
+
+    assert await warmup.run([WarmupStep("ok", ok, required=True), WarmupStep("codecs", broken)])
+    assert warmup.steps["ok"]["status"] == "ok"
+    assert warmup.steps["codecs"] == {
+        "status": "failed", "required": False, "error": "no ffmpeg",
+        "seconds": warmup.steps["codecs"]["seconds"]
+    }
+
+    assert not await warmup.run([WarmupStep("slow", slow, required=True), WarmupStep("ok", ok)])
+    assert warmup.failed
+    assert warmup.steps["slow"]["error"] == "TimeoutError"
+    # Later steps still run
+    assert warmup.steps["ok"]["status"] == "ok"
+
+
+async def test_executor_warm_up_starts_every_worker_thread():
+    executor = BoundedExecutor("warm", max_workers=3, max_pending=3)
+    try:
+        await executor.warm_up()
+        assert len(executor._executor._threads) == 3
+        assert executor.stats()["completed"] == 3
+    finally:
+        executor.shutdown()
+
+
+def test_ready_waits_for_warmup_while_live_stays_ok(monkeypatch):
+    warmup = Warmup()
+    monkeypatch.setattr(main_progressive, "warmup", warmup)
+    monkeypatch.setattr(main_progressive, "job_processor_task", None)
+    client = TestClient(main_progressive.app)
+
+    assert client.get("/live").status_code == 200
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["detail"]["warmup"] == "warming_up"
+
+    async def broken():
+        raise RuntimeError("executor stuck")
+
+    asyncio.run(warmup.run([WarmupStep("executors", broken, required=True)]))
+    assert client.get("/live").status_code == 503
+    assert client.get("/ready").json()["detail"]["warmup"] == "failed"
@@ -0,0 +1,72 @@
+"""
+Per-job spool for generated media.
+
+Images and narration are written to a temporary directory as soon as they
+are produced, and only lightweight `SpooledAsset` references travel
+through the pipeline. The bytes are read back once, when the asset is
+written to its final store, so a story's assets are never all in memory.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpooledAsset:
+    """Reference to media bytes spooled to disk."""
+
+    __slots__ = ("path", "size", "sha256")
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"SpooledAsset({self.path!r}, {self.size} bytes)"
+
+
+class AssetSpool:
+    """Temporary directory holding one job's spooled assets."""
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        parent = directory or settings.asset_spool_dir
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix=f"assets-{name}-", dir=parent)
+        self._count = 0
+        self.total_bytes = 0
+
+    def put(self, data: bytes, suffix: str = "") -> SpooledAsset:
+        """Write bytes to the spool and return a reference (blocking)."""
+        self._count += 1
+        path = os.path.join(self.directory, f"{self._count:05d}{suffix}")
+        with open(path, "wb") as f:
+            f.write(data)
+        self.total_bytes += len(data)
+        return SpooledAsset(path, len(data), hashlib.sha256(data).hexdigest())
+
+    def spool_fields(self, entry: Dict, fields: Iterable[str]) -> Dict:
+        """Replace in-memory bytes in the given fields of a dict with references."""
+        for field in fields:
+            value = entry.get(field)
+            if isinstance(value, (bytes, bytearray)):
+                entry[field] = self.put(bytes(value))
+        return entry
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logger.debug(f"Removed asset spool {self.directory} ({self.total_bytes} bytes)")
@@ -1,7 +1,7 @@
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
-from .s3 import upload_asset, generate_asset_key
+from .s3 import upload_asset
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,159 @@
+"""
+Bounded thread pools for blocking work that must stay off the event loop.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """Thread pool with a cap on pending work and queue-time accounting.
+
+    At most `max_pending` calls may be queued or running at once; further
+    callers wait (asynchronously) for a slot, which applies backpressure
+    instead of growing an unbounded queue. Queue time is measured from the
+    moment `run` is awaited until the function starts on a worker thread.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"{name}-executor"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats_lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the pool and await its result."""
+        submitted = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        with self._stats_lock:
+            self.waiting += 1
+        dequeued = False
+
+        def leave_queue() -> None:
+            # Called with the stats lock held; whoever runs first (the worker
+            # thread or a cancelled caller) takes the call off the queue.
+            nonlocal dequeued
+            if not dequeued:
+                dequeued = True
+                self.waiting -= 1
+
+        def call():
+            queue_time = time.perf_counter() - submitted
+            with self._stats_lock:
+                leave_queue()
+                self.active += 1
+                self.queue_time_total += queue_time
+                self.queue_time_max = max(self.queue_time_max, queue_time)
+            if queue_time > settings.executor_queue_warn_seconds:
+                logger.warning(
+                    f"{self.name} executor queue time {queue_time:.2f}s "
+                    f"for {getattr(fn, '__name__', fn)}"
+                )
+            else:
+                logger.debug(f"{self.name} executor queue time {queue_time:.3f}s")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        # Context variables (e.g. the current trace span) follow the call
+        context = contextvars.copy_context()
+        try:
+            async with self._get_slots():
+                return await loop.run_in_executor(self._executor, context.run, call)
+        finally:
+            with self._stats_lock:
+                leave_queue()
+
+    async def warm_up(self, timeout: float = 5.0) -> None:
+        """Start every worker thread and check each one picks up work.
+
+        Each call blocks on a barrier until all workers hold one, so the
+        pool has to run them on distinct threads; a stuck or missing
+        thread breaks the barrier.
+        """
+        barrier = threading.Barrier(self.max_workers, timeout=timeout)
+        await asyncio.gather(*(self.run(barrier.wait) for _ in range(self.max_workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and queue-time statistics."""
+        with self._stats_lock:
+            started = self.active + self.completed
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "waiting": self.waiting,
+                "active": self.active,
+                "completed": self.completed,
+                "queue_time_avg": self.queue_time_total / started if started else 0.0,
+                "queue_time_max": self.queue_time_max
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+
+
+def get_audio_executor() -> BoundedExecutor:
+    """Executor for gTTS synthesis and audio decode/mix/encode."""
+    if "audio" not in _executors:
+        _executors["audio"] = BoundedExecutor(
+            "audio",
+            settings.audio_executor_workers,
+            settings.audio_executor_max_pending
+        )
+    return _executors["audio"]
+
+
+def get_upload_executor() -> BoundedExecutor:
+    """Executor for blocking S3 uploads."""
+    if "upload" not in _executors:
+        _executors["upload"] = BoundedExecutor(
+            "upload",
+            settings.s3_upload_workers,
+            settings.s3_upload_max_pending
+        )
+    return _executors["upload"]
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every executor created so far."""
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
@@ -0,0 +1,60 @@
+"""
+Indexes the worker and the web app rely on, ensured at worker startup.
+"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, IndexModel
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BASE_INDEXES: Dict[str, List[IndexModel]] = {
+    # Claim query: {status: "pending"} sorted by createdAt; /metrics
+    # counts per status use the same prefix
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("createdAt", ASCENDING)], name="status_createdAt")
+    ],
+    # Page media fetched by story (web app) and page
+    "story_media": [
+        IndexModel([("storyId", ASCENDING), ("pageNumber", ASCENDING)], name="storyId_pageNumber")
+    ],
+    # One continuous narration track per story, upserted by storyId
+    "story_audio_tracks": [
+        IndexModel([("storyId", ASCENDING)], name="storyId", unique=True)
+    ]
+}
+
+
+def get_indexes() -> Dict[str, List[IndexModel]]:
+    """Indexes per collection, including the configured TTL indexes."""
+    indexes = dict(BASE_INDEXES)
+
+    # Job traces expire after the configured number of days
+    if settings.job_trace_ttl_days > 0:
+        indexes["job_traces"] = [
+            IndexModel(
+                [("createdAt", ASCENDING)],
+                name="createdAt_ttl",
+                expireAfterSeconds=settings.job_trace_ttl_days * 86400
+            )
+        ]
+
+    # Archived jobs expire after the configured number of days
+    if settings.job_archive_ttl_days > 0:
+        indexes["jobs_archive"] = [
+            IndexModel(
+                [("archivedAt", ASCENDING)],
+                name="archivedAt_ttl",
+                expireAfterSeconds=settings.job_archive_ttl_days * 86400
+            )
+        ]
+    return indexes
+
+
+async def ensure_indexes(db) -> None:
+    """Create any missing indexes (no-op for ones that already exist)."""
+    for collection, indexes in get_indexes().items():
+        names = await db[collection].create_indexes(indexes)
+        logger.info(f"Ensured indexes on {collection}: {', '.join(names)}")
@@ -0,0 +1,105 @@
+"""
+Moves finished jobs out of the hot `jobs` collection.
+
+Completed and failed jobs are copied to `jobs_archive` once they are older
+than the retention period and then deleted from `jobs`, so the collection
+the claimer scans only holds pending and in-flight work.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import BulkWriteError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "jobs_archive"
+FINISHED_STATUSES = ["completed", "failed"]
+
+# Duplicate key: the job was archived by a run that stopped before deleting it
+DUPLICATE_KEY_ERROR = 11000
+
+
+def finished_jobs_query(cutoff: datetime) -> dict:
+    """Finished jobs older than `cutoff`.
+
+    The status/createdAt prefix uses the claim index; `finishedAt` keeps
+    long-running jobs around for the full retention after they end (jobs
+    written before it existed only have createdAt).
+    """
+    return {
+        "status": {"$in": FINISHED_STATUSES},
+        "createdAt": {"$lt": cutoff},
+        "$or": [
+            {"finishedAt": {"$lt": cutoff}},
+            {"finishedAt": {"$exists": False}}
+        ]
+    }
+
+
+async def archive_finished_jobs(
+    db,
+    retention: Optional[timedelta] = None,
+    batch_size: Optional[int] = None
+) -> int:
+    """Move finished jobs past the retention to the archive; returns the count."""
+    if retention is None:
+        retention = timedelta(hours=settings.job_retention_hours)
+    batch_size = batch_size or settings.job_archive_batch_size
+    cutoff = datetime.utcnow() - retention
+    archived = 0
+
+    while True:
+        jobs = await db.jobs.find(finished_jobs_query(cutoff)).limit(batch_size).to_list(None)
+        if not jobs:
+            break
+
+        now = datetime.utcnow()
+        for job in jobs:
+            job["archivedAt"] = now
+        failed = set()
+        try:
+            await db[ARCHIVE_COLLECTION].insert_many(jobs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                job = jobs[error["index"]]
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    # Refresh the copy left behind by an interrupted run
+                    await db[ARCHIVE_COLLECTION].replace_one({"_id": job["_id"]}, job)
+                else:
+                    logger.error(f"Could not archive job {job['_id']}: {error.get('errmsg')}")
+                    failed.add(job["_id"])
+
+        # Only delete what is now in the archive, and only if the job is
+        # still finished and past the retention (it may have been re-queued)
+        ids = [job["_id"] for job in jobs if job["_id"] not in failed]
+        result = await db.jobs.delete_many({"_id": {"$in": ids}, **finished_jobs_query(cutoff)})
+        archived += result.deleted_count
+        if result.deleted_count < len(ids):
+            # Jobs that changed meanwhile stay in `jobs`; drop their stale copies
+            kept = await db.jobs.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)
+            await db[ARCHIVE_COLLECTION].delete_many({"_id": {"$in": [job["_id"] for job in kept]}})
+        # Failed inserts are retried on the next run rather than refetched now
+        if failed or len(jobs) < batch_size:
+            break
+
+    if archived:
+        logger.info(f"Archived {archived} finished jobs older than {cutoff.isoformat()}")
+    return archived
+
+
+async def run_job_archiver(db, stop: asyncio.Event, interval: Optional[float] = None) -> None:
+    """Archive finished jobs every `interval` seconds until `stop` is set."""
+    interval = interval or settings.job_archive_interval_seconds
+    while not stop.is_set():
+        try:
+            await archive_finished_jobs(db)
+        except Exception as e:
+            logger.error(f"Error archiving finished jobs: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
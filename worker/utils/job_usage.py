@@ -0,0 +1,108 @@
+"""
+Per-job resource accounting.
+
+A `JobUsage` is made current for the duration of a job (in a context
+variable, so it follows tasks and executor calls) and collects what the
+job cost: CPU time, peak memory, media bytes produced, provider calls
+and their latency, and fallbacks. Its summary is stored on the job
+document.
+"""
+import contextvars
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .memory_budget import current_rss_bytes
+
+_current_usage: contextvars.ContextVar[Optional["JobUsage"]] = contextvars.ContextVar(
+    "current_usage", default=None
+)
+
+
+class JobUsage:
+    """Resources used by one job."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        # Process CPU: the worker runs one job at a time, so this is the
+        # job's own work plus a little background housekeeping
+        self._cpu_started = time.process_time()
+        self.peak_rss = current_rss_bytes() or 0
+        self.media_bytes: Dict[str, int] = {}
+        self.provider_calls: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.fallbacks: Dict[str, int] = {}
+        self.placeholder_images = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def add_media(self, kind: str, size: int) -> None:
+        with self._lock:
+            self.media_bytes[kind] = self.media_bytes.get(kind, 0) + size
+
+    def add_provider_call(self, provider: str, model: Optional[str], seconds: float, error: bool) -> None:
+        with self._lock:
+            calls = self.provider_calls.setdefault(
+                (provider, model or ""), {"calls": 0, "errors": 0, "seconds": 0.0, "maxSeconds": 0.0}
+            )
+            calls["calls"] += 1
+            calls["errors"] += int(error)
+            calls["seconds"] += seconds
+            calls["maxSeconds"] = max(calls["maxSeconds"], seconds)
+
+    def add_fallback(self, kind: str, count: int = 1) -> None:
+        with self._lock:
+            self.fallbacks[kind] = self.fallbacks.get(kind, 0) + count
+
+    def add_placeholder_images(self, count: int = 1) -> None:
+        with self._lock:
+            self.placeholder_images += count
+
+    def sample_memory(self) -> None:
+        rss = current_rss_bytes()
+        if rss is not None:
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, rss)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals so far, in the shape stored on the job document."""
+        self.sample_memory()
+        with self._lock:
+            provider_calls: List[Dict[str, Any]] = [
+                {
+                    "provider": provider,
+                    "model": model,
+                    **calls,
+                    "seconds": round(calls["seconds"], 3),
+                    "maxSeconds": round(calls["maxSeconds"], 3)
+                }
+                for (provider, model), calls in self.provider_calls.items()
+            ]
+            summary = {
+                "wallSeconds": round(time.perf_counter() - self._started, 3),
+                "cpuSeconds": round(time.process_time() - self._cpu_started, 3),
+                "peakRssBytes": self.peak_rss,
+                "mediaBytes": dict(self.media_bytes),
+                "providerCalls": provider_calls,
+                "fallbacks": dict(self.fallbacks),
+                "placeholderImages": self.placeholder_images
+            }
+        if tracemalloc.is_tracing():
+            summary["peakTracedBytes"] = tracemalloc.get_traced_memory()[1]
+        return summary
+
+
+@contextmanager
+def track_usage(usage: JobUsage) -> Iterator[JobUsage]:
+    """Make `usage` current while processing a job."""
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def current_usage() -> Optional[JobUsage]:
+    return _current_usage.get()
@@ -0,0 +1,129 @@
+"""
+Event-loop lag monitoring.
+
+A probe task sleeps for a fixed interval and records how late it wakes
+up; that lateness is time the loop spent running something else without
+yielding. A watchdog thread watches the probe's heartbeat and, when the
+loop has been stuck longer than the threshold, captures the stack of the
+code blocking it, so blocking calls show up in logs with their call site.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = Histogram(
+    "babel_event_loop_lag_seconds",
+    "How late the event loop probe woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+LOOP_STALLS = Counter(
+    "babel_event_loop_stalls_total",
+    "Times the event loop was blocked longer than the threshold"
+)
+
+# Stalls kept for /stats
+RECENT_STALLS = 10
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag and captures the stack of long stalls."""
+
+    def __init__(self, interval_ms: Optional[int] = None, threshold_ms: Optional[int] = None):
+        self.interval = (
+            settings.loop_lag_interval_ms if interval_ms is None else interval_ms
+        ) / 1000
+        self.threshold = (
+            settings.loop_lag_threshold_ms if threshold_ms is None else threshold_ms
+        ) / 1000
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self.stalls: deque = deque(maxlen=RECENT_STALLS)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Probe the loop until `stop` is set (run as a task)."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while not stop.is_set():
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self._beat(max(0.0, time.monotonic() - expected))
+        finally:
+            self._stopped.set()
+
+    def _beat(self, lag: float) -> None:
+        LOOP_LAG_SECONDS.observe(lag)
+        self.max_lag = max(self.max_lag, lag)
+        with self._lock:
+            self._last_beat = time.monotonic()
+            stall, self._stall = self._stall, None
+        if stall is not None:
+            stall["duration"] = round(lag, 3)
+            logger.warning(f"Event loop unblocked after {lag:.2f}s (task {stall['task']})")
+
+    def _watch(self) -> None:
+        # Runs on its own thread: the loop can't report while it's blocked
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                blocked = time.monotonic() - self._last_beat - self.interval
+                if blocked < self.threshold or self._stall is not None:
+                    continue
+                stall = self._stall = self._capture(blocked)
+            LOOP_STALLS.inc()
+            self.stall_count += 1
+            self.stalls.append(stall)
+            logger.warning(
+                f"Event loop blocked for {blocked:.2f}s in task {stall['task']}:\n"
+                + "".join(stall["stack"])
+            )
+
+    def _capture(self, blocked: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread)
+        task = asyncio.current_task(self._loop) if self._loop else None
+        return {
+            "at": datetime.utcnow().isoformat(),
+            "blocked": round(blocked, 3),
+            "task": task.get_name() if task else None,
+            "stack": traceback.format_stack(frame) if frame else []
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_seconds": self.threshold,
+            "max_lag_seconds": round(self.max_lag, 3),
+            "stalls": self.stall_count,
+            "recent_stalls": list(self.stalls)
+        }
+
+
+_loop_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Process-wide event-loop lag monitor."""
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopLagMonitor()
+    return _loop_monitor
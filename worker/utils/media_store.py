@@ -0,0 +1,85 @@
+"""
+Storage of binary media (images, narration) in MongoDB.
+
+Media is kept as raw bytes through the pipeline and stored as BSON Binary
+in the media document, or in GridFS when it's too large to share a 16MB
+document with the other assets of a page. Documents written before this
+stored base64 strings; `media_bytes` and `load_media` read both layouts.
+"""
+import base64
+import logging
+from typing import Any, Dict, Optional, Union
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from config import settings
+from .asset_spool import SpooledAsset
+from .metrics import write_timer
+
+logger = logging.getLogger(__name__)
+
+GRIDFS_BUCKET = "media"
+
+# Suffix of the field holding a GridFS file id instead of inline data
+FILE_ID_SUFFIX = "FileId"
+
+MediaValue = Union[bytes, bytearray, memoryview, str, SpooledAsset]
+
+
+def media_bytes(value: Optional[MediaValue]) -> Optional[bytes]:
+    """Raw bytes of an inline media value.
+
+    Accepts bytes/Binary, spooled assets (read from disk) and, for
+    documents written before media was stored as Binary, base64 strings.
+    """
+    if value is None:
+        return None
+    if isinstance(value, SpooledAsset):
+        return value.read()
+    if isinstance(value, str):
+        return base64.b64decode(value)
+    return bytes(value)
+
+
+def get_media_bucket(db) -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+
+
+async def store_media(
+    db,
+    field: str,
+    data: MediaValue,
+    filename: str,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Prepare media for a document.
+
+    Returns the fields to set: `{field: Binary}` for inline storage, or
+    `{field + "FileId": id}` once the data is uploaded to GridFS.
+    """
+    data = media_bytes(data)
+    if len(data) <= settings.media_gridfs_threshold_bytes:
+        return {field: Binary(data)}
+
+    with write_timer("gridfs", bytes=len(data)):
+        file_id = await get_media_bucket(db).upload_from_stream(
+            filename,
+            data,
+            metadata=metadata
+        )
+    logger.info(f"Stored {filename} in GridFS ({len(data)} bytes)")
+    return {field + FILE_ID_SUFFIX: file_id}
+
+
+async def load_media(db, doc: Dict[str, Any], field: str) -> Optional[bytes]:
+    """Read media from a document, whichever way it was stored."""
+    if doc.get(field) is not None:
+        return media_bytes(doc[field])
+
+    file_id = doc.get(field + FILE_ID_SUFFIX)
+    if file_id is None:
+        return None
+    stream = await get_media_bucket(db).open_download_stream(file_id)
+    return await stream.read()
+
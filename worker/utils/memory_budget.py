@@ -0,0 +1,68 @@
+"""
+Per-process memory budget for throttling new work.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryBudget:
+    """Compares the process RSS against a limit.
+
+    The job loop stops claiming new jobs while the budget is exceeded, so
+    memory use is bounded by the work already in flight.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.throttled = False
+        self.throttle_count = 0
+
+    def exceeded(self) -> bool:
+        if self.limit_bytes <= 0:
+            return False
+        rss = current_rss_bytes()
+        exceeded = rss is not None and rss > self.limit_bytes
+        if exceeded and not self.throttled:
+            self.throttle_count += 1
+            logger.warning(
+                f"Memory budget exceeded ({rss / 2**20:.0f}MB > "
+                f"{self.limit_bytes / 2**20:.0f}MB), pausing new work"
+            )
+        elif self.throttled and not exceeded:
+            logger.info("Memory back under budget, resuming new work")
+        self.throttled = exceeded
+        return exceeded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rss_bytes": current_rss_bytes(),
+            "budget_bytes": self.limit_bytes,
+            "throttled": self.throttled,
+            "throttle_count": self.throttle_count
+        }
+
+
+_memory_budget: Optional[MemoryBudget] = None
+
+
+def get_memory_budget() -> MemoryBudget:
+    """Process-wide budget of WORKER_MEMORY_BUDGET_MB."""
+    global _memory_budget
+    if _memory_budget is None:
+        _memory_budget = MemoryBudget(settings.worker_memory_budget_mb * 2**20)
+    return _memory_budget
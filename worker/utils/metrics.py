@@ -0,0 +1,239 @@
+"""
+Prometheus metrics for the worker.
+
+Stage latencies, Mongo write latencies, provider calls and fallback
+counters are recorded where the work happens (and also charged to the
+current job's usage); executor queues are read at scrape time and the
+job queue depth comes from one cached aggregation, so a scrape never
+queries Mongo.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from config import settings
+from utils.executors import executor_stats
+from utils.job_archive import ARCHIVE_COLLECTION
+from utils.job_usage import current_usage
+from utils.tracing import add_event, span
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "processing", "completed", "failed")
+
+# Provider calls take seconds to minutes; Mongo writes milliseconds
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+WRITE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+STAGE_SECONDS = Histogram(
+    "babel_stage_duration_seconds",
+    "Duration of a pipeline stage (provider call or audio work)",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+MONGO_WRITE_SECONDS = Histogram(
+    "babel_mongo_write_duration_seconds",
+    "Duration of a Mongo write",
+    ["operation"],
+    buckets=WRITE_BUCKETS
+)
+JOB_SECONDS = Histogram(
+    "babel_job_duration_seconds",
+    "Duration of a story job from claim to completion or failure",
+    ["status"],
+    buckets=STAGE_BUCKETS
+)
+FALLBACKS = Counter(
+    "babel_fallbacks_total",
+    "Times a degraded path was taken",
+    ["kind"]
+)
+PLACEHOLDER_IMAGES = Counter(
+    "babel_placeholder_images_total",
+    "Placeholder images used in place of generated ones"
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    "babel_provider_call_duration_seconds",
+    "Duration of a call to an external provider",
+    ["provider", "model"],
+    buckets=STAGE_BUCKETS
+)
+PROVIDER_CALLS = Counter(
+    "babel_provider_calls_total",
+    "Calls to external providers",
+    ["provider", "model", "outcome"]
+)
+MEDIA_BYTES = Counter(
+    "babel_media_bytes_total",
+    "Bytes of media produced",
+    ["kind"]
+)
+JOB_CPU_SECONDS = Histogram(
+    "babel_job_cpu_seconds",
+    "CPU time used per job",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+JOB_PEAK_RSS_BYTES = Histogram(
+    "babel_job_peak_rss_bytes",
+    "Peak resident memory of the worker while a job ran",
+    buckets=tuple(2**20 * mb for mb in (128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096))
+)
+JOBS_IN_FLIGHT = Gauge(
+    "babel_jobs_in_flight",
+    "Jobs being processed by this worker"
+)
+
+
+@contextmanager
+def stage_timer(stage: str, provider: Optional[str] = None, **attributes):
+    """Time one pipeline stage; also traced as a span of the current job.
+
+    Stages that call an external `provider` (with a `model` attribute)
+    are also counted as provider calls.
+    """
+    if provider:
+        attributes["provider"] = provider
+    started = time.perf_counter()
+    failed = False
+    with span(stage, **attributes) as stage_span, STAGE_SECONDS.labels(stage).time():
+        try:
+            yield stage_span
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if provider:
+                record_provider_call(
+                    provider, attributes.get("model"), time.perf_counter() - started, failed
+                )
+            usage = current_usage()
+            if usage:
+                usage.sample_memory()
+
+
+@contextmanager
+def write_timer(operation: str, **attributes):
+    """Time one Mongo write; also traced as a span of the current job."""
+    with span(f"mongo.{operation}", **attributes) as write_span, \
+            MONGO_WRITE_SECONDS.labels(operation).time():
+        yield write_span
+
+
+def record_fallback(kind: str, count: int = 1) -> None:
+    """Count a fallback and mark it on the current span."""
+    FALLBACKS.labels(kind).inc(count)
+    add_event("fallback", kind=kind, count=count)
+    usage = current_usage()
+    if usage:
+        usage.add_fallback(kind, count)
+
+
+def record_placeholder_images(count: int = 1) -> None:
+    PLACEHOLDER_IMAGES.inc(count)
+    usage = current_usage()
+    if usage:
+        usage.add_placeholder_images(count)
+
+
+def record_provider_call(provider: str, model: Optional[str], seconds: float, failed: bool) -> None:
+    PROVIDER_CALL_SECONDS.labels(provider, model or "").observe(seconds)
+    PROVIDER_CALLS.labels(provider, model or "", "error" if failed else "ok").inc()
+    usage = current_usage()
+    if usage:
+        usage.add_provider_call(provider, model, seconds, failed)
+
+
+def record_media(kind: str, size: int) -> None:
+    """Count bytes of generated media (image, narration, track)."""
+    MEDIA_BYTES.labels(kind).inc(size)
+    usage = current_usage()
+    if usage:
+        usage.add_media(kind, size)
+
+
+def observe_job_usage(summary: Dict) -> None:
+    """Aggregate a finished job's usage summary."""
+    JOB_CPU_SECONDS.observe(summary["cpuSeconds"])
+    JOB_PEAK_RSS_BYTES.observe(summary["peakRssBytes"])
+
+
+class QueueDepth:
+    """Job counts per status from one aggregation, refreshed on an interval."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {status: 0 for status in JOB_STATUSES}
+        self.archived = 0
+        self.refreshed_at: Optional[float] = None
+
+    async def refresh(self, db) -> None:
+        counts = {status: 0 for status in JOB_STATUSES}
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        async for row in db.jobs.aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+        self.counts = counts
+        self.archived = await db[ARCHIVE_COLLECTION].estimated_document_count()
+        self.refreshed_at = time.time()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counts, "archived": self.archived}
+
+
+queue_depth = QueueDepth()
+
+
+async def run_queue_depth_refresher(db, stop: asyncio.Event, interval: Optional[float] = None) -> None:
+    """Refresh the cached queue depth every `interval` seconds until `stop` is set."""
+    interval = interval or settings.metrics_queue_depth_interval_seconds
+    while not stop.is_set():
+        try:
+            await queue_depth.refresh(db)
+        except Exception as e:
+            logger.error(f"Error refreshing queue depth: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+class WorkerCollector:
+    """Scrape-time gauges for the job queue and executor pools."""
+
+    def collect(self):
+        jobs = GaugeMetricFamily(
+            "babel_jobs", "Jobs per status (cached aggregation)", labels=["status"]
+        )
+        for status, count in queue_depth.stats().items():
+            jobs.add_metric([status], count)
+        yield jobs
+
+        if queue_depth.refreshed_at is not None:
+            yield GaugeMetricFamily(
+                "babel_jobs_refreshed_timestamp_seconds",
+                "When the job counts were last refreshed",
+                value=queue_depth.refreshed_at
+            )
+
+        waiting = GaugeMetricFamily(
+            "babel_executor_waiting", "Calls queued for an executor thread", labels=["executor"]
+        )
+        active = GaugeMetricFamily(
+            "babel_executor_active", "Calls running on executor threads", labels=["executor"]
+        )
+        completed = CounterMetricFamily(
+            "babel_executor_completed", "Calls completed by an executor", labels=["executor"]
+        )
+        for name, stats in executor_stats().items():
+            waiting.add_metric([name], stats["waiting"])
+            active.add_metric([name], stats["active"])
+            completed.add_metric([name], stats["completed"])
+        yield waiting
+        yield active
+        yield completed
+
+
+REGISTRY.register(WorkerCollector())
@@ -0,0 +1,165 @@
+"""
+Bounded on-disk LRU cache for encoded narration audio.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_SUFFIX = ".audio"
+META_SUFFIX = ".json"
+
+
+def make_cache_key(text: str, language: str, voice: Dict[str, Any], provider: str) -> str:
+    """Build a stable cache key for a narration request.
+
+    Args:
+        text: Page text being narrated
+        language: Narration language
+        voice: Voice settings that influence the rendered audio
+        provider: TTS provider name (e.g. 'gemini-tts', 'gtts')
+
+    Returns:
+        Hex SHA-256 digest identifying the narration
+    """
+    payload = json.dumps(
+        {"text": text, "language": language, "voice": voice, "provider": provider},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NarrationCache:
+    """Stores encoded narration bytes on disk, evicting least recently used entries."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + DATA_SUFFIX)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + META_SUFFIX)
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from files left by previous runs."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(DATA_SUFFIX):
+                continue
+            key = name[:-len(DATA_SUFFIX)]
+            try:
+                data_stat = os.stat(self._data_path(key))
+                meta_size = os.path.getsize(self._meta_path(key))
+            except OSError:
+                self._remove_files(key)
+                continue
+            found.append((data_stat.st_mtime, key, data_stat.st_size + meta_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        self._evict()
+        logger.info(
+            f"Loaded narration cache with {len(self._entries)} entries "
+            f"({self._total_bytes} bytes) from {self.directory}"
+        )
+
+    def _remove_files(self, key: str) -> None:
+        for path in (self._data_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._remove_files(key)
+            logger.debug(f"Evicted narration cache entry {key}")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """Return (audio bytes, metadata) for a key, or None on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._data_path(key), "rb") as f:
+                    data = f.read()
+                with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+                os.utime(self._data_path(key))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable narration cache entry {key}: {e}")
+                self._total_bytes -= self._entries.pop(key)
+                self._remove_files(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data, metadata
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, Any]) -> None:
+        """Store audio bytes and their metadata under a key."""
+        meta_bytes = json.dumps(metadata).encode("utf-8")
+        size = len(data) + len(meta_bytes)
+        if size > self.max_bytes:
+            logger.debug(f"Skipping narration cache entry {key}: {size} bytes exceeds cache size")
+            return
+
+        with self._lock:
+            for path, payload in ((self._data_path(key), data), (self._meta_path(key), meta_bytes)):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[NarrationCache] = None
+
+
+def get_narration_cache() -> Optional[NarrationCache]:
+    """Return the process-wide narration cache, or None when disabled."""
+    global _cache
+    if not settings.narration_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = NarrationCache(
+            settings.narration_cache_dir,
+            settings.narration_cache_max_bytes
+        )
+    return _cache
@@ -0,0 +1,156 @@
+"""
+On-demand CPU and heap profiling of the live worker.
+
+`sample_stacks` samples every thread's Python stack at a fixed interval
+(including the event loop running the job loop) and returns the counts
+in collapsed-stack format, the input of flamegraph.pl, speedscope and
+similar tools. `HeapTracker` diffs tracemalloc snapshots taken between
+calls.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Top frames of threads that are parked waiting for work
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+    """Sample all threads for `seconds` and return collapsed stacks (blocking).
+
+    Each line is `thread;outermost;...;innermost count`. Threads parked in
+    a wait are skipped unless `include_idle` is set.
+    """
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    counts: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me or (not include_idle and _is_idle(frame)):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            thread = names.get(thread_id)
+            if thread is None:
+                names.update({t.ident: t.name for t in threading.enumerate()})
+                thread = names.get(thread_id, str(thread_id))
+            counts[";".join([thread, *reversed(stack)])] += 1
+        samples += 1
+        time.sleep(interval)
+
+    logger.info(f"Collected {samples} profile samples over {seconds}s")
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class HeapTracker:
+    """tracemalloc snapshots, each diffed against the previous one."""
+
+    def __init__(self, frames: Optional[int] = None):
+        self.frames = frames or settings.debug_tracemalloc_frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        # Whether diff() started tracing (rather than JOB_TRACEMALLOC at startup)
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def diff(self, limit: int = 25, group_by: str = "lineno") -> Dict[str, Any]:
+        """Snapshot the heap and diff it against the last call (blocking).
+
+        The first call starts tracemalloc if needed; only allocations made
+        after that are visible, so call again after the workload of interest.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._started_tracing = True
+                logger.info(f"Started tracemalloc ({self.frames} frames)")
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+            ])
+            previous, self._previous = self._previous, snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        result: Dict[str, Any] = {
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "baseline": previous is None
+        }
+        if previous is None:
+            result["top"] = [
+                {"location": self._location(stat, group_by), "size": stat.size, "count": stat.count}
+                for stat in snapshot.statistics(group_by)[:limit]
+            ]
+        else:
+            result["top"] = [
+                {
+                    "location": self._location(stat, group_by),
+                    "size": stat.size,
+                    "size_diff": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff
+                }
+                for stat in snapshot.compare_to(previous, group_by)[:limit]
+            ]
+        return result
+
+    def stop(self) -> bool:
+        """Stop tracing if diff() started it.
+
+        Returns False, leaving tracing on, if it was started elsewhere
+        (per-job memory accounting relies on it).
+        """
+        with self._lock:
+            if tracemalloc.is_tracing() and not self._started_tracing:
+                return False
+            self._previous = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("Stopped tracemalloc")
+            self._started_tracing = False
+            return True
+
+    @staticmethod
+    def _location(stat, group_by: str):
+        if group_by == "traceback":
+            return [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+        frame = stat.traceback[0]
+        return f"{frame.filename}:{frame.lineno}"
+
+
+_heap_tracker: Optional[HeapTracker] = None
+
+
+def get_heap_tracker() -> HeapTracker:
+    """Process-wide heap tracker behind /debug/heap."""
+    global _heap_tracker
+    if _heap_tracker is None:
+        _heap_tracker = HeapTracker()
+    return _heap_tracker
@@ -0,0 +1,138 @@
+"""
+Debounced, write-behind progress reporting for a story.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config import settings
+from .metrics import write_timer
+
+logger = logging.getLogger(__name__)
+
+# States that end a story's generation; always written immediately
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+class StoryProgress:
+    """Keeps a story's latest status/progress in memory and writes it lazily.
+
+    Updates are merged into pending fields and flushed at most once every
+    `interval_ms`; a trailing flush writes whatever arrived in between.
+    Terminal statuses flush immediately. Writes that touch the story anyway
+    (page saves) can `take` the pending fields and carry them along.
+
+    Progress fields belong to the status they were reported with: when the
+    status changes, the previous phase's fields are unset.
+    """
+
+    def __init__(self, db, story_id: str, interval_ms: Optional[int] = None):
+        self.db = db
+        self.story_id = story_id
+        self.interval = (
+            settings.progress_flush_interval_ms if interval_ms is None else interval_ms
+        ) / 1000
+        self._pending: Dict[str, Any] = {}
+        self._unset: Set[str] = set()
+        self._status: Optional[str] = None
+        # progress.* fields reported during the current status
+        self._phase_fields: Set[str] = set()
+        self._last_flush: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.writes = 0
+
+    async def update(
+        self,
+        status: str,
+        progress: Optional[Dict] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Record the latest status (and progress/error)."""
+        if status != self._status:
+            for field in self._phase_fields:
+                self._pending.pop(field, None)
+            self._unset |= self._phase_fields
+            self._phase_fields = set()
+            self._status = status
+        self._pending["status"] = status
+        for name, value in (progress or {}).items():
+            field = f"progress.{name}"
+            self._pending[field] = value
+            self._phase_fields.add(field)
+            self._unset.discard(field)
+        if error:
+            self._pending["error"] = error
+
+        if status in TERMINAL_STATUSES:
+            await self.flush()
+        elif self._last_flush is None or time.monotonic() - self._last_flush >= self.interval:
+            await self.flush()
+        elif self._timer is None:
+            delay = self._last_flush + self.interval - time.monotonic()
+            self._timer = asyncio.get_running_loop().call_later(delay, self._flush_later)
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        self._flush_task = asyncio.create_task(self._flush_in_background())
+
+    async def _flush_in_background(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing progress for story {self.story_id}: {str(e)}")
+
+    async def _wait_for_background_flush(self) -> None:
+        # Keeps writes in order: a trailing flush in flight lands first
+        task = self._flush_task
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            await task
+
+    def take(self) -> Tuple[Dict[str, Any], Set[str]]:
+        """Hand the pending fields (to set, and to unset) to a write that is
+        about to happen anyway."""
+        self._cancel_timer()
+        pending, self._pending = self._pending, {}
+        unset, self._unset = self._unset, set()
+        if pending or unset:
+            self._last_flush = time.monotonic()
+        return pending, unset
+
+    async def flush(self) -> None:
+        """Write the pending fields now."""
+        self._cancel_timer()
+        await self._wait_for_background_flush()
+        if not self._pending and not self._unset:
+            return
+        fields, unset = self.take()
+        self.writes += 1
+        update = {"$set": {**fields, "updatedAt": datetime.utcnow()}}
+        if unset:
+            update["$unset"] = dict.fromkeys(unset, "")
+        with write_timer("story_progress"):
+            await self.db.stories.update_one({"_id": self.story_id}, update)
+        if fields.get("status") in TERMINAL_STATUSES:
+            logger.info(f"Updated story {self.story_id} status to {fields['status']}")
+        else:
+            logger.debug(f"Flushed progress for story {self.story_id}: {fields}")
+
+    async def close(self, discard: bool = False) -> None:
+        """Stop reporting: flush (or drop) pending fields.
+
+        Use `discard=True` when a terminal write made elsewhere supersedes
+        them.
+        """
+        self._cancel_timer()
+        await self._wait_for_background_flush()
+        if discard:
+            self._pending = {}
+            self._unset = set()
+        else:
+            await self.flush()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
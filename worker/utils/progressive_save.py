@@ -1,7 +1,14 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
+import asyncio
 import logging
-from .s3 import upload_asset, generate_asset_key
+import time
+from pymongo import InsertOne
+from config import settings
+from .media_store import store_media
+from .metrics import write_timer
+from .progress import StoryProgress
+from .s3 import upload_content_addressed
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +24,18 @@ async def save_story_metadata(db, story_id: str, story_data: Dict):
         }
         
         # Update story with initial data
-        await db.stories.update_one(
-            {"_id": story_id},
-            {
-                "$set": {
-                    "status": "generating_assets",
-                    "story": story_doc,
-                    "textGenerated": True,
-                    "updatedAt": datetime.utcnow()
+        with write_timer("story_metadata"):
+            await db.stories.update_one(
+                {"_id": story_id},
+                {
+                    "$set": {
+                        "status": "generating_assets",
+                        "story": story_doc,
+                        "textGenerated": True,
+                        "updatedAt": datetime.utcnow()
+                    }
                 }
-            }
-        )
+            )
         
         logger.info(f"Saved story metadata for {story_id}")
         
@@ -35,82 +43,391 @@ async def save_story_metadata(db, story_id: str, story_data: Dict):
         logger.error(f"Error saving story metadata: {str(e)}")
         raise
 
-async def save_page_progressively(
+async def upload_page_assets(
+    story_id: str,
+    page_number: int,
+    image_data: Optional[Dict] = None,
+    audio_data: Optional[Dict] = None
+) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Upload a page's image and narration renditions to S3 concurrently
+    
+    Returns copies of image_data/audio_data with the bytes replaced by
+    `url`/`key` (`compatUrl`/`compatKey` for the compat rendition). An
+    asset whose upload fails keeps its bytes and is stored in MongoDB.
+    """
+    return await upload_assets(f"story {story_id} page {page_number}", image_data, audio_data)
+
+async def upload_assets(
+    label: str,
+    image_data: Optional[Dict] = None,
+    audio_data: Optional[Dict] = None
+) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Upload an image and narration renditions to S3 (see upload_page_assets)"""
+    image_data = dict(image_data) if image_data else None
+    audio_data = dict(audio_data) if audio_data else None
+    
+    # (asset dict, data field, url field, key field, asset type, format, content type)
+    uploads = []
+    if image_data and image_data.get("imageData"):
+        image_format = image_data.get("format", "png")
+        uploads.append((
+            image_data, "imageData", "url", "key",
+            "image", image_format, f"image/{image_format}"
+        ))
+    if audio_data and audio_data.get("audioData"):
+        uploads.append((
+            audio_data, "audioData", "url", "key",
+            "audio", audio_data.get("format", "mp3"), audio_data.get("mimeType", "audio/mpeg")
+        ))
+        if audio_data.get("compatAudioData"):
+            uploads.append((
+                audio_data, "compatAudioData", "compatUrl", "compatKey",
+                "audio", audio_data.get("compatFormat"), audio_data.get("compatMimeType", "audio/mpeg")
+            ))
+    
+    results = await asyncio.gather(
+        *(
+            upload_content_addressed(asset[field], asset_type, format, content_type)
+            for asset, field, _, _, asset_type, format, content_type in uploads
+        ),
+        return_exceptions=True
+    )
+    
+    for (asset, field, url_field, key_field, asset_type, _, _), result in zip(uploads, results):
+        if isinstance(result, BaseException):
+            logger.error(
+                f"S3 upload failed for {label} {asset_type}, "
+                f"storing in MongoDB: {str(result)}"
+            )
+            continue
+        asset[url_field], asset[key_field] = result
+        del asset[field]
+    
+    return image_data, audio_data
+
+async def build_page_docs(
     db,
     story_id: str,
     page_data: Dict,
     image_data: Optional[Dict] = None,
     audio_data: Optional[Dict] = None
-):
-    """Save a single page with its assets progressively"""
+) -> Tuple[Dict, Optional[Dict]]:
+    """Build the story page entry and its story_media document
+    
+    With S3 storage enabled, assets are uploaded (unless upload_page_assets
+    already did) and only their URLs are kept; otherwise, or if an
+    upload fails, the bytes go to the media document.
+    
+    Returns:
+        (page_doc, media_doc), where media_doc is None if the page has no
+        media stored in MongoDB
+    """
     try:
         page_doc = {**page_data}
+        page_number = page_data['pageNumber']
         
-        # For large stories, store media in separate collection to avoid 16MB limit
+        if settings.enable_s3_storage:
+            image_data, audio_data = await upload_page_assets(
+                story_id, page_number, image_data, audio_data
+            )
+        
+        # For large stories, store media in separate collection to avoid 16MB limit.
+        # Media is stored as Binary (or in GridFS when large), not base64.
         media_doc = {
             "storyId": story_id,
-            "pageNumber": page_data['pageNumber'],
+            "pageNumber": page_number,
             "createdAt": datetime.utcnow()
         }
+        has_media = False
         
         # Store image data separately if it exists
-        if image_data and image_data.get("imageData"):
-            media_doc["imageData"] = image_data["imageData"]
-            media_doc["imageFormat"] = image_data.get("format", "png")
-            
+        if image_data and (image_data.get("imageData") or image_data.get("url")):
             # Store reference in page doc
             page_doc["image"] = {
                 "hasImage": True,
                 "format": image_data.get("format", "png")
             }
-            logger.info(f"Storing image for story {story_id} page {page_data['pageNumber']}")
+            if image_data.get("url"):
+                page_doc["image"]["url"] = image_data["url"]
+                page_doc["image"]["key"] = image_data["key"]
+            else:
+                media_doc.update(await store_media(
+                    db,
+                    "imageData",
+                    image_data["imageData"],
+                    f"{story_id}/page-{page_number}.{image_data.get('format', 'png')}",
+                    {"storyId": story_id, "pageNumber": page_number}
+                ))
+                media_doc["imageFormat"] = image_data.get("format", "png")
+                has_media = True
+            logger.info(f"Storing image for story {story_id} page {page_number}")
         
         # Store audio data separately if it exists
-        if audio_data and audio_data.get("audioData"):
-            media_doc["audioData"] = audio_data["audioData"]
-            media_doc["audioFormat"] = audio_data.get("format", "mp3")
-            media_doc["audioDuration"] = audio_data.get("duration", 0)
-            
+        if audio_data and (audio_data.get("audioData") or audio_data.get("url")):
             # Store reference in page doc
             page_doc["audio"] = {
                 "hasAudio": True,
                 "format": audio_data.get("format", "mp3"),
                 "duration": audio_data.get("duration", 0)
             }
-            logger.info(f"Storing audio for story {story_id} page {page_data['pageNumber']}")
-        
-        # Save media data if we have any
-        if "imageData" in media_doc or "audioData" in media_doc:
-            await db.story_media.insert_one(media_doc)
-        
-        # Add page to story document (without embedded media)
-        await db.stories.update_one(
-            {"_id": story_id},
-            {
-                "$push": {"story.pages": page_doc},
-                "$set": {
-                    "updatedAt": datetime.utcnow(),
-                    f"progress.page{page_data['pageNumber']}": "completed"
+            if audio_data.get("mimeType"):
+                page_doc["audio"]["mimeType"] = audio_data["mimeType"]
+            
+            if audio_data.get("url"):
+                page_doc["audio"]["url"] = audio_data["url"]
+                page_doc["audio"]["key"] = audio_data["key"]
+            else:
+                media_doc.update(await store_media(
+                    db,
+                    "audioData",
+                    audio_data["audioData"],
+                    f"{story_id}/page-{page_number}.{audio_data.get('format', 'mp3')}",
+                    {"storyId": story_id, "pageNumber": page_number}
+                ))
+                media_doc["audioFormat"] = audio_data.get("format", "mp3")
+                media_doc["audioDuration"] = audio_data.get("duration", 0)
+                if audio_data.get("mimeType"):
+                    media_doc["audioMimeType"] = audio_data["mimeType"]
+                if audio_data.get("sourceFormat"):
+                    media_doc["audioSourceFormat"] = audio_data["sourceFormat"]
+                has_media = True
+            
+            # Compatibility rendition for clients without Opus support
+            if audio_data.get("compatAudioData") or audio_data.get("compatUrl"):
+                page_doc["audio"]["compat"] = {
+                    "format": audio_data.get("compatFormat"),
+                    "mimeType": audio_data.get("compatMimeType")
                 }
-            }
-        )
+                if audio_data.get("compatUrl"):
+                    page_doc["audio"]["compat"]["url"] = audio_data["compatUrl"]
+                    page_doc["audio"]["compat"]["key"] = audio_data["compatKey"]
+                else:
+                    media_doc.update(await store_media(
+                        db,
+                        "compatAudioData",
+                        audio_data["compatAudioData"],
+                        f"{story_id}/page-{page_number}.{audio_data.get('compatFormat')}",
+                        {"storyId": story_id, "pageNumber": page_number}
+                    ))
+                    media_doc["compatFormat"] = audio_data.get("compatFormat")
+                    media_doc["compatMimeType"] = audio_data.get("compatMimeType")
+                    has_media = True
+            logger.info(f"Storing audio for story {story_id} page {page_number}")
         
-        logger.info(f"Saved page {page_data['pageNumber']} for story {story_id}")
+        return page_doc, media_doc if has_media else None
         
+    except Exception as e:
+        logger.error(f"Error building page {page_data.get('pageNumber')}: {str(e)}")
+        raise
+
+async def write_pages(
+    db,
+    story_id: str,
+    page_docs: List[Dict],
+    media_docs: List[Dict],
+    fields: Optional[Dict] = None,
+    unset: Optional[Set[str]] = None
+):
+    """Write saved pages with as few round trips as possible
+    
+    All pages are pushed to the story in one update that also sets their
+    progress fields and any extra `fields` (e.g. status) and unsets the
+    `unset` fields; their media documents go to story_media in one
+    bulk_write.
+    """
+    if media_docs:
+        with write_timer("story_media", documents=len(media_docs)):
+            await db.story_media.bulk_write(
+                [InsertOne(media_doc) for media_doc in media_docs],
+                ordered=False
+            )
+    
+    # Add pages to story document (without embedded media)
+    update_fields = {**(fields or {}), "updatedAt": datetime.utcnow()}
+    for page_doc in page_docs:
+        update_fields[f"progress.page{page_doc['pageNumber']}"] = "completed"
+    update = {
+        "$push": {"story.pages": {"$each": page_docs}},
+        "$set": update_fields
+    }
+    # A field can't be set and unset in one update; setting it wins
+    unset = set(unset or ()) - update_fields.keys()
+    if unset:
+        update["$unset"] = dict.fromkeys(unset, "")
+    with write_timer("story_pages", pages=len(page_docs)):
+        await db.stories.update_one({"_id": story_id}, update)
+    
+    logger.info(
+        f"Saved pages {', '.join(str(p['pageNumber']) for p in page_docs)} for story {story_id}"
+    )
+
+async def save_page_progressively(
+    db,
+    story_id: str,
+    page_data: Dict,
+    image_data: Optional[Dict] = None,
+    audio_data: Optional[Dict] = None
+):
+    """Save a single page with its assets progressively (see build_page_docs)"""
+    try:
+        page_doc, media_doc = await build_page_docs(db, story_id, page_data, image_data, audio_data)
+        await write_pages(db, story_id, [page_doc], [media_doc] if media_doc else [])
     except Exception as e:
         logger.error(f"Error saving page progressively: {str(e)}")
         raise
 
-async def mark_story_completed(db, story_id: str):
-    """Mark story as fully completed"""
-    await db.stories.update_one(
-        {"_id": story_id},
-        {
-            "$set": {
-                "status": "completed",
-                "completedAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow()
-            }
+class PageWriteBatcher:
+    """Coalesces a story's page saves into as few writes as possible.
+    
+    Pages are queued with `add` and written together by `flush`: one
+    stories update carrying the pages, their progress and the story
+    status (plus any pending StoryProgress fields), and one story_media
+    bulk_write. The queue flushes itself when it holds `max_pages` pages
+    or its oldest page has waited `max_delay_ms`; callers flush before
+    slow work and at the end so progress stays visible.
+    """
+    
+    def __init__(
+        self,
+        db,
+        story_id: str,
+        total_pages: int,
+        max_pages: Optional[int] = None,
+        max_delay_ms: Optional[int] = None,
+        progress: Optional[StoryProgress] = None
+    ):
+        self.db = db
+        self.progress = progress
+        self.story_id = story_id
+        self.total_pages = total_pages
+        self.max_pages = max_pages or settings.page_write_batch_size
+        self.max_delay = (
+            settings.page_write_max_delay_ms if max_delay_ms is None else max_delay_ms
+        ) / 1000
+        self._page_docs: List[Dict] = []
+        self._media_docs: List[Dict] = []
+        self._first_queued = 0.0
+        self.saved_pages = 0
+    
+    async def add(
+        self,
+        page_data: Dict,
+        image_data: Optional[Dict] = None,
+        audio_data: Optional[Dict] = None
+    ):
+        """Queue a page with its assets (media is stored right away)"""
+        page_doc, media_doc = await build_page_docs(
+            self.db, self.story_id, page_data, image_data, audio_data
+        )
+        if not self._page_docs:
+            self._first_queued = time.monotonic()
+        self._page_docs.append(page_doc)
+        if media_doc:
+            self._media_docs.append(media_doc)
+        
+        if (
+            len(self._page_docs) >= self.max_pages
+            or time.monotonic() - self._first_queued >= self.max_delay
+        ):
+            await self.flush()
+    
+    async def flush(self):
+        """Write every queued page"""
+        if not self._page_docs:
+            return
+        page_docs, media_docs = self._page_docs, self._media_docs
+        self._page_docs, self._media_docs = [], []
+        self.saved_pages += len(page_docs)
+        # Pending progress updates ride along with the page write
+        fields, unset = self.progress.take() if self.progress else ({}, set())
+        fields.update({
+            "status": "generating_assets",
+            "progress.current_page": self.saved_pages,
+            "progress.total_pages": self.total_pages
+        })
+        await write_pages(self.db, self.story_id, page_docs, media_docs, fields, unset)
+
+async def save_story_track(db, story_id: str, track: Dict) -> Dict:
+    """Save the continuous narration track and its page markers
+    
+    Returns:
+        The track reference (without audio) for story.audioTrack, which
+        mark_story_completed writes along with the completed status
+    """
+    try:
+        # Uploaded with the page assets; a failed upload is stored in MongoDB
+        if settings.enable_s3_storage:
+            _, track = await upload_assets(f"story {story_id} track", audio_data=track)
+        
+        track_doc = {
+            "storyId": story_id,
+            "format": track["format"],
+            "mimeType": track["mimeType"],
+            "duration": track["duration"],
+            "markers": track["markers"],
+            "createdAt": datetime.utcnow()
         }
-    )
+        reference = {
+            "format": track["format"],
+            "mimeType": track["mimeType"],
+            "duration": track["duration"],
+            "markers": track["markers"],
+            "hasCompat": bool(track.get("compatAudioData") or track.get("compatUrl"))
+        }
+        if track.get("url"):
+            track_doc["url"] = reference["url"] = track["url"]
+            track_doc["key"] = track["key"]
+        else:
+            track_doc.update(await store_media(
+                db,
+                "audioData",
+                track["audioData"],
+                f"{story_id}/story-track.{track['format']}",
+                {"storyId": story_id}
+            ))
+        if reference["hasCompat"]:
+            track_doc["compatFormat"] = track["compatFormat"]
+            track_doc["compatMimeType"] = track["compatMimeType"]
+            if track.get("compatUrl"):
+                track_doc["compatUrl"] = reference["compatUrl"] = track["compatUrl"]
+                track_doc["compatKey"] = track["compatKey"]
+            else:
+                track_doc.update(await store_media(
+                    db,
+                    "compatAudioData",
+                    track["compatAudioData"],
+                    f"{story_id}/story-track.{track['compatFormat']}",
+                    {"storyId": story_id}
+                ))
+        
+        with write_timer("story_track"):
+            await db.story_audio_tracks.replace_one(
+                {"storyId": story_id},
+                track_doc,
+                upsert=True
+            )
+        
+        logger.info(f"Saved story track for {story_id} ({track['duration']}s)")
+        
+        # Reference (without audio) on the story for the reader
+        return reference
+        
+    except Exception as e:
+        logger.error(f"Error saving story track: {str(e)}")
+        raise
+
+async def mark_story_completed(db, story_id: str, audio_track: Optional[Dict] = None):
+    """Mark story as fully completed, attaching the story track reference"""
+    fields = {
+        "status": "completed",
+        "completedAt": datetime.utcnow(),
+        "updatedAt": datetime.utcnow()
+    }
+    if audio_track:
+        fields["story.audioTrack"] = audio_track
+    with write_timer("story_completed"):
+        await db.stories.update_one(
+            {"_id": story_id},
+            {"$set": fields}
+        )
     logger.info(f"Marked story {story_id} as completed")
\ No newline at end of file
@@ -1,9 +1,16 @@
+import asyncio
+import hashlib
 import os
-import boto3
+import threading
+from collections import OrderedDict
 from botocore.exceptions import ClientError
 import logging
-from typing import Dict, Optional
-import base64
+from typing import Dict, Optional, Tuple
+from config import settings
+from .executors import get_upload_executor
+from .asset_spool import SpooledAsset
+from .media_store import MediaValue, media_bytes
+from .tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +19,38 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "babel-books-assets")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 AWS_ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL")  # For LocalStack
 
-# Initialize S3 client
+# Content-addressed objects never change, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
 def get_s3_client():
-    """Get S3 client with proper configuration"""
+    """Get the shared S3 client
+    
+    boto3 clients are thread-safe, so one client (and its connection pool)
+    is shared by every upload thread instead of being built per call.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = _create_s3_client()
+    return _s3_client
+
+def _create_s3_client():
+    """Create an S3 client with proper configuration"""
+    # boto3 is slow to import; workers without S3 never load it
+    import boto3
+    from botocore.config import Config
+    
     config = {
         "region_name": AWS_REGION,
+        # One pooled connection per upload thread
+        "config": Config(
+            max_pool_connections=settings.s3_upload_workers,
+            retries={"max_attempts": 3, "mode": "standard"}
+        )
     }
     
     # Add endpoint URL for LocalStack
@@ -33,66 +67,71 @@ def get_s3_client():
     
     return boto3.client("s3", **config)
 
+def get_asset_url(key: str) -> str:
+    """Public URL of an uploaded asset"""
+    if AWS_ENDPOINT_URL:
+        # LocalStack URL - need to use localhost for frontend access
+        # Replace 'localstack' with 'localhost' for browser access
+        endpoint = AWS_ENDPOINT_URL.replace('localstack', 'localhost')
+        return f"{endpoint}/{S3_BUCKET_NAME}/{key}"
+    # Production S3 URL
+    return f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{key}"
+
 async def upload_asset(
-    base64_data: str,
+    data: MediaValue,
     key: str,
     content_type: str,
-    metadata: Optional[Dict[str, str]] = None
+    metadata: Optional[Dict[str, str]] = None,
+    cache_control: Optional[str] = None
 ) -> str:
-    """Upload a base64 encoded asset to S3
+    """Upload an asset to S3
+    
+    The blocking put runs on the bounded upload executor, so concurrent
+    uploads share the client's connection pool without blocking the loop.
     
     Args:
-        base64_data: Base64 encoded file data
+        data: Raw file bytes (base64 text is still accepted)
         key: S3 object key (path)
         content_type: MIME type of the content
         metadata: Optional metadata to attach to the object
+        cache_control: Optional Cache-Control header for the object
     
     Returns:
         The S3 URL of the uploaded object
     """
     try:
-        s3_client = get_s3_client()
-        
-        # Decode base64 data
-        file_data = base64.b64decode(base64_data)
-        
-        # Upload to S3
         put_params = {
             "Bucket": S3_BUCKET_NAME,
             "Key": key,
-            "Body": file_data,
             "ContentType": content_type,
         }
+        if cache_control:
+            put_params["CacheControl"] = cache_control
         
         if metadata:
             # Ensure all metadata values are ASCII-safe
             safe_metadata = {}
-            for key, value in metadata.items():
+            for name, value in metadata.items():
                 try:
                     # Convert to ASCII, replacing non-ASCII characters
                     safe_value = str(value).encode('ascii', 'replace').decode('ascii')
-                    safe_metadata[key] = safe_value
+                    safe_metadata[name] = safe_value
                 except Exception:
                     # Skip problematic metadata
-                    logger.warning(f"Skipping metadata key '{key}' due to encoding issues")
+                    logger.warning(f"Skipping metadata key '{name}' due to encoding issues")
             
             if safe_metadata:
                 put_params["Metadata"] = safe_metadata
         
-        s3_client.put_object(**put_params)
+        def put_object():
+            # Read spooled assets on the upload thread, so only assets being
+            # uploaded right now are held in memory
+            return get_s3_client().put_object(Body=media_bytes(data), **put_params)
         
-        # Generate URL
-        if AWS_ENDPOINT_URL:
-            # LocalStack URL - need to use localhost for frontend access
-            # Replace 'localstack' with 'localhost' for browser access
-            endpoint = AWS_ENDPOINT_URL.replace('localstack', 'localhost')
-            url = f"{endpoint}/{S3_BUCKET_NAME}/{key}"
-        else:
-            # Production S3 URL
-            url = f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{key}"
+        await get_upload_executor().run(put_object)
         
         logger.info(f"Uploaded asset to S3: {key}")
-        return url
+        return get_asset_url(key)
         
     except ClientError as e:
         logger.error(f"S3 upload error: {str(e)}")
@@ -102,25 +141,126 @@ async def upload_asset(
         raise
 
 def generate_asset_key(
-    story_id: str,
-    page_number: int,
+    data: MediaValue,
     asset_type: str,
     format: str
 ) -> str:
-    """Generate a unique S3 key for an asset
+    """Generate a content-addressed S3 key for an asset
+    
+    Identical bytes always map to the same key, so an object never changes
+    once written and duplicates (placeholders, cached narration, reused
+    illustrations) share one object.
     
     Args:
-        story_id: The story ID
-        page_number: The page number
+        data: The asset bytes (or a spooled asset, whose hash is known)
         asset_type: Type of asset ('image' or 'audio')
         format: File format (e.g., 'png', 'mp3')
     
     Returns:
         The S3 key for the asset
     """
-    import time
-    timestamp = int(time.time() * 1000)
-    return f"stories/{story_id}/page-{page_number}-{asset_type}-{timestamp}.{format}"
+    if isinstance(data, SpooledAsset):
+        digest = data.sha256
+    else:
+        digest = hashlib.sha256(media_bytes(data)).hexdigest()
+    return f"assets/{asset_type}/{digest}.{format}"
+
+class KnownKeys:
+    """Bounded, least recently used set of keys known to exist in S3"""
+    
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+    
+    def __contains__(self, key: str) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+    
+    def add(self, key: str) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+
+_known_keys: Optional[KnownKeys] = None
+_in_flight: Dict[str, "asyncio.Future[None]"] = {}
+
+def _get_known_keys() -> KnownKeys:
+    global _known_keys
+    if _known_keys is None:
+        _known_keys = KnownKeys(settings.s3_known_keys_max)
+    return _known_keys
+
+_upload_stats = {"uploaded": 0, "deduplicated": 0, "bytes_uploaded": 0, "bytes_saved": 0}
+
+async def _object_exists(key: str) -> bool:
+    try:
+        await get_upload_executor().run(
+            get_s3_client().head_object, Bucket=S3_BUCKET_NAME, Key=key
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+async def _upload_if_missing(data: MediaValue, key: str, content_type: str) -> None:
+    if settings.s3_dedup_head_check and await _object_exists(key):
+        _upload_stats["deduplicated"] += 1
+        _upload_stats["bytes_saved"] += len(data)
+        logger.debug(f"Asset already in S3: {key}")
+    else:
+        await upload_asset(data, key, content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+        _upload_stats["uploaded"] += 1
+        _upload_stats["bytes_uploaded"] += len(data)
+    _get_known_keys().add(key)
+
+async def upload_content_addressed(
+    data: MediaValue,
+    asset_type: str,
+    format: str,
+    content_type: str
+) -> Tuple[str, str]:
+    """Upload an asset under its content hash, skipping known duplicates
+    
+    Keys this process has seen are skipped without a request; unknown keys
+    are checked with a HEAD first (objects may have been written by other
+    workers). Concurrent uploads of the same bytes share one request.
+    
+    Returns:
+        (url, key) of the stored object
+    """
+    key = generate_asset_key(data, asset_type, format)
+    
+    with span("s3_upload", key=key, bytes=len(data)) as upload_span:
+        if key in _get_known_keys():
+            _upload_stats["deduplicated"] += 1
+            _upload_stats["bytes_saved"] += len(data)
+            upload_span.set_attribute("deduplicated", True)
+            return get_asset_url(key), key
+        
+        upload = _in_flight.get(key)
+        if upload is None:
+            upload = asyncio.ensure_future(_upload_if_missing(data, key, content_type))
+            _in_flight[key] = upload
+            upload.add_done_callback(lambda _: _in_flight.pop(key, None))
+        else:
+            _upload_stats["deduplicated"] += 1
+            _upload_stats["bytes_saved"] += len(data)
+            upload_span.set_attribute("deduplicated", True)
+        
+        # Shielded so one cancelled waiter doesn't cancel the shared upload
+        await asyncio.shield(upload)
+        return get_asset_url(key), key
+
+def upload_stats() -> Dict[str, int]:
+    """Upload and deduplication counters for this process"""
+    return {**_upload_stats, "known_keys": len(_known_keys) if _known_keys is not None else 0}
 
 async def get_presigned_url(key: str, expiration: int = 3600) -> str:
     """Generate a presigned URL for an S3 object
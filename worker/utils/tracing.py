@@ -0,0 +1,220 @@
+"""
+In-process tracing of story jobs.
+
+Each job gets a `JobTrace`; `span()` opens a child of the current span
+(tracked in a context variable, so it follows tasks and executor calls)
+and records its duration, attributes, events and errors. The finished
+trace is stored in `job_traces` and can be exported as OTLP JSON, which
+OpenTelemetry collectors and trace viewers accept.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_COLLECTION = "job_traces"
+SERVICE_NAME = "babel-books-worker"
+
+# Bounds the stored document; spans past this are counted but dropped
+MAX_SPANS = 5000
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """One timed operation within a job trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end",
+                 "attributes", "events", "error")
+
+    def __init__(self, trace: "JobTrace", name: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        self.attributes[name] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time": time.time_ns(), "attributes": attributes})
+
+    def to_doc(self) -> Dict[str, Any]:
+        doc = {
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end if self.end is not None else time.time_ns(),
+            "attributes": self.attributes,
+            "events": self.events
+        }
+        if self.error is not None:
+            doc["error"] = self.error
+        return doc
+
+
+class _NoopSpan:
+    """Stand-in when no trace is active, so call sites needn't check."""
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JobTrace:
+    """The spans recorded while processing one job."""
+
+    def __init__(self, job_id: Any, story_id: Any):
+        self.job_id = job_id
+        self.story_id = story_id
+        self.trace_id = _new_id(16)
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def _add(self, span: Span) -> bool:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    @contextmanager
+    def root(self, name: str, **attributes) -> Iterator[Span]:
+        """Open the job's root span and make it current."""
+        with _start_span(self, name, None, attributes) as span:
+            yield span
+
+    def to_doc(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_doc() for span in self.spans]
+        return {
+            "_id": self.job_id,
+            "storyId": self.story_id,
+            "traceId": self.trace_id,
+            "spans": spans,
+            "droppedSpans": self.dropped,
+            "createdAt": datetime.utcnow()
+        }
+
+
+@contextmanager
+def _start_span(trace: JobTrace, name: str, parent_id: Optional[str],
+                attributes: Dict[str, Any]) -> Iterator[Span]:
+    span = Span(trace, name, parent_id, attributes)
+    recorded = trace._add(span)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if recorded:
+            span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.end = time.time_ns()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a child of the current span; a no-op outside a traced job."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    with _start_span(parent.trace, name, parent.span_id, attributes) as child:
+        yield child
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def add_event(name: str, **attributes) -> None:
+    """Mark something (e.g. a fallback) on the current span."""
+    current_span().add_event(name, **attributes)
+
+
+async def save_trace(db, trace: JobTrace) -> None:
+    await db[TRACE_COLLECTION].replace_one({"_id": trace.job_id}, trace.to_doc(), upsert=True)
+    logger.debug(f"Saved trace for job {trace.job_id} ({len(trace.spans)} spans)")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp_json(trace_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored trace to the OTLP/JSON `ExportTraceServiceRequest` shape."""
+    spans = []
+    for stored in trace_doc["spans"]:
+        otlp_span = {
+            "traceId": trace_doc["traceId"],
+            "spanId": stored["spanId"],
+            "name": stored["name"],
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(stored["start"]),
+            "endTimeUnixNano": str(stored["end"]),
+            "attributes": _otlp_attributes(stored["attributes"]),
+            "events": [
+                {
+                    "timeUnixNano": str(event["time"]),
+                    "name": event["name"],
+                    "attributes": _otlp_attributes(event["attributes"])
+                }
+                for event in stored["events"]
+            ],
+            # STATUS_CODE_ERROR / STATUS_CODE_UNSET
+            "status": {"code": 2, "message": stored["error"]} if stored.get("error") else {}
+        }
+        if stored.get("parentSpanId"):
+            otlp_span["parentSpanId"] = stored["parentSpanId"]
+        spans.append(otlp_span)
+
+    resource = {
+        "service.name": SERVICE_NAME,
+        "job.id": str(trace_doc["_id"]),
+        "story.id": str(trace_doc["storyId"])
+    }
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes(resource)},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}]
+        }]
+    }
@@ -0,0 +1,82 @@
+"""
+Warm-up before a worker claims jobs.
+
+The first job on a fresh replica would otherwise pay one-off costs:
+importing the provider SDKs and building their clients, the first codec
+and ffmpeg runs, rendering music beds, starting executor threads.
+`Warmup` runs those steps once at startup and records how each went;
+the worker claims jobs, and /ready reports ready, only after it has
+finished.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupStep(NamedTuple):
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    # A failed required step keeps the worker from taking jobs
+    required: bool = False
+
+
+class Warmup:
+    """Runs warm-up steps in order and reports their outcome."""
+
+    def __init__(self, step_timeout: Optional[float] = None):
+        # WARMUP_STEP_TIMEOUT_SECONDS unless given; read when run
+        self.step_timeout = step_timeout
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.finished = False
+
+    async def run(self, steps: List[WarmupStep]) -> bool:
+        """Run every step; returns whether the worker may take jobs."""
+        step_timeout = (
+            settings.warmup_step_timeout_seconds if self.step_timeout is None else self.step_timeout
+        )
+        self.started = time.perf_counter()
+        self.steps = {step.name: {"status": "pending", "required": step.required} for step in steps}
+        for step in steps:
+            result = self.steps[step.name]
+            result["status"] = "running"
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(step.run(), timeout=step_timeout)
+                result["status"] = "ok"
+            except Exception as e:
+                result["status"] = "failed"
+                result["error"] = str(e) or type(e).__name__
+                log = logger.error if step.required else logger.warning
+                log(f"Warm-up step {step.name} failed: {result['error']}")
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Warm-up step {step.name}: {result['status']} in {result['seconds']}s")
+
+        self.seconds = round(time.perf_counter() - self.started, 3)
+        self.finished = True
+        logger.info(f"Warm-up finished in {self.seconds}s")
+        return self.ready
+
+    @property
+    def failed(self) -> bool:
+        """Whether a required step failed."""
+        return any(
+            step["required"] and step["status"] == "failed" for step in self.steps.values()
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.finished and not self.failed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "finished": self.finished,
+            "seconds": self.seconds,
+            "steps": self.steps
+        }